@@ -1,120 +1,365 @@
+import heapq
+import os
+import sys
+
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+# Los módulos compartidos (componentes, cache_memoria, perfil...) viven en la raíz del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_memoria import en_cache, mostrar_memoria_cache
+from componentes import mostrar_tabla_paginada
+from perfil import iniciar_perfil, mostrar_perfiles, terminar_perfil
+
 # --- Configuración de la página ---
 st.set_page_config(page_title="Salary Data Dashboard", layout="wide")
+iniciar_perfil("app_Salary_Data")  # Solo con ?perfil=1 en la URL o PERFILAR=1
 
 # --- Cargar datos ---
-@st.cache_data
+# Los datos y los índices cuentan en el presupuesto de memoria del proceso
+# (cache_memoria.py, CACHE_MEMORIA_MB); la tabla es compartida y no se modifica
+@en_cache("datasets")
 def load_data():
     return pd.read_csv("Salary_Data_clean.csv")
 
 df = load_data()
 
-# --- Sidebar ---
-st.sidebar.header("Filtros")
-
-education_filter = st.sidebar.multiselect(
-    "Nivel educativo",
-    options=df['Education Level'].unique(),
-    default=df['Education Level'].unique()
-)
-
-gender_filter = st.sidebar.multiselect(
-    "Género",
-    options=df['Gender'].unique(),
-    default=df['Gender'].unique()
-)
-
-filtered_df = df[
-    (df['Education Level'].isin(education_filter)) &
-    (df['Gender'].isin(gender_filter))
-]
-salary_range = st.sidebar.slider("Rango de salario", 
-                                 int(filtered_df['Salary'].min()), 
-                                 int(filtered_df['Salary'].max()), 
-                                 (int(filtered_df['Salary'].min()), int(filtered_df['Salary'].max())))
-
-filtered_df = filtered_df[(filtered_df['Salary'] >= salary_range[0]) & (filtered_df['Salary'] <= salary_range[1])]
-
-# --- KPIs ---
-total_people = len(filtered_df)
-avg_salary = filtered_df['Salary'].mean()
-unique_education_level = filtered_df['Education Level'].nunique()
+# --- Índice de salarios ordenados por segmento ---
+# Por cada combinación (nivel educativo, género) se guardan los salarios
+# ordenados y su suma acumulada, así el rango del slider se resuelve con
+# búsqueda binaria en lugar de recorrer todo el DataFrame.
+@en_cache("indices")
+def construir_indice_salarios(_df):
+    indice = {}
+    for segmento, grupo in _df.groupby(['Education Level', 'Gender']):
+        salarios = grupo['Salary'].to_numpy(dtype=float)
+        orden = np.argsort(salarios, kind='stable')
+        salarios = salarios[orden]
+        indice[segmento] = {
+            'salarios': salarios,
+            'acumulado': np.concatenate(([0.0], np.cumsum(salarios))),
+            'filas': grupo.index.to_numpy()[orden],
+        }
+    return indice
+
+
+def posiciones_en_rango(segmento, minimo, maximo):
+    # Posiciones [inicio, fin) de los salarios dentro del rango
+    salarios = segmento['salarios']
+    inicio = np.searchsorted(salarios, minimo, side='left')
+    fin = np.searchsorted(salarios, maximo, side='right')
+    return inicio, fin
+
+
+def top_k_rango(segmentos, minimo, maximo, k):
+    # Cada segmento aporta a lo más sus k salarios más altos dentro del rango
+    candidatos = []
+    for segmento in segmentos:
+        inicio, fin = posiciones_en_rango(segmento, minimo, maximo)
+        desde = max(inicio, fin - k)
+        candidatos.extend(zip(segmento['salarios'][desde:fin], segmento['filas'][desde:fin]))
+    return [fila for _, fila in heapq.nlargest(k, candidatos, key=lambda c: c[0])]
+
+
+def filas_en_rango(segmentos, minimo, maximo):
+    partes = []
+    for segmento in segmentos:
+        inicio, fin = posiciones_en_rango(segmento, minimo, maximo)
+        partes.append(segmento['filas'][inicio:fin])
+    return np.sort(np.concatenate(partes)) if partes else np.array([], dtype=int)
+
+
+def _k_esimo_salario(tramos, k):
+    # k-ésimo salario (base 0) de la unión de tramos ordenados: búsqueda
+    # binaria sobre el valor, contando en cada tramo con searchsorted
+    bajo = min(tramo[0] for tramo in tramos) - 1
+    alto = max(tramo[-1] for tramo in tramos)
+    for _ in range(64):
+        medio = (bajo + alto) / 2
+        if sum(np.searchsorted(tramo, medio, side='right') for tramo in tramos) > k:
+            alto = medio
+        else:
+            bajo = medio
+    return min(
+        tramo[i] for tramo in tramos
+        for i in [np.searchsorted(tramo, bajo, side='right')] if i < len(tramo)
+    )
+
+
+def cuantil_rango(segmentos, minimo, maximo, q):
+    # Percentil exacto (interpolación lineal, igual que pandas) sin unir ni ordenar filas
+    tramos = []
+    for segmento in segmentos:
+        inicio, fin = posiciones_en_rango(segmento, minimo, maximo)
+        if fin > inicio:
+            tramos.append(segmento['salarios'][inicio:fin])
+    total = sum(len(tramo) for tramo in tramos)
+    if total == 0:
+        return float('nan')
+    posicion = q * (total - 1)
+    abajo = int(np.floor(posicion))
+    valor_abajo = _k_esimo_salario(tramos, abajo)
+    if abajo == posicion:
+        return valor_abajo
+    valor_arriba = _k_esimo_salario(tramos, abajo + 1)
+    return valor_abajo + (valor_arriba - valor_abajo) * (posicion - abajo)
+
+
+# --- Cubo pre-agregado (nivel educativo x género x bin de salario) ---
+# Se construye una sola vez por carga de datos; las gráficas y KPIs se
+# obtienen sumando el cubo según los filtros activos.
+ANCHO_BIN_SALARIO = 1000
+BINS_HISTOGRAMA = 20
+
+
+@en_cache("indices")
+def construir_cubo_salarios(_df):
+    educaciones = list(_df['Education Level'].unique())
+    generos = list(_df['Gender'].unique())
+    salarios = _df['Salary'].to_numpy(dtype=float)
+
+    inicio = np.floor(salarios.min() / ANCHO_BIN_SALARIO) * ANCHO_BIN_SALARIO
+    bins = ((salarios - inicio) // ANCHO_BIN_SALARIO).astype(int)
+    num_bins = bins.max() + 1
+
+    i_edu = pd.Categorical(_df['Education Level'], categories=educaciones).codes
+    i_gen = pd.Categorical(_df['Gender'], categories=generos).codes
+
+    conteos = np.zeros((len(educaciones), len(generos), num_bins))
+    sumas = np.zeros((len(educaciones), len(generos), num_bins))
+    np.add.at(conteos, (i_edu, i_gen, bins), 1)
+    np.add.at(sumas, (i_edu, i_gen, bins), salarios)
+
+    return {
+        'educaciones': educaciones,
+        'generos': generos,
+        'bordes': inicio + ANCHO_BIN_SALARIO * np.arange(num_bins + 1),
+        'conteos': conteos,
+        'sumas': sumas,
+    }
+
+
+def _conteo_suma_exacto(segmento, desde, hasta, incluir_hasta):
+    # Conteo y suma exactos de un segmento en [desde, hasta) o [desde, hasta]
+    salarios = segmento['salarios']
+    inicio = np.searchsorted(salarios, desde, side='left')
+    fin = np.searchsorted(salarios, hasta, side='right' if incluir_hasta else 'left')
+    return fin - inicio, segmento['acumulado'][fin] - segmento['acumulado'][inicio]
+
+
+def marginal_cubo(cubo, indice, educaciones, generos, minimo, maximo):
+    # Recorta el cubo a los filtros; los dos bins de los extremos del rango
+    # se recalculan con el índice ordenado para que los totales sean exactos
+    i_edu = [cubo['educaciones'].index(e) for e in educaciones if e in cubo['educaciones']]
+    i_gen = [cubo['generos'].index(g) for g in generos if g in cubo['generos']]
+    bordes = cubo['bordes']
+    ultimo_bin = len(bordes) - 2
+    bin_ini = int(np.clip(np.searchsorted(bordes, minimo, side='right') - 1, 0, ultimo_bin))
+    bin_fin = int(np.clip(np.searchsorted(bordes, maximo, side='right') - 1, 0, ultimo_bin))
+    rango_bins = np.arange(bin_ini, bin_fin + 1)
+
+    conteos = cubo['conteos'][np.ix_(i_edu, i_gen, rango_bins)].copy()
+    sumas = cubo['sumas'][np.ix_(i_edu, i_gen, rango_bins)].copy()
+
+    for a, e in enumerate(i_edu):
+        for b, g in enumerate(i_gen):
+            segmento = indice.get((cubo['educaciones'][e], cubo['generos'][g]))
+            if segmento is None:
+                continue
+            for posicion, num_bin in {0: bin_ini, -1: bin_fin}.items():
+                desde = max(minimo, bordes[num_bin])
+                incluir_hasta = maximo < bordes[num_bin + 1]
+                hasta = maximo if incluir_hasta else bordes[num_bin + 1]
+                conteos[a, b, posicion], sumas[a, b, posicion] = _conteo_suma_exacto(
+                    segmento, desde, hasta, incluir_hasta
+                )
+
+    return {
+        'educaciones': [cubo['educaciones'][e] for e in i_edu],
+        'generos': [cubo['generos'][g] for g in i_gen],
+        'bordes': bordes[bin_ini:bin_fin + 2],
+        'conteos': conteos,
+        'sumas': sumas,
+    }
+
+
+def histograma_desde_cubo(marginal, num_bins):
+    # Agrupa los bins finos en num_bins barras para la gráfica
+    conteos = marginal['conteos'].sum(axis=(0, 1))
+    grupos = np.array_split(np.arange(len(conteos)), min(num_bins, len(conteos)))
+    bordes = marginal['bordes']
+    return pd.DataFrame({
+        'desde': [bordes[g[0]] for g in grupos],
+        'hasta': [bordes[g[-1] + 1] for g in grupos],
+        'cantidad': [conteos[g].sum() for g in grupos],
+    })
+
+
+indice_salarios = construir_indice_salarios(df)
+cubo_salarios = construir_cubo_salarios(df)
 
 st.title("💰 Salary Data Dashboard")
 
-col1, col2, col3 = st.columns(3)
-col1.metric("Personas totales", total_people)
-col2.metric("Salario promedio", f"${avg_salary:,.2f}")
-col3.metric("Niveles educativos únicos", unique_education_level)
 
-st.markdown("---")
+# --- Panel filtrado ---
+# Filtros, KPIs, gráficas y tabla dependen de los filtros y van en un
+# fragmento: al mover un filtro solo se vuelve a ejecutar este panel, no la
+# carga ni los índices. Un fragmento no puede escribir en el sidebar, por
+# eso los filtros van arriba del panel.
+@st.fragment
+def panel_salarios(df, indice_salarios, cubo_salarios):
+    # --- Filtros ---
+    st.header("Filtros")
+    col_educacion, col_genero = st.columns(2)
+
+    education_filter = col_educacion.multiselect(
+        "Nivel educativo",
+        options=df['Education Level'].unique(),
+        default=df['Education Level'].unique()
+    )
+
+    gender_filter = col_genero.multiselect(
+        "Género",
+        options=df['Gender'].unique(),
+        default=df['Gender'].unique()
+    )
+
+    segmentos_activos = [
+        indice_salarios[(educacion, genero)]
+        for educacion in education_filter
+        for genero in gender_filter
+        if (educacion, genero) in indice_salarios
+    ]
+
+    if len(segmentos_activos) == 0:
+        st.warning("⚠️ No hay datos con estos filtros")
+        return
+
+    # Los extremos de cada segmento ya están ordenados
+    salario_min = int(min(segmento['salarios'][0] for segmento in segmentos_activos))
+    salario_max = int(max(segmento['salarios'][-1] for segmento in segmentos_activos))
+    salary_range = st.slider("Rango de salario", 
+                             salario_min, 
+                             salario_max, 
+                             (salario_min, salario_max))
+
+    filas_filtradas = filas_en_rango(segmentos_activos, salary_range[0], salary_range[1])
+
+    marginal = marginal_cubo(
+        cubo_salarios, indice_salarios, education_filter, gender_filter, salary_range[0], salary_range[1]
+    )
+    conteo_edu = pd.Series(marginal['conteos'].sum(axis=(1, 2)), index=marginal['educaciones'])
+    suma_edu = pd.Series(marginal['sumas'].sum(axis=(1, 2)), index=marginal['educaciones'])
+    conteo_genero = pd.Series(marginal['conteos'].sum(axis=(0, 2)), index=marginal['generos'])
+    suma_genero = pd.Series(marginal['sumas'].sum(axis=(0, 2)), index=marginal['generos'])
+    conteo_edu = conteo_edu[conteo_edu > 0]
+    conteo_genero = conteo_genero[conteo_genero > 0]
+
+    # --- KPIs ---
+    total_people = int(conteo_edu.sum())
+    avg_salary = suma_edu.sum() / total_people if total_people > 0 else float('nan')
+    unique_education_level = len(conteo_edu)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Personas totales", total_people)
+    col2.metric("Salario promedio", f"${avg_salary:,.2f}")
+    col3.metric("Niveles educativos únicos", unique_education_level)
+
+    # Mediana y percentiles altos: el promedio se distorsiona con salarios extremos
+    col1, col2, col3 = st.columns(3)
+    for columna, etiqueta, q in [(col1, "Salario mediano", 0.5), (col2, "Percentil 90", 0.9), (col3, "Percentil 99", 0.99)]:
+        valor = cuantil_rango(segmentos_activos, salary_range[0], salary_range[1], q)
+        columna.metric(etiqueta, f"${valor:,.2f}")
 
-# --- Gráficos ---
-col1, col2 = st.columns(2)
+    st.markdown("---")
 
-with col1:
-    fig1 = px.bar(
-        filtered_df['Gender'].value_counts(),
-        title="Distribución por género",
-        labels={'index': 'Género', 'value': 'Cantidad'}
+    # --- Gráficos ---
+    col1, col2 = st.columns(2)
+
+    with col1:
+        fig1 = px.bar(
+            conteo_genero.sort_values(ascending=False),
+            title="Distribución por género",
+            labels={'index': 'Género', 'value': 'Cantidad'}
+        )
+        st.plotly_chart(fig1, use_container_width=True)
+
+    with col2:
+        fig2 = px.pie(
+            values=conteo_edu.values,
+            names=conteo_edu.index,
+            title="Distribución por nivel educativo"
+        )
+        st.plotly_chart(fig2, use_container_width=True)
+
+    # --- Tabla de datos ---
+    st.markdown("### 📋 Detalle de roles y salarios")
+
+    mostrar_tabla_paginada(
+        df,
+        clave="tabla_salarios",
+        version=len(df),
+        filas=df.index.get_indexer(filas_filtradas),
+        columnas=['Age', 'Gender', 'Education Level', 'Job Title', 'Years of Experience', 'Salary'],
+        orden_default='Salary',
+        ascendente_default=False
     )
-    st.plotly_chart(fig1, use_container_width=True)
 
-with col2:
-    fig2 = px.pie(
-        filtered_df,
-        names='Education Level',
-        title="Distribución por nivel educativo"
+    # --- Gráficas ---
+    st.markdown("### 💼 Top 10 puestos de trabajo mejor pagados")
+
+    top10 = df.loc[top_k_rango(segmentos_activos, salary_range[0], salary_range[1], 10)]
+
+    fig3 = px.bar(
+        top10,
+        x='Salary',
+        y='Job Title',
+        orientation='h',
+        title="Top 10 puestos mejor pagados",
+        labels={'Salary': 'Salario', 'Job Title': 'Puesto'}
     )
-    st.plotly_chart(fig2, use_container_width=True)
-
-# --- Tabla de datos ---
-st.markdown("### 📋 Detalle de roles y salarios")
-
-st.dataframe(
-    filtered_df[['Age', 'Gender', 'Education Level', 'Job Title', 'Years of Experience', 'Salary']],
-    use_container_width=True
-)
-
-# --- Gráficas ---
-st.markdown("### 💼 Top 10 puestos de trabajo mejor pagados")
-
-top10 = filtered_df.sort_values(by='Salary', ascending=False).head(10)
-
-fig3 = px.bar(
-    top10,
-    x='Salary',
-    y='Job Title',
-    orientation='h',
-    title="Top 10 puestos mejor pagados",
-    labels={'Salary': 'Salario', 'Job Title': 'Puesto'}
-)
-
-st.plotly_chart(fig3, use_container_width=True)
-
-avg_salary_edu = filtered_df.groupby('Education Level')['Salary'].mean().sort_values(ascending=False)
-fig4 = px.bar(
-    avg_salary_edu,
-    x=avg_salary_edu.index,
-    y=avg_salary_edu.values,
-    title="Salario promedio por nivel educativo",
-    labels={'x': 'Nivel educativo', 'y': 'Salario promedio'}
-)
-st.plotly_chart(fig4, use_container_width=True)
-
-avg_salary_gender = filtered_df.groupby('Gender')['Salary'].mean()
-fig5 = px.bar(
-    avg_salary_gender,
-    x=avg_salary_gender.index,
-    y=avg_salary_gender.values,
-    title="Salario promedio por género",
-    labels={'x':'Género', 'y':'Salario promedio'}
-)
-st.plotly_chart(fig5, use_container_width=True)
-
-fig6 = px.histogram(filtered_df, x='Salary', nbins=20, title="Distribución de salarios")
-st.plotly_chart(fig6, use_container_width=True)
 
+    st.plotly_chart(fig3, use_container_width=True)
+
+    avg_salary_edu = (suma_edu[conteo_edu.index] / conteo_edu).sort_values(ascending=False)
+    fig4 = px.bar(
+        avg_salary_edu,
+        x=avg_salary_edu.index,
+        y=avg_salary_edu.values,
+        title="Salario promedio por nivel educativo",
+        labels={'x': 'Nivel educativo', 'y': 'Salario promedio'}
+    )
+    st.plotly_chart(fig4, use_container_width=True)
+
+    avg_salary_gender = (suma_genero[conteo_genero.index] / conteo_genero).sort_index()
+    fig5 = px.bar(
+        avg_salary_gender,
+        x=avg_salary_gender.index,
+        y=avg_salary_gender.values,
+        title="Salario promedio por género",
+        labels={'x':'Género', 'y':'Salario promedio'}
+    )
+    st.plotly_chart(fig5, use_container_width=True)
+
+    histograma = histograma_desde_cubo(marginal, BINS_HISTOGRAMA)
+    fig6 = px.bar(
+        x=(histograma['desde'] + histograma['hasta']) / 2,
+        y=histograma['cantidad'],
+        title="Distribución de salarios",
+        labels={'x': 'Salary', 'y': 'count'}
+    )
+    fig6.update_traces(width=histograma['hasta'] - histograma['desde'])
+    fig6.update_layout(bargap=0)
+    st.plotly_chart(fig6, use_container_width=True)
+
+
+panel_salarios(df, indice_salarios, cubo_salarios)
+
+# --- Memoria de la cache y perfil del rerun (con ?perfil=1 o PERFILAR=1) ---
+with st.sidebar:
+    mostrar_memoria_cache()
+    terminar_perfil()
+    mostrar_perfiles()
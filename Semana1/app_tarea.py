@@ -1,11 +1,27 @@
 
 # Importación de Librerías
-import boto3              # Para conectarse a Amazon S3
 import pandas as pd       # Para trabajar con datos (tablas)
 import json               # Para leer los archivos JSON
 import streamlit as st    # Para crear el dashboard web
 import plotly.express as px  # Para crear gráficas
 import io    #Para manejar flujos de datos en memoria
+import os    # Para armar rutas de archivos
+import sys   # Para encontrar los módulos compartidos
+
+# Los módulos compartidos (almacenes, componentes, cache_memoria...) viven en la raíz del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from almacenes import crear_almacen  # S3, carpeta local o memoria según la variable ALMACEN
+from cache_memoria import en_cache, memoria, mostrar_memoria_cache  # Presupuesto de bytes para los datos en cache
+from componentes import (  # Gráficas en cache y tabla que envía una página a la vez
+    iniciar_registro_graficas, mostrar_grafica, mostrar_pesos_graficas, mostrar_tabla_paginada,
+)
+from muestras import (  # Modo aproximado: muestra por servidor mientras se calcula el exacto
+    MuestraEstratificada, esperar_exacto, exacto_o_pendiente, modo_aproximado,
+)
+from perfil import iniciar_perfil, mostrar_perfiles, terminar_perfil  # Perfil del rerun con ?perfil=1
+from revalidacion import CacheRevalidable  # Sirve la última copia buena mientras revisa si cambió
+from tablas import vista  # Vista copy-on-write de la tabla compartida
 
 
 
@@ -15,24 +31,49 @@ st.set_page_config(
     page_icon="🖥️",                
     layout="wide"                  # Significa que usa todo el ancho de la pantalla
 )
+iniciar_registro_graficas()  # Cuenta los bytes que manda cada gráfica en este rerun
+iniciar_perfil("app_tarea")  # Solo con ?perfil=1 en la URL o PERFILAR=1
 
 
-# Crear conexión con S3
-s3 = boto3.client("s3")  # Puerta para acceder a S3
+# Crear conexión con el almacén de datos (una sola vez, no en cada rerun)
+@st.cache_resource
+def obtener_almacen():
+    return crear_almacen()  # El bucket sale de BUCKET_NAME
 
 
 
-def cargar_datos_desde_s3():
-    bucket = "xideralaws-curso-lisset"
-    key = "processed/data_procesada.csv"
+KEY_DATOS = "processed/data_procesada.csv"
+TTL_DATOS = 300  # Cada 5 minutos se revisa (en segundo plano) si el CSV cambió
+
 
-    obj = s3.get_object(Bucket=bucket, Key=key)
-    body = obj["Body"].read()
+def leer_csv(key, version=None):
+    # Se lee directo del almacén: no hay copia en disco que validar con la versión
+    body = obtener_almacen().leer(key)  # En S3, si el CSV es grande se baja en partes al mismo tiempo
     df = pd.read_csv(io.BytesIO(body))
     df["timestamp"] = pd.to_datetime(df["timestamp"])
     return df
 
 
+# Una sola copia por proceso; si S3 falla se sigue mostrando la última buena.
+# La copia cuenta en el presupuesto de memoria (CACHE_MEMORIA_MB)
+@st.cache_resource
+def cache_datos():
+    return CacheRevalidable(
+        cargar=leer_csv, version=obtener_almacen().version, ttl={KEY_DATOS: TTL_DATOS}, memoria=memoria
+    )
+
+
+def cargar_datos_desde_s3():
+    return vista(cache_datos().obtener(KEY_DATOS))  # Sin copiar: lo que la sesión modifique no toca la tabla compartida
+
+
+# Muestra estratificada por servidor, una por versión de los datos.
+# Solo se usa en el modo aproximado (tablas muy grandes, ver muestras.py)
+@en_cache("muestras")
+def muestra_monitoreo(_df, version_datos):
+    return MuestraEstratificada(_df, 'server_id')
+
+
 
 # Título principal
 st.title("🖥️ Dashboard de Monitoreo")
@@ -50,6 +91,8 @@ with st.sidebar:
     if st.button("🔄 Actualizar Datos"):
         # Limpiar la memoria caché
         st.cache_data.clear()
+        st.cache_resource.clear()
+        memoria.limpiar()
         # Recargar la página completa
         st.rerun()
     
@@ -63,16 +106,53 @@ with st.spinner("Cargando datos desde S3..."):
 # Se muestra mensaje de éxito
 st.success(f" Se cargaron {len(df)} registros correctamente")
 
+# Antigüedad de los datos (y aviso si S3 no respondió al revisarlos)
+estado_datos = cache_datos().estado(KEY_DATOS)  # None si la copia se expulsó de la memoria después de leerla
+if estado_datos is not None:
+    if estado_datos['error']:
+        st.warning(f"S3 no respondió; se muestran los datos de hace {int(estado_datos['edad'] // 60)} min")
+    else:
+        st.caption(f"🕒 Datos verificados hace {int(estado_datos['desde_verificacion'] // 60)} min")
+
 
 # Muestra los indicadores por estados (KPIs)
 st.subheader("📊KPIs-Estados")
 
 # Contar cuántos registros hay de cada estado
-#El len() significa “length” y sirve para contar cuántos elementos hay
+# value_counts() cuenta todos los estados en una sola pasada
+version_datos = cache_datos().version(KEY_DATOS)
+estimaciones = None
+error_exacto = None
+
+if modo_aproximado(len(df)):
+    # Tabla muy grande: el conteo exacto se calcula en segundo plano y,
+    # mientras tanto, se estima con la muestra (con su margen de error)
+    def contar_estados():
+        return df['status'].value_counts()
+
+    try:
+        conteo_estados = exacto_o_pendiente(("estados", version_datos), contar_estados, grupo="kpis_estados")
+    except Exception as e:
+        conteo_estados, error_exacto = None, e   # Se quedan los estimados, con un aviso
+    if conteo_estados is None:
+        muestra = muestra_monitoreo(df, version_datos)
+        estimaciones = {
+            estado: muestra.conteo(muestra.filas[muestra.filas['status'] == estado])
+            for estado in ['OK', 'WARN', 'ERROR']
+        }
+else:
+    conteo_estados = df['status'].value_counts()
+
+
+def valor_estado(estado):
+    if estimaciones is not None:
+        return estimaciones[estado].texto()   # "≈ 1,234 ± 56"
+    return int(conteo_estados.get(estado, 0))
+
 
-total_ok = len(df[df['status'] == 'OK'])        
-total_warn = len(df[df['status'] == 'WARN'])   
-total_error = len(df[df['status'] == 'ERROR'])  
+total_ok = valor_estado('OK')
+total_warn = valor_estado('WARN')
+total_error = valor_estado('ERROR')
 
 # Crea 3 columnas para mostrar los números
 col1, col2, col3 = st.columns(3)
@@ -95,137 +175,217 @@ with col3:
         value=total_error
     )
 
-st.markdown("---")
-
-
-# Filtro de estado
-with st.sidebar:
-    st.markdown("---")  # Línea divisoria
-    st.header("🔍 Filtros")
-    
-    # Crear menú desplegable para elegir el estado
-    filtro_estado = st.selectbox(
-        "Filtrar por Estado:",                    # Etiqueta del filtro
-        options=["Todos", "OK", "WARN", "ERROR"], # Opciones del menú
-        index=0                                   # "Todos" seleccionado por defecto
+if error_exacto is not None:
+    st.warning(f"⚠️ No se pudo calcular el conteo exacto ({error_exacto}); se muestran los valores estimados")
+elif estimaciones is not None:
+    esperar_exacto(
+        ("estados", version_datos),
+        contar_estados,
+        f"Estimado con una muestra de {len(muestra.filas):,} de {len(df):,} registros (IC 95 %); "
+        "el conteo exacto se está calculando..."
     )
 
-# Aplicación de el filtro por estado
-# Crea una copia de los datos para no manipular el df real
-df_filtrado = df.copy()
+st.markdown("---")
 
-# Si el usuario elige algo diferente de "Todos" se filtra
-if filtro_estado != "Todos":
-    df_filtrado = df_filtrado[df_filtrado['status'] == filtro_estado]
 
-# Filtro por servidor
-with st.sidebar:
-    # Obtiene y ordena la lista de servidores únicos que existen
-    lista_servidores = df['server_id'].unique()
-    lista_servidores = sorted(lista_servidores)
-    
-    # Crea selector múltiple
-    filtro_servidores = st.multiselect(
-        "Filtrar por Servidor(es):",  # Etiqueta del filtro
-        options=lista_servidores,     # Lista de servidores disponibles
-        default=[]                    # Por defecto ninguno seleccionado
-    )
-
-# Aplicación del filtro de servidores
-# Si el usuario seleccionó al menos un servidor
-if len(filtro_servidores) > 0:
-    df_filtrado = df_filtrado[df_filtrado['server_id'].isin(filtro_servidores)]
+# Filtros, gráficas y tabla
+# Todo lo que depende de los filtros va en un fragmento: al cambiar un filtro
+# solo se vuelve a ejecutar esta parte (no la carga de datos ni los KPIs).
+# Un fragmento no puede escribir en el sidebar, por eso los filtros van aquí arriba
+@st.fragment
+def panel_filtrado(df, version_datos):
+    st.header("🔍 Filtros")
+    col_estado, col_servidores = st.columns(2)
 
+    # Crear menú desplegable para elegir el estado
+    with col_estado:
+        filtro_estado = st.selectbox(
+            "Filtrar por Estado:",                    # Etiqueta del filtro
+            options=["Todos", "OK", "WARN", "ERROR"], # Opciones del menú
+            index=0                                   # "Todos" seleccionado por defecto
+        )
+
+    # Filtro por servidor
+    with col_servidores:
+        # Obtiene y ordena la lista de servidores únicos que existen
+        lista_servidores = df['server_id'].unique()
+        lista_servidores = sorted(lista_servidores)
+
+        # Crea selector múltiple
+        filtro_servidores = st.multiselect(
+            "Filtrar por Servidor(es):",  # Etiqueta del filtro
+            options=lista_servidores,     # Lista de servidores disponibles
+            default=[]                    # Por defecto ninguno seleccionado
+        )
+
+    # Las gráficas se guardan por versión de los datos y filtros elegidos
+    filtros = (filtro_estado, tuple(filtro_servidores))
+    muestra = None
+
+    if modo_aproximado(len(df)):
+        # Mientras el filtro exacto corre en segundo plano, las gráficas y la
+        # tabla usan las filas de la muestra que pasan los mismos filtros
+        clave_exacta = ("filtrado", version_datos, filtros)
+
+        def filtrar_exacto():
+            return filtrar_monitoreo(df, filtro_estado, filtro_servidores)
+
+        error_exacto = None
+        try:
+            df_filtrado = exacto_o_pendiente(clave_exacta, filtrar_exacto, grupo="panel_filtrado")
+        except Exception as e:
+            df_filtrado, error_exacto = None, e
+        if df_filtrado is None:
+            muestra = muestra_monitoreo(df, version_datos)
+            df_filtrado = filtrar_monitoreo(muestra.filas, filtro_estado, filtro_servidores)
+        if error_exacto is not None:
+            st.warning(f"⚠️ No se pudo filtrar la tabla completa ({error_exacto}); se muestra la muestra")
+        elif muestra is not None:
+            esperar_exacto(
+                clave_exacta,
+                filtrar_exacto,
+                f"Gráficas y tabla con una muestra de {len(muestra.filas):,} de {len(df):,} registros; "
+                "el resultado exacto se está calculando..."
+            )
+    else:
+        df_filtrado = filtrar_monitoreo(df, filtro_estado, filtro_servidores)
+
+    st.markdown("---")
+    grafica_estados_por_servidor(df_filtrado, version_datos, filtros, muestra)
+    st.markdown("---")
+    grafica_cpu_en_el_tiempo(df_filtrado, version_datos, filtros, aproximado=muestra is not None)
+    st.markdown("---")
+    tabla_datos(df, df_filtrado, version_datos)
+
+
+# Aplicación de los filtros
+def filtrar_monitoreo(df, filtro_estado, filtro_servidores):
+    # Con copy-on-write filtrar o modificar df_filtrado no cambia el df real,
+    # así que no hace falta copiarlo
+    df_filtrado = df
+
+    # Si el usuario elige algo diferente de "Todos" se filtra
+    if filtro_estado != "Todos":
+        df_filtrado = df_filtrado[df_filtrado['status'] == filtro_estado]
+
+    # Aplicación del filtro de servidores
+    # Si el usuario seleccionó al menos un servidor
+    if len(filtro_servidores) > 0:
+        df_filtrado = df_filtrado[df_filtrado['server_id'].isin(filtro_servidores)]
+
+    return df_filtrado
 
 
 # Gráfica 1 Estados por servidor
-st.subheader("📈 Estados por Servidor")
-
-# Contar cuántos estados hay por cada servidor
-# groupby = agrupar, size = contar
-if len(df_filtrado) == 0:
-    st.warning("⚠️ No hay datos con estos filtros")
-else:
-    conteo = df_filtrado.groupby(['server_id', 'status']).size().reset_index(name='cantidad')
-
-# Crea una gráfica de barras
-grafica_barras = px.bar(
-    conteo,                          # Datos a graficar
-    x='server_id',                   # Eje horizontal (X)
-    y='cantidad',                    # Eje vertical (Y)
-    color='status',                  # Color diferente por estado
-    barmode='group',                 # Barras una al lado de la otra
-    color_discrete_map={             # Define colores específicos
-        'OK': 'green',
-        'WARN': 'orange',
-        'ERROR': 'red'
-    },
-    labels={                         # Etiquetas personalizadas
-        'server_id': 'Servidor',
-        'cantidad': 'Cantidad',
-        'status': 'Estado'
-    }
-)
-
-# Muestra la gráfica en Streamlit
-st.plotly_chart(grafica_barras, use_container_width=True)
-
-st.markdown("---")
+# Con una muestra, las barras son estimaciones con su intervalo de confianza
+def grafica_estados_por_servidor(df_filtrado, version_datos, filtros, muestra=None):
+    st.subheader("📈 Estados por Servidor")
+
+    # Contar cuántos estados hay por cada servidor
+    # groupby = agrupar, size = contar
+    if len(df_filtrado) == 0:
+        st.warning("⚠️ No hay datos con estos filtros")
+        return
+
+    if muestra is None:
+        conteo = df_filtrado.groupby(['server_id', 'status']).size().reset_index(name='cantidad')
+    else:
+        conteo = muestra.conteos_por_grupo(['server_id', 'status'], df_filtrado)  # Columnas cantidad y error
+
+    # Crea una gráfica de barras
+    def grafica_barras():
+        return px.bar(
+            conteo,                          # Datos a graficar
+            x='server_id',                   # Eje horizontal (X)
+            y='cantidad',                    # Eje vertical (Y)
+            color='status',                  # Color diferente por estado
+            barmode='group',                 # Barras una al lado de la otra
+            error_y='error' if muestra is not None else None,  # IC 95 % de la estimación
+            color_discrete_map={             # Define colores específicos
+                'OK': 'green',
+                'WARN': 'orange',
+                'ERROR': 'red'
+            },
+            labels={                         # Etiquetas personalizadas
+                'server_id': 'Servidor',
+                'cantidad': 'Cantidad',
+                'status': 'Estado'
+            }
+        )
+
+    # Muestra la gráfica en Streamlit; se reutiliza mientras los datos y los filtros no cambien
+    mostrar_grafica(
+        grafica_barras, clave="estados_por_servidor", version=version_datos, parametros=(filtros, muestra is not None)
+    )
 
 
 # Gráfica 2 - Uso de CPU en el tiempo
-st.subheader("📉 Uso de CPU en el Tiempo")
+def grafica_cpu_en_el_tiempo(df_filtrado, version_datos, filtros, aproximado=False):
+    st.subheader("📉 Uso de CPU en el Tiempo")
+
+    if len(df_filtrado) == 0:
+        st.warning("⚠️ No hay datos con estos filtros")
+        return
+
+    # Crear gráfica de línea (con muchos puntos se dibuja con WebGL)
+    def grafica_linea():
+        # Ordenar los datos por fecha (del más antiguo al más nuevo)
+        df_ordenado = df_filtrado.sort_values('timestamp')
+        return px.line(
+            df_ordenado,                     # Datos ordenados
+            x='timestamp',                   # Eje X: tiempo
+            y='cpu_usage',                   # Eje Y: uso de CPU
+            color='server_id',               # Color diferente por servidor
+            labels={
+                'timestamp': 'Tiempo',
+                'cpu_usage': 'Uso de CPU (%)',
+                'server_id': 'Servidor'
+            }
+        )
+
+    # Mostrar la gráfica
+    mostrar_grafica(grafica_linea, clave="cpu_en_el_tiempo", version=version_datos, parametros=(filtros, aproximado))
 
-if len(df_filtrado) == 0:
-    st.warning("⚠️ No hay datos con estos filtros")
-    # Ordenar los datos por fecha (del más antiguo al más nuevo)
-else:
-    df_ordenado = df_filtrado.sort_values('timestamp')
-
-
-# Crear gráfica de línea
-grafica_linea = px.line(
-    df_ordenado,                     # Datos ordenados
-    x='timestamp',                   # Eje X: tiempo
-    y='cpu_usage',                   # Eje Y: uso de CPU
-    color='server_id',               # Color diferente por servidor
-    labels={
-        'timestamp': 'Tiempo',
-        'cpu_usage': 'Uso de CPU (%)',
-        'server_id': 'Servidor'
-    }
-)
 
-# Mostrar la gráfica
-st.plotly_chart(grafica_linea, use_container_width=True)
+#Tabla con los datos
+def tabla_datos(df, df_filtrado, version_datos):
+    st.subheader("📋 Tabla de Datos")
+
+    # Seleccionar solo las columnas que se quieren mostrar
+    columnas_importantes = [
+        'timestamp',      # Fecha y hora
+        'server_id',      # Nombre del servidor
+        'cpu_usage',      # Uso de CPU
+        'memory_usage',   # Uso de memoria
+        'status',         # Estado (OK, WARN, ERROR)
+        'region'          # Región geográfica
+    ]
+
+    # Mostrar la tabla paginada: solo viaja al navegador la página visible
+    # y el orden por columna se calcula una sola vez sobre todos los datos.
+    # También es un fragmento: cambiar de página no vuelve a dibujar las gráficas
+    mostrar_tabla_paginada(
+        df,                                              # Datos completos
+        clave="tabla_monitoreo",
+        version=version_datos,                           # ETag del CSV: cambia cuando llegan datos nuevos
+        filas=df.index.get_indexer(df_filtrado.index),   # Filas que pasaron los filtros
+        columnas=columnas_importantes,
+        orden_default='timestamp',                       # Más recientes primero
+        ascendente_default=False,
+        height=400                                       # Altura de 400 píxeles
+    )
+
 
-st.markdown("---")
+panel_filtrado(df, version_datos)
 
 
-#Tabla con los datos
-st.subheader("📋 Tabla de Datos")
-
-# Seleccionar solo las columnas que se quieren mostrar
-columnas_importantes = [
-    'timestamp',      # Fecha y hora
-    'server_id',      # Nombre del servidor
-    'cpu_usage',      # Uso de CPU
-    'memory_usage',   # Uso de memoria
-    'status',         # Estado (OK, WARN, ERROR)
-    'region'          # Región geográfica
-]
-
-# Crea una nueva tabla solo con esas columnas
-df_mostrar = df_filtrado[columnas_importantes]
-
-# Ordenar por fecha (más recientes primero)
-df_mostrar = df_mostrar.sort_values('timestamp', ascending=False)
-
-# Mostrar la tabla interactiva
-st.dataframe(
-    df_mostrar,                      # Datos a mostrar
-    use_container_width=True,        # Usar todo el ancho
-    height=400                       # Altura de 400 píxeles
-)
+# Peso de las gráficas de este rerun y ocupación de la cache
+with st.sidebar:
+    mostrar_pesos_graficas()
+    mostrar_memoria_cache()
 
 
+# Perfil del rerun (con ?perfil=1 o PERFILAR=1) y lista de los recientes
+with st.sidebar:
+    terminar_perfil()
+    mostrar_perfiles()
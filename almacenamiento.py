@@ -0,0 +1,173 @@
+# =====================================================
+# ACCESO A LOS DATOS
+# Lo usan el dashboard y el precalentamiento del contenedor. El origen
+# (S3, carpeta local o memoria) lo decide almacenes.crear_almacen según
+# ALMACEN y BUCKET_NAME. Si está definida CACHE_LOCAL, cada objeto remoto
+# descargado se guarda en disco y las siguientes lecturas ya no van a S3.
+# Junto a cada copia queda el ETag con el que se bajó (<key>.version): quien
+# conoce la versión vigente la pasa y una copia vieja se vuelve a bajar.
+
+import io
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from almacenes import ObjetoNoEncontrado, crear_almacen  # noqa: F401
+
+almacen = crear_almacen()
+CARPETA_CLEAN = "clean/"
+
+DATASETS = {
+    'artists_combined': f"{CARPETA_CLEAN}artists_combined.parquet",
+    'tracks_lastfm': f"{CARPETA_CLEAN}tracks_lastfm.parquet",
+    'genres_lastfm': f"{CARPETA_CLEAN}genres_lastfm.parquet",
+    'spotify_new_releases': f"{CARPETA_CLEAN}spotify_new_releases.parquet",
+    'tracks_enriched': f"{CARPETA_CLEAN}tracks_enriched_cross_platform.parquet",
+}
+
+# Segundos que una copia en memoria se sirve sin revisar si cambió en el
+# almacén. Spotify publica lanzamientos a diario; lo demás cambia poco.
+# Se puede cambiar con TTL_<DATASET>, por ejemplo TTL_TRACKS_LASTFM=600
+TTL_DATASETS = {
+    nombre: int(os.environ.get(f"TTL_{nombre.upper()}", defecto))
+    for nombre, defecto in {
+        'artists_combined': 3600,
+        'tracks_lastfm': 3600,
+        'genres_lastfm': 6 * 3600,
+        'spotify_new_releases': 900,
+        'tracks_enriched': 3600,
+    }.items()
+}
+
+CACHE_LOCAL = os.environ.get("CACHE_LOCAL")
+ARCHIVO_METRICAS_ARRANQUE = os.environ.get("ARCHIVO_METRICAS_ARRANQUE", "/tmp/metricas_arranque.json")
+
+# =====================================================
+# LECTURA DE OBJETOS
+
+def _ruta_local(key):
+    return os.path.join(CACHE_LOCAL, key)
+
+def _ruta_version(key):
+    return _ruta_local(key) + ".version"
+
+def version_en_disco(key):
+    # ETag con el que se bajó la copia en disco, o None si no se sabe
+    try:
+        with open(_ruta_version(key)) as archivo:
+            return archivo.read()
+    except OSError:
+        return None
+
+def _copia_vigente(key, version):
+    # version=None: cualquier copia en disco sirve (no se preguntó al almacén)
+    return os.path.exists(_ruta_local(key)) and (version is None or version_en_disco(key) == version)
+
+def _usar_cache_local(usar_cache, version_id):
+    # Un almacén local o en memoria no necesita otra copia en disco
+    return bool(usar_cache and CACHE_LOCAL and version_id is None and almacen.remoto)
+
+def leer_objeto(key, version_id=None, usar_cache=True, refrescar=False, version=None):
+    # refrescar: ignora la copia en disco y la reemplaza con la del almacén.
+    # version: ETag vigente; la copia en disco solo sirve si se bajó con él
+    usar_cache = _usar_cache_local(usar_cache, version_id)
+    if usar_cache and not refrescar and _copia_vigente(key, version):
+        with open(_ruta_local(key), "rb") as archivo:
+            return archivo.read()
+
+    if usar_cache and version is None:
+        # El HEAD va antes del GET: si el objeto cambia entre los dos, la
+        # copia queda con el ETag viejo y la próxima verificación la renueva
+        try:
+            version = almacen.version(key)
+        except Exception:
+            version = None
+    body = almacen.leer(key, version_id)
+
+    if usar_cache:
+        # Se escribe a un temporal y se renombra para no dejar archivos a
+        # medias; sin ETag anotado la copia nunca pasa por vigente
+        os.makedirs(os.path.dirname(_ruta_local(key)), exist_ok=True)
+        if os.path.exists(_ruta_version(key)):
+            os.remove(_ruta_version(key))
+        temporal = _ruta_local(key) + ".tmp"
+        with open(temporal, "wb") as archivo:
+            archivo.write(body)
+        os.replace(temporal, _ruta_local(key))
+        if version is not None:
+            with open(_ruta_version(key), "w") as archivo:
+                archivo.write(version)
+    return body
+
+def leer_parquet(key, columnas=None, version_id=None, usar_cache=True, refrescar=False, version=None):
+    if _usar_cache_local(usar_cache, version_id):
+        if refrescar or not _copia_vigente(key, version):
+            leer_objeto(key, refrescar=True, version=version)
+        return pd.read_parquet(_ruta_local(key), columns=columnas, memory_map=True)
+    return almacen.leer_parquet(key, columnas, version_id)
+
+def descargar_a_disco(key):
+    # Ruta local del objeto (descargado por rangos si es remoto); se
+    # reutiliza si ya está en la cache
+    carpeta = CACHE_LOCAL or os.path.join(tempfile.gettempdir(), "cache_datos")
+    return almacen.ruta_en_disco(key, carpeta)
+
+def version_objeto(key):
+    return almacen.version(key)
+
+def escribir_objeto(key, body):
+    almacen.escribir(key, body)
+
+def escribir_parquet(key, df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    escribir_objeto(key, buffer.getvalue())
+
+def listar_objetos(prefijo):
+    return almacen.listar(prefijo)
+
+def listar_versiones(key):
+    return almacen.listar_versiones(key)
+
+def estadisticas_descargas():
+    # Bytes, peticiones, MB/s y reintentos de todas las descargas del proceso
+    return almacen.estadisticas()
+
+def limpiar_cache_local():
+    # El botón "Actualizar Datos" debe volver a S3, no al disco
+    if not CACHE_LOCAL:
+        return
+    for key in DATASETS.values():
+        for ruta in (_ruta_local(key), _ruta_version(key)):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+# =====================================================
+# MÉTRICAS DE ARRANQUE
+
+_primer_render_registrado = False
+
+def guardar_metricas_arranque(nuevas):
+    metricas = {}
+    if os.path.exists(ARCHIVO_METRICAS_ARRANQUE):
+        with open(ARCHIVO_METRICAS_ARRANQUE) as archivo:
+            metricas = json.load(archivo)
+    metricas.update(nuevas)
+    with open(ARCHIVO_METRICAS_ARRANQUE, "w") as archivo:
+        json.dump(metricas, archivo, indent=2)
+    return metricas
+
+def registrar_primer_render():
+    # Tiempo desde que arrancó el contenedor hasta el primer render completo,
+    # y las descargas que hizo el servidor para llegar a él
+    global _primer_render_registrado
+    arranque = os.environ.get("ARRANQUE_CONTENEDOR")
+    if _primer_render_registrado or not arranque:
+        return
+    _primer_render_registrado = True
+    segundos = time.time() - float(arranque)
+    guardar_metricas_arranque({'primer_render_s': round(segundos, 3), 'descargas_s3': estadisticas_descargas()})
+    print(f"[arranque] primer render a los {segundos:.2f} s del inicio del contenedor", flush=True)
@@ -0,0 +1,258 @@
+# =====================================================
+# BACKENDS DE ALMACENAMIENTO
+# Los datasets se leen de S3, de una carpeta local o de memoria según la
+# configuración; el resto del código no sabe cuál es. El backend local
+# abre los Parquet con memory map (sin copiarlos ni pasar por la red),
+# útil para despliegues junto a los datos y para benchmarks. El de
+# memoria sirve para pruebas.
+#
+# Configuración por variables de entorno:
+#   ALMACEN              s3 (default), local o memoria
+#   BUCKET_NAME          bucket para s3 (xideralaws-curso-lisset)
+#   RUTA_ALMACEN_LOCAL   carpeta raíz para local (./datos)
+
+import datetime
+import hashlib
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+BUCKET_POR_DEFECTO = "xideralaws-curso-lisset"
+REGION_POR_DEFECTO = "us-west-1"
+
+
+class ObjetoNoEncontrado(KeyError):
+    """El key no existe en el almacén."""
+
+
+def _leer_parquet_de_buffer(buffer, columnas):
+    # BufferReader lee directo del buffer, sin copiarlo
+    return pd.read_parquet(pa.BufferReader(buffer), columns=columnas)
+
+# =====================================================
+# S3
+
+class AlmacenS3:
+    remoto = True
+
+    def __init__(self, bucket, region_name=REGION_POR_DEFECTO):
+        # boto3 solo se importa si el almacén es S3
+        from botocore.exceptions import ClientError
+
+        from cliente_s3 import crear_cliente, descargar, estadisticas
+
+        self.bucket = bucket
+        self.cliente = crear_cliente(region_name=region_name)
+        self._descargar = descargar
+        self._estadisticas = estadisticas
+        self._error_cliente = ClientError
+
+    def _no_encontrado(self, error, key):
+        codigo = error.response["Error"]["Code"]
+        if codigo in ("NoSuchKey", "404", "NotFound"):
+            return ObjetoNoEncontrado(key)
+        return error
+
+    def leer(self, key, version_id=None):
+        try:
+            return self._descargar(self.cliente, self.bucket, key, version_id)
+        except self._error_cliente as e:
+            raise self._no_encontrado(e, key) from e
+
+    def leer_parquet(self, key, columnas=None, version_id=None):
+        return _leer_parquet_de_buffer(self.leer(key, version_id), columnas)
+
+    def leer_cola(self, key, cantidad):
+        """Los últimos `cantidad` bytes y el tamaño total del objeto (un GET con rango)."""
+        try:
+            respuesta = self.cliente.get_object(Bucket=self.bucket, Key=key, Range=f"bytes=-{cantidad}")
+        except self._error_cliente as e:
+            raise self._no_encontrado(e, key) from e
+        tamano = int(respuesta["ContentRange"].rsplit("/", 1)[1])
+        return respuesta["Body"].read(), tamano
+
+    def ruta_en_disco(self, key, carpeta):
+        # Descarga por rangos directo al archivo; se reutiliza si ya está
+        ruta = os.path.join(carpeta, key)
+        if not os.path.exists(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            try:
+                self._descargar(self.cliente, self.bucket, key, destino=ruta + ".tmp")
+            except self._error_cliente as e:
+                raise self._no_encontrado(e, key) from e
+            os.replace(ruta + ".tmp", ruta)
+        return ruta
+
+    def version(self, key):
+        # El ETag cambia cada vez que el objeto se reescribe
+        try:
+            return self.cliente.head_object(Bucket=self.bucket, Key=key)["ETag"]
+        except self._error_cliente as e:
+            raise self._no_encontrado(e, key) from e
+
+    def escribir(self, key, body):
+        self.cliente.put_object(Bucket=self.bucket, Key=key, Body=body)
+
+    def listar(self, prefijo):
+        objetos = []
+        for pagina in self.cliente.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefijo):
+            objetos.extend(pagina.get("Contents", []))
+        return objetos
+
+    def listar_versiones(self, key):
+        # Solo devuelve algo si el bucket tiene el versionado activado
+        versiones = []
+        for pagina in self.cliente.get_paginator("list_object_versions").paginate(Bucket=self.bucket, Prefix=key):
+            versiones.extend(v for v in pagina.get("Versions", []) if v["Key"] == key)
+        return versiones
+
+    def estadisticas(self):
+        return self._estadisticas.resumen()
+
+# =====================================================
+# CARPETA LOCAL (MEMORY MAP)
+
+class AlmacenLocal:
+    remoto = False
+
+    def __init__(self, raiz):
+        self.raiz = os.path.abspath(raiz)
+
+    def ruta(self, key):
+        return os.path.join(self.raiz, key)
+
+    def _verificar(self, key, version_id=None):
+        if version_id is not None:
+            raise ObjetoNoEncontrado(f"{key} (el almacén local no guarda versiones)")
+        if not os.path.isfile(self.ruta(key)):
+            raise ObjetoNoEncontrado(key)
+        return self.ruta(key)
+
+    def leer(self, key, version_id=None):
+        with open(self._verificar(key, version_id), "rb") as archivo:
+            return archivo.read()
+
+    def leer_parquet(self, key, columnas=None, version_id=None):
+        # Con memory_map las páginas del archivo se mapean en lugar de leerse a un buffer
+        tabla = pq.read_table(self._verificar(key, version_id), columns=columnas, memory_map=True)
+        return tabla.to_pandas()
+
+    def leer_cola(self, key, cantidad):
+        ruta = self._verificar(key)
+        tamano = os.path.getsize(ruta)
+        with open(ruta, "rb") as archivo:
+            archivo.seek(max(0, tamano - cantidad))
+            return archivo.read(), tamano
+
+    def ruta_en_disco(self, key, carpeta):
+        # Ya está en disco: no se copia
+        return self._verificar(key)
+
+    def version(self, key):
+        estado = os.stat(self._verificar(key))
+        return f"{estado.st_mtime_ns}-{estado.st_size}"
+
+    def escribir(self, key, body):
+        ruta = self.ruta(key)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        # Se escribe a un temporal y se renombra para no dejar archivos a medias
+        with open(ruta + ".tmp", "wb") as archivo:
+            archivo.write(body)
+        os.replace(ruta + ".tmp", ruta)
+
+    def listar(self, prefijo):
+        objetos = []
+        carpeta = self.ruta(os.path.dirname(prefijo))
+        if not os.path.isdir(carpeta):
+            return objetos
+        for directorio, _, archivos in os.walk(carpeta):
+            for nombre in archivos:
+                ruta = os.path.join(directorio, nombre)
+                key = os.path.relpath(ruta, self.raiz).replace(os.sep, "/")
+                if key.startswith(prefijo) and not key.endswith(".tmp"):
+                    estado = os.stat(ruta)
+                    objetos.append({
+                        'Key': key,
+                        'Size': estado.st_size,
+                        'LastModified': datetime.datetime.fromtimestamp(estado.st_mtime, datetime.timezone.utc),
+                    })
+        return sorted(objetos, key=lambda o: o['Key'])
+
+    def listar_versiones(self, key):
+        return []
+
+    def estadisticas(self):
+        return {}
+
+# =====================================================
+# MEMORIA (PRUEBAS)
+
+class AlmacenMemoria:
+    remoto = False
+
+    def __init__(self, objetos=None):
+        self.objetos = {}
+        for key, body in (objetos or {}).items():
+            self.escribir(key, body)
+
+    def _obtener(self, key, version_id=None):
+        if version_id is not None or key not in self.objetos:
+            raise ObjetoNoEncontrado(key)
+        return self.objetos[key]
+
+    def leer(self, key, version_id=None):
+        return self._obtener(key, version_id)['body']
+
+    def leer_parquet(self, key, columnas=None, version_id=None):
+        return _leer_parquet_de_buffer(self.leer(key, version_id), columnas)
+
+    def leer_cola(self, key, cantidad):
+        body = self.leer(key)
+        return body[-cantidad:], len(body)
+
+    def ruta_en_disco(self, key, carpeta):
+        ruta = os.path.join(carpeta, key)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "wb") as archivo:
+            archivo.write(self.leer(key))
+        return ruta
+
+    def version(self, key):
+        return self._obtener(key)['etag']
+
+    def escribir(self, key, body):
+        body = bytes(body)
+        self.objetos[key] = {
+            'body': body,
+            'etag': hashlib.md5(body).hexdigest(),
+            'LastModified': datetime.datetime.now(datetime.timezone.utc),
+        }
+
+    def listar(self, prefijo):
+        return [
+            {'Key': key, 'Size': len(o['body']), 'LastModified': o['LastModified']}
+            for key, o in sorted(self.objetos.items()) if key.startswith(prefijo)
+        ]
+
+    def listar_versiones(self, key):
+        return []
+
+    def estadisticas(self):
+        return {}
+
+# =====================================================
+# CONFIGURACIÓN
+
+def crear_almacen(tipo=None, bucket=None, raiz=None):
+    tipo = (tipo or os.environ.get("ALMACEN", "s3")).lower()
+    if tipo == "s3":
+        region = os.environ.get("AWS_DEFAULT_REGION", REGION_POR_DEFECTO)
+        return AlmacenS3(bucket or os.environ.get("BUCKET_NAME") or BUCKET_POR_DEFECTO, region)
+    if tipo == "local":
+        return AlmacenLocal(raiz or os.environ.get("RUTA_ALMACEN_LOCAL", "datos"))
+    if tipo == "memoria":
+        return AlmacenMemoria()
+    raise ValueError(f"ALMACEN desconocido: {tipo} (usa s3, local o memoria)")
+
@@ -0,0 +1,84 @@
+# =====================================================
+# CÁLCULOS DE LOS ANÁLISIS (SIN STREAMLIT)
+# Los usa el dashboard para calcular en vivo y precalculo.py para
+# materializar la capa de serving; así ambos dan exactamente lo mismo.
+
+import pandas as pd
+
+from derivadas import columna_validez, derivar
+
+NOMBRES_METRICAS_PLATAFORMA = {
+    'lastfm_listeners': 'Oyentes Last.fm',
+    'spotify_followers': 'Seguidores Spotify'
+}
+
+# Rangos que permiten los widgets del dashboard
+OPCIONES_TOP_ARTISTAS = [10, 20, 30, 50]
+RANGO_COMPARACION = range(10, 31, 5)
+RANGO_TOP_GENEROS = range(10, 51, 5)
+RANGO_MIN_POPULARIDAD = range(0, 101, 5)
+# El valor inicial del slider (10.0) no cae en la cuadrícula de pasos
+VALORES_MAX_SEGUIDORES = sorted({round(0.1 + 0.5 * i, 1) for i in range(100)} | {10.0})
+RANGO_TOP_LANZAMIENTOS = range(10, 31, 5)
+
+# =====================================================
+# ANÁLISIS 1: RANKING GLOBAL
+
+def top_artistas(df_artists, n):
+    return df_artists.sort_values(by='lastfm_playcount', ascending=False).head(n)
+
+# =====================================================
+# ANÁLISIS 2: COMPARACIÓN PLATAFORMAS
+
+def seleccion_comparacion(df_artists, n):
+    return df_artists[
+        (df_artists['lastfm_listeners'].notna()) &
+        (df_artists['spotify_followers'].notna())
+    ].sort_values('lastfm_listeners', ascending=False).head(n)
+
+def fundir_comparacion(df_comp):
+    df_grafica = pd.melt(
+        df_comp[['artist_name', 'lastfm_listeners', 'spotify_followers']],
+        id_vars=['artist_name'],
+        value_vars=['lastfm_listeners', 'spotify_followers'],
+        var_name='plataforma', value_name='cantidad'
+    )
+    df_grafica['plataforma'] = df_grafica['plataforma'].map(NOMBRES_METRICAS_PLATAFORMA)
+    return df_grafica
+
+# =====================================================
+# ANÁLISIS 3: GÉNEROS GLOBALES
+
+def top_generos(df_genres, n):
+    return df_genres.sort_values('tag_count', ascending=False).head(n)
+
+# =====================================================
+# ANÁLISIS 4: ARTISTAS EMERGENTES
+
+def candidatos_emergentes(df_artists):
+    # engagement_ratio y su máscara se calculan al cargar (derivadas.py);
+    # aquí solo se filtra, sin copiar ni dividir
+    if 'engagement_ratio' not in df_artists.columns:
+        df_artists = derivar('artists_combined', df_artists)
+    return df_artists[
+        df_artists[columna_validez('engagement_ratio')] &
+        df_artists['spotify_popularity'].notna()
+    ]
+
+def filtrar_emergentes(df_emergentes, min_popularity, max_followers_valor):
+    return df_emergentes[
+        (df_emergentes['spotify_popularity'] >= min_popularity) &
+        (df_emergentes['spotify_followers'] < max_followers_valor)
+    ]
+
+def top_emergentes(df_filtrado, n):
+    return df_filtrado.sort_values('spotify_popularity', ascending=False).head(n)
+
+# =====================================================
+# ANÁLISIS 5: NUEVOS LANZAMIENTOS
+
+def conteo_tipos_lanzamiento(df_new_releases):
+    return df_new_releases['album_type'].value_counts()
+
+def top_artistas_lanzamientos(df_new_releases, n):
+    return df_new_releases['artist_name'].value_counts().head(n)
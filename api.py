@@ -0,0 +1,353 @@
+# =====================================================
+# API JSON DE LOS ANÁLISIS (SIN STREAMLIT)
+# Sirve los mismos cálculos del dashboard (analisis_musical.py) y los KPIs
+# de monitoreo como JSON, para que otros equipos no tengan que leer la
+# página de Streamlit. Cada respuesta lleva un ETag que depende solo de la
+# ruta, los parámetros y la versión de los datasets que usa: un cliente que
+# manda If-None-Match recibe 304 sin que se calcule nada. Cache-Control
+# dice cuánto falta para que el servidor vuelva a revisar esos datasets.
+# Las respuestas se comprimen con gzip si el cliente lo acepta y las
+# listas se paginan.
+#
+# Uso: python api.py [--host 0.0.0.0] [--puerto 8503]
+#
+#   GET /api/versiones
+#   GET /api/cache                                   ocupación de la cache de memoria
+#   GET /api/ranking?top=20                          Análisis 1
+#   GET /api/comparacion?top=20                      Análisis 2
+#   GET /api/generos?top=20                          Análisis 3
+#   GET /api/emergentes?min_popularidad=0&max_seguidores=10   Análisis 4 (millones)
+#   GET /api/lanzamientos/tipos                      Análisis 5
+#   GET /api/lanzamientos/artistas?top=15
+#   GET /api/monitoreo/kpis                          KPIs de Semana1/app_tarea.py
+#
+# Las listas aceptan pagina (desde 1) y por_pagina (máximo POR_PAGINA_MAXIMO).
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import math
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import analisis_musical as am
+from almacenamiento import DATASETS, TTL_DATASETS, ObjetoNoEncontrado, leer_objeto, leer_parquet, version_objeto
+from cache_memoria import NO_ESTA, memoria
+from derivadas import derivar
+from revalidacion import CacheRevalidable
+
+KEY_MONITOREO = os.environ.get("KEY_MONITOREO", "processed/data_procesada.csv")
+TTL_MONITOREO = int(os.environ.get("TTL_MONITOREO", "300"))
+
+POR_PAGINA_DEFAULT = 50
+POR_PAGINA_MAXIMO = 1000
+# Tope de max_seguidores (en millones) en /api/emergentes
+MAX_SEGUIDORES_MILLONES = 1_000_000
+# Respuestas más chicas no se comprimen: gzip no ahorra nada
+MINIMO_GZIP = 1024
+
+# =====================================================
+# DATOS
+# La misma cache stale-while-revalidate del dashboard; la versión de cada
+# copia (ETag del objeto y momento de carga) es la base de los ETag HTTP.
+
+def _cargar(nombre, version=None, refrescar=False):
+    if nombre == 'monitoreo':
+        df = pd.read_csv(io.BytesIO(leer_objeto(KEY_MONITOREO, refrescar=refrescar, version=version)))
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df
+    return derivar(nombre, leer_parquet(DATASETS[nombre], refrescar=refrescar, version=version))
+
+
+def _version(nombre):
+    return version_objeto(KEY_MONITOREO if nombre == 'monitoreo' else DATASETS[nombre])
+
+
+datos = CacheRevalidable(
+    cargar=_cargar,
+    recargar=lambda nombre, version: _cargar(nombre, version, refrescar=True),
+    version=_version,
+    ttl={**TTL_DATASETS, 'monitoreo': TTL_MONITOREO},
+    memoria=memoria,
+)
+
+# =====================================================
+# PARÁMETROS
+
+class ParametroInvalido(ValueError):
+    """Un parámetro de la consulta no se puede interpretar (400)."""
+
+
+def _entero(parametros, nombre, defecto=None, minimo=None, maximo=None):
+    if nombre not in parametros:
+        return defecto
+    try:
+        valor = int(parametros[nombre])
+    except ValueError:
+        raise ParametroInvalido(f"{nombre} debe ser un entero") from None
+    if (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo):
+        raise ParametroInvalido(f"{nombre} debe estar entre {minimo} y {maximo}")
+    return valor
+
+
+def _decimal(parametros, nombre, defecto, minimo=None, maximo=None):
+    if nombre not in parametros:
+        return defecto
+    try:
+        valor = float(parametros[nombre])
+    except ValueError:
+        raise ParametroInvalido(f"{nombre} debe ser un número") from None
+    if not math.isfinite(valor) or (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo):
+        raise ParametroInvalido(f"{nombre} debe ser un número entre {minimo} y {maximo}")
+    return valor
+
+# =====================================================
+# ENDPOINTS
+# Cada uno declara los datasets que usa y una función que recibe esos
+# datasets y los parámetros. Las listas devuelven un DataFrame que luego
+# se pagina; lo demás devuelve un diccionario.
+
+def _ranking(tablas, parametros):
+    top = _entero(parametros, 'top', minimo=1)
+    df = am.top_artistas(tablas['artists_combined'], top or len(tablas['artists_combined']))
+    return df[['artist_name', 'lastfm_playcount', 'lastfm_listeners', 'spotify_followers', 'spotify_popularity']]
+
+
+def _comparacion(tablas, parametros):
+    top = _entero(parametros, 'top', defecto=20, minimo=1)
+    df = am.seleccion_comparacion(tablas['artists_combined'], top)
+    return df[['artist_name', 'lastfm_listeners', 'spotify_followers']]
+
+
+def _generos(tablas, parametros):
+    top = _entero(parametros, 'top', minimo=1)
+    df = am.top_generos(tablas['genres_lastfm'], top or len(tablas['genres_lastfm']))
+    return df[['tag_name', 'tag_count']]
+
+
+def _emergentes(tablas, parametros):
+    min_popularidad = _entero(parametros, 'min_popularidad', defecto=0, minimo=0, maximo=100)
+    # En millones; el máximo evita que al escalar a seguidores se pase a infinito
+    max_seguidores = _decimal(parametros, 'max_seguidores', defecto=10.0, minimo=0, maximo=MAX_SEGUIDORES_MILLONES)
+    df = am.filtrar_emergentes(
+        am.candidatos_emergentes(tablas['artists_combined']), min_popularidad, int(max_seguidores * 1_000_000)
+    )
+    df = am.top_emergentes(df, len(df))
+    return df[['artist_name', 'spotify_popularity', 'spotify_followers', 'lastfm_listeners', 'engagement_ratio']]
+
+
+def _lanzamientos_tipos(tablas, parametros):
+    tipos = am.conteo_tipos_lanzamiento(tablas['spotify_new_releases'])
+    return {'tipos': {str(tipo): int(cantidad) for tipo, cantidad in tipos.items()}, 'total': int(tipos.sum())}
+
+
+def _lanzamientos_artistas(tablas, parametros):
+    top = _entero(parametros, 'top', defecto=15, minimo=1)
+    artistas = am.top_artistas_lanzamientos(tablas['spotify_new_releases'], top)
+    return pd.DataFrame({'artist_name': artistas.index, 'lanzamientos': artistas.values})
+
+
+ESTADOS_MONITOREO = ['OK', 'WARN', 'ERROR']
+
+
+def _monitoreo_kpis(tablas, parametros):
+    df = tablas['monitoreo']
+    por_estado = df['status'].value_counts()
+    # Cada servidor lista los tres estados aunque no haya visto alguno
+    por_servidor = (
+        df.groupby(['server_id', 'status']).size().unstack(fill_value=0)
+        .reindex(columns=ESTADOS_MONITOREO, fill_value=0)
+    )
+    return {
+        'total': len(df),
+        'estados': {estado: int(por_estado.get(estado, 0)) for estado in ESTADOS_MONITOREO},
+        'servidores': {
+            str(servidor): {str(estado): int(cantidad) for estado, cantidad in fila.items()}
+            for servidor, fila in por_servidor.iterrows()
+        },
+        'desde': df['timestamp'].min().isoformat() if len(df) else None,
+        'hasta': df['timestamp'].max().isoformat() if len(df) else None,
+    }
+
+
+def _versiones(tablas, parametros):
+    respuesta = {}
+    for nombre in list(DATASETS) + ['monitoreo']:
+        estado = datos.estado(nombre)
+        version = datos.version(nombre)
+        respuesta[nombre] = None if estado is None else {
+            'version': str(version[0]).strip('"'),
+            'cargado': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(version[1])),
+            'segundos_desde_verificacion': round(estado['desde_verificacion'], 1),
+            'ttl': estado['ttl'],
+            'error': estado['error'],
+        }
+    return respuesta
+
+
+def _cache(tablas, parametros):
+    return memoria.estadisticas()
+
+
+ENDPOINTS = {
+    '/api/ranking': (('artists_combined',), _ranking),
+    '/api/comparacion': (('artists_combined',), _comparacion),
+    '/api/generos': (('genres_lastfm',), _generos),
+    '/api/emergentes': (('artists_combined',), _emergentes),
+    '/api/lanzamientos/tipos': (('spotify_new_releases',), _lanzamientos_tipos),
+    '/api/lanzamientos/artistas': (('spotify_new_releases',), _lanzamientos_artistas),
+    '/api/monitoreo/kpis': (('monitoreo',), _monitoreo_kpis),
+    '/api/versiones': ((), _versiones),
+    '/api/cache': ((), _cache),
+}
+# Estado del servidor: sin ETag ni resultado en cache
+SIN_CACHE = {'/api/versiones', '/api/cache'}
+
+# =====================================================
+# RESPUESTAS
+
+# Resultados calculados por (ruta, parámetros, versiones), en la región
+# "api" de la cache de memoria junto con los datasets: cuando un dataset
+# cambia, sus entradas viejas dejan de usarse y salen por LRU al faltar
+# espacio (CACHE_MEMORIA_MB)
+
+def _resultado(ruta, consulta, tablas, versiones):
+    llave = (ruta, consulta, versiones)
+    resultado = memoria.obtener("api", llave)
+    if resultado is not NO_ESTA:
+        return resultado
+    _, funcion = ENDPOINTS[ruta]
+    return memoria.guardar("api", llave, funcion(tablas, dict(consulta)))
+
+
+def _registros(df):
+    # to_json convierte tipos de numpy, fechas y NaN (a null)
+    return json.loads(df.to_json(orient='records', date_format='iso'))
+
+
+def _paginar(df, parametros):
+    pagina = _entero(parametros, 'pagina', defecto=1, minimo=1)
+    por_pagina = _entero(parametros, 'por_pagina', defecto=POR_PAGINA_DEFAULT, minimo=1, maximo=POR_PAGINA_MAXIMO)
+    inicio = (pagina - 1) * por_pagina
+    return {
+        'datos': _registros(df.iloc[inicio:inicio + por_pagina]),
+        'paginacion': {
+            'pagina': pagina,
+            'por_pagina': por_pagina,
+            'total': len(df),
+            'paginas': max(1, math.ceil(len(df) / por_pagina)),
+        },
+    }
+
+
+def _etag(ruta, parametros, versiones):
+    # Débil (W/): la respuesta con y sin gzip es la misma representación
+    firma = json.dumps([ruta, parametros, versiones], default=str)
+    return 'W/"' + hashlib.sha1(firma.encode()).hexdigest()[:32] + '"'
+
+
+def _max_age(nombres):
+    # Hasta la próxima revalidación del dataset que venza primero
+    restantes = []
+    for nombre in nombres:
+        estado = datos.estado(nombre)
+        if estado is not None:
+            restantes.append(estado['ttl'] - estado['desde_verificacion'])
+    return int(max(0, min(restantes))) if restantes else 0
+
+
+def _coincide(etag, if_none_match):
+    if if_none_match is None:
+        return False
+    etiquetas = {etiqueta.strip().removeprefix('W/') for etiqueta in if_none_match.split(',')}
+    return '*' in etiquetas or etag.removeprefix('W/') in etiquetas
+
+
+class ManejadorAPI(BaseHTTPRequestHandler):
+    server_version = "AnalisisMusicalAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        ruta = url.path.rstrip('/') or '/'
+        if ruta not in ENDPOINTS:
+            return self._enviar_json(404, {'error': f"ruta desconocida: {ruta}", 'rutas': sorted(ENDPOINTS)})
+
+        parametros = {clave: valores[-1] for clave, valores in parse_qs(url.query).items()}
+        nombres, _ = ENDPOINTS[ruta]
+        try:
+            # obtener() también dispara la revalidación si el TTL venció
+            tablas = {nombre: datos.obtener(nombre) for nombre in nombres}
+            versiones = tuple(datos.version(nombre) for nombre in nombres)
+
+            if ruta in SIN_CACHE:
+                _, funcion = ENDPOINTS[ruta]
+                return self._enviar_json(200, {'datos': funcion(tablas, parametros)}, {'Cache-Control': "no-cache"})
+
+            etag = _etag(ruta, sorted(parametros.items()), versiones)
+            cabeceras = {'ETag': etag, 'Cache-Control': f"public, max-age={_max_age(nombres)}"}
+            if _coincide(etag, self.headers.get('If-None-Match')):
+                return self._enviar(304, b'', cabeceras)
+
+            consulta = tuple(sorted((k, v) for k, v in parametros.items() if k not in ('pagina', 'por_pagina')))
+            resultado = _resultado(ruta, consulta, tablas, versiones)
+            if isinstance(resultado, pd.DataFrame):
+                cuerpo = _paginar(resultado, parametros)
+            else:
+                cuerpo = {'datos': resultado}
+            cuerpo['versiones'] = {nombre: str(version[0]).strip('"') for nombre, version in zip(nombres, versiones)}
+            self._enviar_json(200, cuerpo, cabeceras)
+        except ParametroInvalido as e:
+            self._enviar_json(400, {'error': str(e)})
+        except ObjetoNoEncontrado as e:
+            self._enviar_json(503, {'error': f"dataset no disponible: {e}"})
+        except Exception as e:
+            self.log_error("error en %s: %r", self.path, e)
+            self._enviar_json(500, {'error': str(e)})
+
+    def _enviar_json(self, codigo, cuerpo, cabeceras=None):
+        contenido = json.dumps(cuerpo, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        cabeceras = dict(cabeceras or {})
+        cabeceras['Content-Type'] = "application/json; charset=utf-8"
+        self._enviar(codigo, contenido, cabeceras)
+
+    def _enviar(self, codigo, contenido, cabeceras):
+        cabeceras = dict(cabeceras)
+        cabeceras['Vary'] = "Accept-Encoding"
+        if 'gzip' in self.headers.get('Accept-Encoding', '') and len(contenido) >= MINIMO_GZIP:
+            contenido = gzip.compress(contenido, compresslevel=6)
+            cabeceras['Content-Encoding'] = "gzip"
+
+        self.send_response(codigo)
+        for nombre, valor in cabeceras.items():
+            self.send_header(nombre, valor)
+        if codigo != 304:
+            self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        if codigo != 304:
+            self.wfile.write(contenido)
+
+
+def servir(host="0.0.0.0", puerto=8503):
+    servidor = ThreadingHTTPServer((host, puerto), ManejadorAPI)
+    print(f"[api] escuchando en http://{host}:{puerto}", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API JSON de los análisis musicales y los KPIs de monitoreo")
+    parser.add_argument("--host", default=os.environ.get("API_HOST", "0.0.0.0"))
+    parser.add_argument("--puerto", type=int, default=int(os.environ.get("API_PUERTO", "8503")))
+    argumentos = parser.parse_args()
+    servir(argumentos.host, argumentos.puerto)
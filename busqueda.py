@@ -0,0 +1,114 @@
+# =====================================================
+# BÚSQUEDA DE ARTISTAS
+# Se construye una vez por versión de los datos. Cada artista tiene una
+# ficha precalculada (rankings, métricas, tracks y lanzamientos), así que
+# buscar no recorre ningún DataFrame: el autocompletado es una búsqueda
+# binaria sobre los nombres normalizados ordenados (equivalente a un trie)
+# y, si faltan sugerencias, el índice de trigramas aporta las parecidas.
+
+from bisect import bisect_left
+
+import pandas as pd
+
+from emparejamiento import IndiceArtistas, clave_artista
+
+MAX_SUGERENCIAS = 10
+TRACKS_POR_FICHA = 5
+LANZAMIENTOS_POR_FICHA = 5
+
+
+def _columna_existente(df, opciones):
+    return next((c for c in opciones if c in df.columns), None)
+
+
+class IndiceBusqueda:
+    def __init__(self, df_artists, df_tracks=None, df_releases=None):
+        self.fichas = {}
+        self._agregar_artistas(df_artists)
+        if df_tracks is not None and 'artist_name' in df_tracks.columns:
+            self._agregar_tracks(df_tracks)
+        if df_releases is not None and 'artist_name' in df_releases.columns:
+            self._agregar_lanzamientos(df_releases)
+
+        self.claves = sorted(self.fichas)
+        self.indice_similares = IndiceArtistas(self.claves)
+
+    def _ficha(self, nombre):
+        # None para nombres vacíos o faltantes: no se juntan en una ficha sin nombre
+        clave = clave_artista(nombre)
+        if not clave:
+            return None
+        if clave not in self.fichas:
+            self.fichas[clave] = {'artist_name': nombre}
+        return self.fichas[clave]
+
+    def _agregar_artistas(self, df):
+        df = df.assign(
+            ranking_reproducciones=df['lastfm_playcount'].rank(ascending=False, method='min'),
+            ranking_oyentes=df['lastfm_listeners'].rank(ascending=False, method='min'),
+            ranking_seguidores=df['spotify_followers'].rank(ascending=False, method='min'),
+            ranking_popularidad=df['spotify_popularity'].rank(ascending=False, method='min'),
+        )
+        columnas = [
+            'lastfm_playcount', 'lastfm_listeners', 'spotify_followers', 'spotify_popularity',
+            'ranking_reproducciones', 'ranking_oyentes', 'ranking_seguidores', 'ranking_popularidad',
+        ]
+        for registro in df[['artist_name'] + columnas].to_dict('records'):
+            ficha = self._ficha(registro['artist_name'])
+            if ficha is None:
+                continue
+            ficha.update({c: registro[c] for c in columnas if pd.notna(registro[c])})
+        self.total_artistas = len(df)
+
+    def _agregar_tracks(self, df):
+        columna_plays = _columna_existente(df, ['playcount', 'lastfm_playcount', 'listeners'])
+        columna_track = _columna_existente(df, ['track_name', 'name'])
+        df = df.assign(_clave=df['artist_name'].map(clave_artista))
+        if columna_plays is not None:
+            df = df.sort_values(columna_plays, ascending=False)
+        for clave, grupo in df[df['_clave'] != ""].groupby('_clave', sort=False):
+            ficha = self._ficha(grupo['artist_name'].iloc[0])
+            ficha['tracks'] = len(grupo)
+            if columna_track is not None:
+                ficha['top_tracks'] = grupo[columna_track].head(TRACKS_POR_FICHA).tolist()
+
+    def _agregar_lanzamientos(self, df):
+        df = df.assign(
+            _clave=df['artist_name'].map(clave_artista),
+            _fecha=pd.to_datetime(df.get('release_date'), errors='coerce'),
+        ).sort_values('_fecha', ascending=False)
+        for clave, grupo in df[df['_clave'] != ""].groupby('_clave', sort=False):
+            ficha = self._ficha(grupo['artist_name'].iloc[0])
+            ficha['lanzamientos'] = len(grupo)
+            ficha['ultimos_lanzamientos'] = [
+                {
+                    'album_name': fila.get('album_name'),
+                    'album_type': fila.get('album_type'),
+                    'release_date': fila.get('release_date'),
+                }
+                for fila in grupo.head(LANZAMIENTOS_POR_FICHA).to_dict('records')
+            ]
+
+    def sugerir(self, texto, limite=MAX_SUGERENCIAS):
+        prefijo = clave_artista(texto)
+        if not prefijo:
+            return []
+
+        sugerencias = []
+        posicion = bisect_left(self.claves, prefijo)
+        while (posicion < len(self.claves) and len(sugerencias) < limite
+               and self.claves[posicion].startswith(prefijo)):
+            sugerencias.append(self.claves[posicion])
+            posicion += 1
+
+        if len(sugerencias) < limite:
+            for posicion, _ in self.indice_similares.similares(prefijo, limite):
+                clave = self.claves[posicion]
+                if clave not in sugerencias:
+                    sugerencias.append(clave)
+                if len(sugerencias) == limite:
+                    break
+        return [(clave, self.fichas[clave]['artist_name']) for clave in sugerencias]
+
+    def ficha(self, clave):
+        return self.fichas.get(clave)
@@ -0,0 +1,299 @@
+# =====================================================
+# CACHE CON PRESUPUESTO DE MEMORIA
+# Una sola cuenta de bytes por proceso para los datasets en memoria y los
+# resultados derivados (índices, resúmenes, figuras, tablas ordenadas).
+# Cada entrada guarda cuánto ocupa de verdad (memory_usage(deep=True) de
+# pandas, nbytes de numpy, recorrido de contenedores y objetos). Cuando el
+# total pasa del presupuesto se expulsan las entradas usadas hace más
+# tiempo (LRU) hasta volver a caber; lo que se expulsa se vuelve a
+# calcular o a leer la siguiente vez que se pide.
+#
+# Configuración por variables de entorno:
+#   CACHE_MEMORIA_MB   presupuesto total; por defecto la mitad del límite de
+#                      memoria del contenedor (cgroup) o de la RAM
+
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Contenedores más grandes se estiman con una muestra de sus elementos
+MUESTRA_CONTENEDORES = 100
+
+# =====================================================
+# PRESUPUESTO
+
+def _limite_contenedor():
+    # cgroup v2 y v1; "max" o un número enorme significa sin límite
+    for ruta in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(ruta) as archivo:
+                valor = archivo.read().strip()
+        except OSError:
+            continue
+        if valor.isdigit() and int(valor) < 1 << 60:
+            return int(valor)
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return 4 * 1024 ** 3
+
+
+def presupuesto_por_defecto():
+    if os.environ.get("CACHE_MEMORIA_MB"):
+        return int(float(os.environ["CACHE_MEMORIA_MB"]) * 1024 * 1024)
+    # La otra mitad queda para las sesiones, Streamlit y los picos de cada rerun
+    return _limite_contenedor() // 2
+
+# =====================================================
+# TAMAÑO DE UN VALOR
+
+def tamano_en_bytes(valor, _vistos=None):
+    vistos = set() if _vistos is None else _vistos
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        if valor.dtype == object:
+            return valor.nbytes + _tamano_elementos(valor.ravel(), vistos)
+        return valor.nbytes
+    if isinstance(valor, (str, bytes, bytearray, int, float, bool, type(None))):
+        return sys.getsizeof(valor)
+    if isinstance(valor, memoryview):
+        return valor.nbytes
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + _tamano_elementos(list(valor.keys()), vistos) + _tamano_elementos(list(valor.values()), vistos)
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + _tamano_elementos(list(valor), vistos)
+    if hasattr(valor, '__dict__'):
+        return sys.getsizeof(valor) + tamano_en_bytes(vars(valor), vistos)
+    if hasattr(valor, '__slots__'):
+        atributos = [getattr(valor, a) for a in valor.__slots__ if hasattr(valor, a)]
+        return sys.getsizeof(valor) + _tamano_elementos(atributos, vistos)
+    return sys.getsizeof(valor)
+
+
+def _tamano_elementos(elementos, vistos):
+    if len(elementos) <= MUESTRA_CONTENEDORES:
+        return sum(tamano_en_bytes(e, vistos) for e in elementos)
+    posiciones = np.linspace(0, len(elementos) - 1, MUESTRA_CONTENEDORES).astype(int)
+    muestra = sum(tamano_en_bytes(elementos[i], vistos) for i in posiciones)
+    return int(muestra * len(elementos) / MUESTRA_CONTENEDORES)
+
+# =====================================================
+# CACHE LRU POR BYTES
+
+NO_ESTA = object()
+
+
+class _Entrada:
+    __slots__ = ('valor', 'bytes', 'vence', 'al_expulsar')
+
+    def __init__(self, valor, cantidad_bytes, vence, al_expulsar):
+        self.valor = valor
+        self.bytes = cantidad_bytes
+        self.vence = vence
+        self.al_expulsar = al_expulsar
+
+
+class MemoriaCache:
+    """
+    LRU por bytes compartida por regiones ('datasets', 'indices', 'graficas', ...).
+    al_expulsar: se llama (fuera del candado) cuando la entrada sale de la
+    cache, para que el dueño del valor suelte su referencia.
+    """
+
+    def __init__(self, presupuesto=None):
+        self.presupuesto = presupuesto_por_defecto() if presupuesto is None else presupuesto
+        self._entradas = OrderedDict()
+        self._candado = threading.Lock()
+        self._candados_calculo = {}
+        self.ocupado = 0
+        self.pico = 0
+        self._regiones = {}
+
+    def _region(self, region):
+        return self._regiones.setdefault(region, {'aciertos': 0, 'fallos': 0, 'expulsiones': 0, 'bytes': 0, 'entradas': 0})
+
+    def obtener(self, region, clave, contar=True):
+        """El valor, o NO_ESTA si no está o venció. Cuenta aciertos y fallos."""
+        llave = (region, clave)
+        with self._candado:
+            entrada = self._entradas.get(llave)
+            if entrada is not None and entrada.vence is not None and time.time() >= entrada.vence:
+                self._quitar(llave)
+                entrada = None
+            if entrada is None:
+                if contar:
+                    self._region(region)['fallos'] += 1
+                return NO_ESTA
+            self._entradas.move_to_end(llave)
+            if contar:
+                self._region(region)['aciertos'] += 1
+            return entrada.valor
+
+    def guardar(self, region, clave, valor, cantidad_bytes=None, ttl=None, al_expulsar=None):
+        if cantidad_bytes is None:
+            cantidad_bytes = tamano_en_bytes(valor)
+        llave = (region, clave)
+        vence = None if ttl is None else time.time() + ttl
+        with self._candado:
+            if llave in self._entradas:
+                self._quitar(llave)
+            self._entradas[llave] = _Entrada(valor, cantidad_bytes, vence, al_expulsar)
+            estadisticas = self._region(region)
+            estadisticas['bytes'] += cantidad_bytes
+            estadisticas['entradas'] += 1
+            self.ocupado += cantidad_bytes
+            self.pico = max(self.pico, self.ocupado)
+            expulsadas = self._expulsar_hasta_caber(llave)
+        for entrada in expulsadas:
+            if entrada.al_expulsar is not None:
+                entrada.al_expulsar()
+        return valor
+
+    def _quitar(self, llave):
+        entrada = self._entradas.pop(llave)
+        estadisticas = self._region(llave[0])
+        estadisticas['bytes'] -= entrada.bytes
+        estadisticas['entradas'] -= 1
+        self.ocupado -= entrada.bytes
+        return entrada
+
+    def _expulsar_hasta_caber(self, protegida):
+        # La entrada recién guardada no se expulsa aunque sola no quepa
+        expulsadas = []
+        while self.ocupado > self.presupuesto and len(self._entradas) > 1:
+            llave = next(iter(self._entradas))
+            if llave == protegida:
+                self._entradas.move_to_end(llave)
+                llave = next(iter(self._entradas))
+            expulsadas.append(self._quitar(llave))
+            self._region(llave[0])['expulsiones'] += 1
+        return expulsadas
+
+    def quitar(self, region, clave):
+        with self._candado:
+            if (region, clave) in self._entradas:
+                self._quitar((region, clave))
+
+    def calcular_una_vez(self, region, clave):
+        """Candado por clave: dos sesiones no calculan lo mismo al mismo tiempo."""
+        with self._candado:
+            return self._candados_calculo.setdefault((region, clave), threading.Lock())
+
+    def soltar_calculo(self, region, clave):
+        # Quien ya espera el candado lo conserva; los que lleguen después encuentran el valor
+        with self._candado:
+            self._candados_calculo.pop((region, clave), None)
+
+    def limpiar(self, region=None):
+        with self._candado:
+            for llave in [llave for llave in self._entradas if region is None or llave[0] == region]:
+                self._quitar(llave)
+            self._candados_calculo.clear()
+
+    def estadisticas(self):
+        with self._candado:
+            regiones = {}
+            for region, datos in self._regiones.items():
+                consultas = datos['aciertos'] + datos['fallos']
+                regiones[region] = {
+                    **datos,
+                    'megabytes': round(datos['bytes'] / 1024 ** 2, 2),
+                    'tasa_aciertos': round(datos['aciertos'] / consultas, 3) if consultas else None,
+                }
+            return {
+                'presupuesto_mb': round(self.presupuesto / 1024 ** 2, 1),
+                'ocupado_mb': round(self.ocupado / 1024 ** 2, 2),
+                'pico_mb': round(self.pico / 1024 ** 2, 2),
+                'ocupacion': round(self.ocupado / self.presupuesto, 3) if self.presupuesto else None,
+                'entradas': len(self._entradas),
+                'regiones': regiones,
+            }
+
+
+memoria = MemoriaCache()
+
+# =====================================================
+# DECORADOR
+# Reemplaza a @st.cache_resource / @st.cache_data: la llave son los
+# argumentos, menos los que empiezan con "_" (igual que en Streamlit, esos
+# van acompañados de una versión). Devuelve el mismo objeto a todas las
+# sesiones, así que el resultado se trata como de solo lectura.
+
+def _llave_hashable(valor):
+    try:
+        hash(valor)
+        return valor
+    except TypeError:
+        return repr(valor)
+
+
+def en_cache(region, ttl=None, tamano=None):
+    """tamano: función opcional valor -> bytes, si el recorrido genérico es caro o impreciso."""
+    def decorador(funcion):
+        firma = inspect.signature(funcion)
+        nombre = f"{funcion.__module__}.{funcion.__qualname__}"
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            argumentos = firma.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            clave = (nombre,) + tuple(
+                (parametro, _llave_hashable(valor)) for parametro, valor in argumentos.arguments.items()
+                if not parametro.startswith("_")
+            )
+            valor = memoria.obtener(region, clave)
+            if valor is not NO_ESTA:
+                return valor
+            with memoria.calcular_una_vez(region, clave):
+                # Otra sesión pudo calcularlo mientras se esperaba el candado
+                valor = memoria.obtener(region, clave, contar=False)
+                if valor is not NO_ESTA:
+                    return valor
+                try:
+                    valor = funcion(*args, **kwargs)
+                    cantidad_bytes = tamano(valor) if tamano is not None else None
+                    return memoria.guardar(region, clave, valor, cantidad_bytes=cantidad_bytes, ttl=ttl)
+                finally:
+                    memoria.soltar_calculo(region, clave)
+
+        envoltura.clear = lambda: memoria.limpiar(region)
+        return envoltura
+    return decorador
+
+# =====================================================
+# STREAMLIT
+
+def mostrar_memoria_cache():
+    """Ocupación, expulsiones y tasa de aciertos por región (barra lateral)."""
+    import streamlit as st
+
+    estadisticas = memoria.estadisticas()
+    with st.expander(f"🧠 Cache: {estadisticas['ocupado_mb']:,.1f} de {estadisticas['presupuesto_mb']:,.0f} MB"):
+        st.progress(min(1.0, estadisticas['ocupacion'] or 0.0))
+        st.caption(f"Pico: {estadisticas['pico_mb']:,.1f} MB · {estadisticas['entradas']} entradas")
+        filas = [
+            {
+                'región': region,
+                'MB': datos['megabytes'],
+                'entradas': datos['entradas'],
+                'aciertos': f"{datos['tasa_aciertos']:.0%}" if datos['tasa_aciertos'] is not None else "—",
+                'expulsiones': datos['expulsiones'],
+            }
+            for region, datos in sorted(estadisticas['regiones'].items())
+        ]
+        if filas:
+            st.dataframe(pd.DataFrame(filas), hide_index=True, use_container_width=True)
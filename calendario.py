@@ -0,0 +1,77 @@
+# =====================================================
+# CALENDARIO DE LANZAMIENTOS
+# release_date se convierte a fecha una sola vez y los lanzamientos se
+# ordenan del más reciente al más antiguo. Un rango de fechas es entonces
+# un tramo contiguo de ese orden (búsqueda binaria) y los conteos por día,
+# semana y mes de cada album_type quedan precalculados.
+
+import numpy as np
+import pandas as pd
+
+GRANULARIDADES = {
+    'Día': 'D',
+    'Semana': 'W',
+    'Mes': 'M',
+}
+
+
+class CalendarioLanzamientos:
+    """Índice por fecha de spotify_new_releases."""
+
+    def __init__(self, df_releases):
+        # Spotify mezcla precisiones ("2024", "2024-05", "2024-05-17")
+        fechas = pd.to_datetime(df_releases['release_date'], format='mixed', errors='coerce')
+        fechas = fechas.to_numpy(dtype='datetime64[ns]')
+        validas = ~np.isnat(fechas)
+        self.sin_fecha = int((~validas).sum())
+
+        # Más reciente primero; los que no tienen fecha quedan al final
+        posiciones = np.flatnonzero(validas)
+        orden = posiciones[np.argsort(fechas[posiciones], kind='stable')[::-1]]
+        orden = np.concatenate([orden, np.flatnonzero(~validas)])
+
+        self.tabla = df_releases.iloc[orden].reset_index(drop=True)
+        self.tabla.insert(0, 'fecha', fechas[orden])
+        self.n_con_fecha = len(posiciones)
+        # Fechas en orden ascendente para searchsorted (la tabla va al revés)
+        self._fechas_ascendentes = fechas[orden[:self.n_con_fecha]][::-1]
+
+        con_fecha = self.tabla.iloc[:self.n_con_fecha]
+        self.tipos = sorted(con_fecha['album_type'].dropna().unique())
+        self.conteos = {
+            frecuencia: pd.crosstab(
+                con_fecha['fecha'].dt.to_period(frecuencia).dt.start_time.rename('periodo'),
+                con_fecha['album_type']
+            ).reindex(columns=self.tipos, fill_value=0).sort_index()
+            for frecuencia in GRANULARIDADES.values()
+        }
+
+    @property
+    def minimo(self):
+        return pd.Timestamp(self._fechas_ascendentes[0]) if self.n_con_fecha else None
+
+    @property
+    def maximo(self):
+        return pd.Timestamp(self._fechas_ascendentes[-1]) if self.n_con_fecha else None
+
+    def tramo(self, desde, hasta):
+        """Posiciones [inicio, fin) de self.tabla con fecha entre desde y hasta (inclusive)."""
+        desde = np.datetime64(pd.Timestamp(desde), 'ns')
+        hasta = np.datetime64(pd.Timestamp(hasta) + pd.Timedelta(days=1), 'ns')
+        izquierda = np.searchsorted(self._fechas_ascendentes, desde, side='left')
+        derecha = np.searchsorted(self._fechas_ascendentes, hasta, side='left')
+        return self.n_con_fecha - derecha, self.n_con_fecha - izquierda
+
+    def tendencia(self, frecuencia, desde, hasta):
+        """Lanzamientos por periodo y tipo entre desde y hasta."""
+        conteos = self.conteos[frecuencia]
+        periodo_desde = pd.Timestamp(desde).to_period(frecuencia).start_time
+        return conteos.loc[periodo_desde:pd.Timestamp(hasta)]
+
+    def conteo_tipos(self, desde, hasta):
+        diarios = self.conteos['D'].loc[pd.Timestamp(desde):pd.Timestamp(hasta)]
+        return diarios.sum().sort_values(ascending=False)
+
+    def top_artistas(self, desde, hasta, n):
+        inicio, fin = self.tramo(desde, hasta)
+        return self.tabla['artist_name'].iloc[inicio:fin].value_counts().head(n)
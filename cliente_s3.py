@@ -0,0 +1,143 @@
+# =====================================================
+# CLIENTE DE S3 AFINADO
+# Un solo cliente con pool de conexiones y reintentos adaptativos. Los
+# objetos grandes se bajan por rangos en paralelo y cada parte se escribe
+# directo en su posición (en memoria o en el archivo destino), sin juntar
+# pedazos al final. Lleva la cuenta de bytes, tiempo y reintentos.
+#
+# Configuración por variables de entorno:
+#   S3_MAX_CONEXIONES   conexiones del pool y partes simultáneas (32)
+#   S3_MAX_INTENTOS     intentos por petición, modo adaptativo (8)
+#   S3_TAMANO_PARTE_MB  tamaño de cada rango (8)
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+MAX_CONEXIONES = int(os.environ.get("S3_MAX_CONEXIONES", "32"))
+MAX_INTENTOS = int(os.environ.get("S3_MAX_INTENTOS", "8"))
+TAMANO_PARTE = int(os.environ.get("S3_TAMANO_PARTE_MB", "8")) * 1024 * 1024
+
+
+def crear_cliente(region_name=None):
+    config = Config(
+        max_pool_connections=MAX_CONEXIONES,
+        retries={'max_attempts': MAX_INTENTOS, 'mode': 'adaptive'},
+        tcp_keepalive=True,
+    )
+    return boto3.client("s3", region_name=region_name, config=config)
+
+# =====================================================
+# ESTADÍSTICAS
+
+class EstadisticasDescarga:
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._candado:
+            self.descargas = 0
+            self.peticiones = 0
+            self.bytes = 0
+            self.segundos = 0.0
+            self.reintentos = 0
+
+    def registrar_peticion(self, cantidad_bytes, reintentos):
+        with self._candado:
+            self.peticiones += 1
+            self.bytes += cantidad_bytes
+            self.reintentos += reintentos
+
+    def registrar_descarga(self, segundos):
+        with self._candado:
+            self.descargas += 1
+            self.segundos += segundos
+
+    def resumen(self):
+        with self._candado:
+            megas = self.bytes / (1024 * 1024)
+            return {
+                'descargas': self.descargas,
+                'peticiones': self.peticiones,
+                'megabytes': round(megas, 2),
+                'segundos': round(self.segundos, 3),
+                'mb_por_segundo': round(megas / self.segundos, 2) if self.segundos > 0 else 0.0,
+                'reintentos': self.reintentos,
+            }
+
+
+estadisticas = EstadisticasDescarga()
+
+# =====================================================
+# DESCARGA POR RANGOS
+
+def _get(cliente, parametros):
+    respuesta = cliente.get_object(**parametros)
+    datos = respuesta["Body"].read()
+    estadisticas.registrar_peticion(len(datos), respuesta["ResponseMetadata"].get("RetryAttempts", 0))
+    return respuesta, datos
+
+
+def descargar(cliente, bucket, key, version_id=None, destino=None):
+    """
+    Baja el objeto completo. Sin destino devuelve un bytearray; con destino
+    (ruta) lo escribe en ese archivo y devuelve la ruta.
+    """
+    inicio = time.perf_counter()
+    parametros = {'Bucket': bucket, 'Key': key}
+    if version_id is not None:
+        parametros['VersionId'] = version_id
+
+    # El primer GET trae la primera parte y, en Content-Range, el tamaño total
+    try:
+        respuesta, primera = _get(cliente, {**parametros, 'Range': f"bytes=0-{TAMANO_PARTE - 1}"})
+        tamano = int(respuesta["ContentRange"].rsplit("/", 1)[1]) if "ContentRange" in respuesta else len(primera)
+    except ClientError as e:
+        # Un objeto vacío no acepta rangos
+        if e.response["Error"]["Code"] != "InvalidRange":
+            raise
+        respuesta, primera = _get(cliente, parametros)
+        tamano = len(primera)
+
+    # Las demás partes deben ser de la misma versión del objeto
+    if version_id is None and tamano > len(primera):
+        parametros['IfMatch'] = respuesta["ETag"]
+    inicios = range(len(primera), tamano, TAMANO_PARTE)
+
+    if destino is None:
+        buffer = bytearray(tamano)
+        vista = memoryview(buffer)
+        vista[:len(primera)] = primera
+
+        def escribir(posicion, datos):
+            vista[posicion:posicion + len(datos)] = datos
+    else:
+        archivo = open(destino, "wb")
+        archivo.truncate(tamano)
+        descriptor = archivo.fileno()
+        os.pwrite(descriptor, primera, 0)
+
+        def escribir(posicion, datos):
+            os.pwrite(descriptor, datos, posicion)
+
+    def bajar_parte(posicion):
+        fin = min(posicion + TAMANO_PARTE, tamano) - 1
+        _, datos = _get(cliente, {**parametros, 'Range': f"bytes={posicion}-{fin}"})
+        escribir(posicion, datos)
+
+    try:
+        if len(inicios) > 0:
+            with ThreadPoolExecutor(max_workers=min(MAX_CONEXIONES, len(inicios))) as pool:
+                list(pool.map(bajar_parte, inicios))
+    finally:
+        if destino is not None:
+            archivo.close()
+
+    estadisticas.registrar_descarga(time.perf_counter() - inicio)
+    return buffer if destino is None else destino
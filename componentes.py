@@ -0,0 +1,217 @@
+# =====================================================
+# COMPONENTES REUTILIZABLES DE STREAMLIT
+
+import json
+import math
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io
+import streamlit as st
+
+from cache_memoria import en_cache
+
+FILAS_POR_PAGINA = 50
+
+# =====================================================
+# TABLA PAGINADA
+# Solo se envía al navegador la página visible. El orden de cada columna
+# se calcula una vez sobre la tabla completa (por versión de datos) y los
+# filtros solo recortan esa permutación, sin volver a ordenar. Es un
+# fragmento: cambiar el orden o la página solo vuelve a ejecutar la tabla.
+# Las permutaciones cuentan en el presupuesto de memoria (cache_memoria.py).
+
+@en_cache("tablas")
+def _permutacion_orden(_df, clave, version, columna, ascendente):
+    return (
+        _df[[columna]]
+        .reset_index(drop=True)
+        .sort_values(columna, ascending=ascendente, kind='stable', na_position='last')
+        .index.to_numpy()
+    )
+
+@st.fragment
+def mostrar_tabla_paginada(df_base, clave, version, filas=None, columnas=None, etiquetas=None,
+                           orden_default=None, ascendente_default=True,
+                           filas_por_pagina=FILAS_POR_PAGINA, height=None):
+    """
+    df_base: tabla completa; filas: posiciones o máscara booleana del
+    subconjunto filtrado; version: cambia cuando cambian los datos.
+    """
+    columnas = columnas or list(df_base.columns)
+    etiquetas = etiquetas or {}
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        columna_orden = st.selectbox(
+            "Ordenar por:",
+            options=columnas,
+            index=columnas.index(orden_default) if orden_default in columnas else 0,
+            format_func=lambda c: etiquetas.get(c, c),
+            key=f"{clave}_orden"
+        )
+    with col2:
+        direccion = st.radio(
+            "Dirección:",
+            options=["Ascendente", "Descendente"],
+            index=0 if ascendente_default else 1,
+            horizontal=True,
+            key=f"{clave}_direccion"
+        )
+
+    permutacion = _permutacion_orden(df_base, clave, version, columna_orden, direccion == "Ascendente")
+
+    if filas is not None:
+        filas = np.asarray(filas)
+        if filas.dtype != bool:
+            mascara = np.zeros(len(df_base), dtype=bool)
+            mascara[filas] = True
+            filas = mascara
+        permutacion = permutacion[filas[permutacion]]
+
+    total = len(permutacion)
+    num_paginas = max(1, math.ceil(total / filas_por_pagina))
+
+    # Si un filtro redujo las filas, la página guardada puede quedar fuera de rango
+    clave_pagina = f"{clave}_pagina"
+    if st.session_state.get(clave_pagina, 1) > num_paginas:
+        st.session_state[clave_pagina] = num_paginas
+
+    with col3:
+        pagina = st.number_input("Página:", min_value=1, max_value=num_paginas, value=1, key=clave_pagina)
+
+    inicio = (pagina - 1) * filas_por_pagina
+    df_pagina = df_base.iloc[permutacion[inicio:inicio + filas_por_pagina]][columnas]
+
+    opciones = {'height': height} if height else {}
+    st.dataframe(df_pagina.rename(columns=etiquetas), use_container_width=True, **opciones)
+    if total > 0:
+        st.caption(f"Filas {inicio + 1:,}–{min(inicio + filas_por_pagina, total):,} de {total:,} · Página {pagina} de {num_paginas}")
+    else:
+        st.caption("Sin filas para mostrar")
+
+# =====================================================
+# GRÁFICAS
+# Todas las gráficas pasan por mostrar_grafica:
+#   - Con version, la figura ya construida se guarda por (clave, version,
+#     parametros) y un rerun con los mismos datos y filtros no la vuelve a armar.
+#   - Los scatter con más de UMBRAL_WEBGL puntos se cambian a WebGL (scattergl).
+#   - Los arreglos numéricos se envían en binario (base64 tipado de plotly.js)
+#     con el tipo más chico que no pierde precisión; las fechas van como
+#     milisegundos en un eje de tipo fecha en lugar de texto ISO.
+#   - Se registra cuántos bytes de spec manda cada gráfica en el rerun.
+
+UMBRAL_WEBGL = int(os.environ.get("GRAFICAS_UMBRAL_WEBGL", "1000"))
+CLAVE_PESOS = "_pesos_graficas"
+_EJES = {'x': 'xaxis', 'y': 'yaxis'}
+
+
+def _arreglo_compacto(valores):
+    """Arreglo numpy numérico equivalente a `valores`, o None si no es numérico."""
+    arreglo = np.asarray(valores)
+    if arreglo.dtype == object:
+        # Textos que parecen números ("1975") son categorías, no valores
+        if any(isinstance(v, (str, bytes)) for v in arreglo.ravel()):
+            return None
+        try:
+            arreglo = arreglo.astype(float)
+        except (TypeError, ValueError):
+            return None
+    if np.issubdtype(arreglo.dtype, np.datetime64):
+        return arreglo
+    if arreglo.dtype == bool or not np.issubdtype(arreglo.dtype, np.number):
+        return None
+    if np.issubdtype(arreglo.dtype, np.floating) and arreglo.dtype != np.float32:
+        # float32 solo si no cambia ningún valor (plotly ya achica los enteros)
+        reducido = arreglo.astype(np.float32)
+        if np.array_equal(reducido.astype(arreglo.dtype), arreglo, equal_nan=True):
+            return reducido
+    return arreglo
+
+
+def _mas_liviano(arreglo):
+    # Base64 ocupa 4/3 de los bytes; un texto corto ("0.5", "12") puede ser menor
+    en_binario = 4 * math.ceil(arreglo.nbytes / 3)
+    como_lista = arreglo.tolist()
+    return arreglo if en_binario <= len(json.dumps(como_lista)) else como_lista
+
+
+def _compactar_traza(traza, layout):
+    datos = traza.to_plotly_json()
+    for atributo in ('x', 'y', 'z', 'values', 'customdata'):
+        if atributo not in datos or isinstance(datos[atributo], (str, dict)) or datos[atributo] is None:
+            continue
+        arreglo = _arreglo_compacto(datos[atributo])
+        if arreglo is None:
+            continue
+        if np.issubdtype(arreglo.dtype, np.datetime64) and atributo in _EJES:
+            # Milisegundos desde 1970: plotly.js los lee como fecha si el eje es de tipo fecha
+            eje = _EJES[atributo] + datos.get(f"{atributo}axis", atributo)[1:]
+            layout[eje] = {**layout.get(eje, {}), 'type': 'date'}
+            nulos = np.isnat(arreglo)
+            arreglo = arreglo.astype('datetime64[ms]').astype(np.int64).astype(float)
+            arreglo[nulos] = np.nan
+        elif np.issubdtype(arreglo.dtype, np.datetime64):
+            continue
+        datos[atributo] = _mas_liviano(arreglo)
+    marcador = datos.get('marker')
+    if isinstance(marcador, dict):
+        for atributo in ('color', 'size'):
+            if isinstance(marcador.get(atributo), (list, tuple, np.ndarray)):
+                arreglo = _arreglo_compacto(marcador[atributo])
+                if arreglo is not None and not np.issubdtype(arreglo.dtype, np.datetime64):
+                    marcador[atributo] = _mas_liviano(arreglo)
+
+    puntos = len(datos['x']) if datos.get('x') is not None and not isinstance(datos['x'], str) else 0
+    if datos.get('type') == 'scatter' and puntos > UMBRAL_WEBGL:
+        datos['type'] = 'scattergl'
+    return datos
+
+
+def compactar_figura(figura):
+    layout = figura.layout.to_plotly_json()
+    datos = [_compactar_traza(traza, layout) for traza in figura.data]
+    # skip_invalid: atributos de scatter que scattergl no tiene (p. ej. cliponaxis)
+    return go.Figure(data=datos, layout=layout, skip_invalid=True)
+
+
+# El peso del spec JSON sirve de tamaño: recorrer la figura sería más caro
+@en_cache("graficas", tamano=lambda resultado: resultado[1])
+def _figura_en_cache(clave, version, parametros, _construir):
+    figura = compactar_figura(_construir())
+    return figura, len(plotly.io.to_json(figura, validate=False))
+
+
+def iniciar_registro_graficas():
+    """Llamar al inicio del script: reinicia el peso de las gráficas del rerun."""
+    st.session_state[CLAVE_PESOS] = {}
+
+
+def pesos_graficas():
+    """{clave: bytes} de las gráficas enviadas en este rerun."""
+    return st.session_state.get(CLAVE_PESOS, {})
+
+
+def mostrar_grafica(construir, clave, version=None, parametros=(), use_container_width=True, **opciones):
+    """
+    construir: función sin argumentos que arma la figura. version y
+    parametros (hashables) identifican los datos y filtros que usa; sin
+    version la figura se arma en cada rerun.
+    """
+    if version is None:
+        figura = compactar_figura(construir())
+        peso = len(plotly.io.to_json(figura, validate=False))
+    else:
+        figura, peso = _figura_en_cache(clave, version, parametros, construir)
+    st.session_state.setdefault(CLAVE_PESOS, {})[clave] = peso
+    st.plotly_chart(figura, use_container_width=use_container_width, **opciones)
+
+
+def mostrar_pesos_graficas():
+    pesos = pesos_graficas()
+    if len(pesos) == 0:
+        return
+    with st.expander(f"📦 Gráficas: {sum(pesos.values()) / 1024:,.1f} KB en este rerun"):
+        for clave, peso in sorted(pesos.items(), key=lambda p: -p[1]):
+            st.caption(f"{clave}: {peso / 1024:,.1f} KB")
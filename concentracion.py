@@ -0,0 +1,57 @@
+# =====================================================
+# CONCENTRACIÓN DEL CATÁLOGO COMPLETO
+# Un solo ordenamiento y una suma acumulada por versión de los datos.
+# Con esos arreglos se responde la participación del top-k para cualquier
+# k, la curva de Lorenz y el coeficiente de Gini sin volver a ordenar.
+
+import numpy as np
+
+PUNTOS_CURVA = 200
+
+
+def calcular_concentracion(valores, nombres=None):
+    valores = np.asarray(valores, dtype=float)
+    validos = ~np.isnan(valores)
+    valores = valores[validos]
+
+    orden = np.argsort(-valores, kind='stable')
+    descendente = valores[orden]
+    total = descendente.sum()
+    n = len(descendente)
+
+    # Participación acumulada de los k primeros (k = 1..n)
+    participacion = np.cumsum(descendente) / total if total > 0 else np.zeros(n)
+
+    # Lorenz: población ordenada de menor a mayor contra su participación acumulada
+    lorenz = np.concatenate(([0.0], np.cumsum(descendente[::-1]) / total)) if total > 0 else np.zeros(n + 1)
+    # Gini = 1 - 2 * área bajo la curva de Lorenz (regla del trapecio)
+    gini = 1 - (lorenz[1:] + lorenz[:-1]).sum() / n if n > 0 and total > 0 else 0.0
+
+    return {
+        'n': n,
+        'total': total,
+        'participacion': participacion,
+        'lorenz': lorenz,
+        'gini': float(gini),
+        'nombres': np.asarray(nombres)[validos][orden] if nombres is not None else None,
+    }
+
+
+def participacion_top_k(concentracion, k):
+    """Fracción del total que concentran los k primeros."""
+    if concentracion['n'] == 0 or k <= 0:
+        return 0.0
+    return float(concentracion['participacion'][min(k, concentracion['n']) - 1])
+
+
+def curva_lorenz(concentracion, puntos=PUNTOS_CURVA):
+    """Curva de Lorenz reducida a `puntos` puntos para graficar."""
+    n = concentracion['n']
+    posiciones = np.unique(np.linspace(0, n, min(puntos, n + 1)).round().astype(int))
+    return posiciones / max(n, 1), concentracion['lorenz'][posiciones]
+
+
+def curva_top_k(concentracion, hasta_k):
+    """Participación acumulada (en %) para k = 1..hasta_k."""
+    hasta_k = min(hasta_k, concentracion['n'])
+    return np.arange(1, hasta_k + 1), concentracion['participacion'][:hasta_k] * 100
@@ -0,0 +1,106 @@
+# =====================================================
+# RESÚMENES DE CUANTILES FUSIONABLES (estilo t-digest)
+#
+# Cada resumen guarda pocos centroides (media, peso). Dos resúmenes se
+# fusionan concatenando centroides y comprimiendo otra vez, así que la
+# mediana o el p99 de cualquier combinación de filtros se obtiene sin
+# volver a recorrer las filas. Mientras haya a lo sumo COMPRESION valores
+# no se comprime: se guardan tal cual y los cuantiles son exactos (la
+# misma interpolación lineal de numpy que usa el resto de la serie).
+
+import numpy as np
+
+COMPRESION = 200
+
+
+def _escala_k1(q, compresion):
+    # Función de escala k1 de t-digest: centroides pequeños en las colas
+    return compresion / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1)
+
+
+class ResumenCuantiles:
+    def __init__(self, medias=(), pesos=(), compresion=COMPRESION, minimo=np.nan, maximo=np.nan):
+        self.compresion = compresion
+        self.medias = np.asarray(medias, dtype=float)
+        self.pesos = np.asarray(pesos, dtype=float)
+        self.minimo = minimo
+        self.maximo = maximo
+        if len(self.medias) > 0:
+            self.minimo = np.nanmin([self.minimo, self.medias.min()])
+            self.maximo = np.nanmax([self.maximo, self.medias.max()])
+        self._comprimir()
+
+    @classmethod
+    def desde_valores(cls, valores, compresion=COMPRESION):
+        valores = np.asarray(valores, dtype=float)
+        valores = valores[~np.isnan(valores)]
+        return cls(valores, np.ones(len(valores)), compresion)
+
+    @property
+    def total(self):
+        return float(self.pesos.sum())
+
+    def fusionar(self, *otros):
+        resumenes = [self, *otros]
+        return ResumenCuantiles(
+            np.concatenate([r.medias for r in resumenes]),
+            np.concatenate([r.pesos for r in resumenes]),
+            self.compresion,
+            np.nanmin([r.minimo for r in resumenes]),
+            np.nanmax([r.maximo for r in resumenes]),
+        )
+
+    @property
+    def exacto(self):
+        # Solo valores crudos (peso 1): nunca se comprimió
+        return bool(np.all(self.pesos == 1))
+
+    def _comprimir(self):
+        if len(self.medias) <= 1:
+            return
+        orden = np.argsort(self.medias, kind='stable')
+        medias, pesos = self.medias[orden], self.pesos[orden]
+        if self.exacto and len(medias) <= self.compresion:
+            self.medias, self.pesos = medias, pesos
+            return
+
+        # Centroides consecutivos cuyo rango de k cabe en una unidad se unen
+        total = pesos.sum()
+        q_izquierda = (np.cumsum(pesos) - pesos) / total
+        k = _escala_k1(q_izquierda, self.compresion) - _escala_k1(0, self.compresion)
+        grupos = np.floor(k).astype(int)
+        _, grupos = np.unique(grupos, return_inverse=True)
+
+        nuevos_pesos = np.bincount(grupos, weights=pesos)
+        self.medias = np.bincount(grupos, weights=medias * pesos) / nuevos_pesos
+        self.pesos = nuevos_pesos
+
+    def cuantil(self, q):
+        if len(self.medias) == 0:
+            return np.nan
+        if len(self.medias) == 1:
+            return float(self.medias[0])
+        if self.exacto:
+            return float(np.quantile(self.medias, q))
+        centros = np.cumsum(self.pesos) - self.pesos / 2
+        posiciones = np.concatenate(([0.0], centros, [self.total]))
+        valores = np.concatenate(([self.minimo], self.medias, [self.maximo]))
+        return float(np.interp(q * self.total, posiciones, valores))
+
+
+def fusionar_resumenes(resumenes):
+    resumenes = [r for r in resumenes if r is not None]
+    if len(resumenes) == 0:
+        return ResumenCuantiles()
+    return resumenes[0].fusionar(*resumenes[1:])
+
+
+def construir_resumenes(df, columnas_celda, metricas, compresion=COMPRESION):
+    # Un resumen por celda de filtros y por métrica
+    resumenes = {}
+    for celda, grupo in df.groupby(columnas_celda):
+        resumenes[celda] = {
+            metrica: ResumenCuantiles.desde_valores(grupo[metrica].to_numpy(), compresion)
+            for metrica in metricas
+        }
+    return resumenes
@@ -0,0 +1,84 @@
+# =====================================================
+# COLUMNAS DERIVADAS
+# Métricas que salen de las columnas base (cocientes entre plataformas,
+# reproducciones por oyente) se calculan una sola vez por versión del
+# dataset, al cargarlo, en una pasada vectorizada con numpy. Cada una se
+# guarda junto a las columnas base con su máscara de validez,
+# <nombre>_valido: donde es False el valor es NaN (divisor en cero o un
+# dato que falta). Los análisis leen la columna ya calculada en lugar de
+# recalcularla en cada rerun; una métrica nueva solo se agrega a
+# COLUMNAS_DERIVADAS.
+
+import numpy as np
+import pandas as pd
+
+SUFIJO_VALIDEZ = "_valido"
+
+
+class Derivada:
+    """
+    requiere: columnas que usa (base o derivadas declaradas antes).
+    valor(c) y valido(c) reciben {columna: arreglo float con NaN} y
+    devuelven arreglos; valor solo se conserva donde valido es True.
+    """
+
+    def __init__(self, nombre, requiere, valor, valido, descripcion=""):
+        self.nombre = nombre
+        self.requiere = tuple(requiere)
+        self.valor = valor
+        self.valido = valido
+        self.descripcion = descripcion
+
+
+COLUMNAS_DERIVADAS = {
+    'artists_combined': [
+        Derivada(
+            'engagement_ratio', ('lastfm_listeners', 'spotify_followers'),
+            valor=lambda c: c['lastfm_listeners'] / (c['spotify_followers'] + 1),
+            valido=lambda c: (c['lastfm_listeners'] > 0) & (c['spotify_followers'] > 0),
+            descripcion="Oyentes en Last.fm por seguidor en Spotify (Análisis 4)",
+        ),
+        Derivada(
+            'reproducciones_por_oyente', ('lastfm_playcount', 'lastfm_listeners'),
+            valor=lambda c: c['lastfm_playcount'] / c['lastfm_listeners'],
+            valido=lambda c: (c['lastfm_listeners'] > 0) & ~np.isnan(c['lastfm_playcount']),
+            descripcion="Veces que cada oyente reproduce al artista (Análisis 1)",
+        ),
+    ],
+}
+
+
+def columna_validez(nombre):
+    return nombre + SUFIJO_VALIDEZ
+
+
+def _numeros(serie):
+    # Enteros nullable, decimales y objetos a float con NaN en los faltantes
+    return pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+def derivar(dataset, df):
+    """
+    Devuelve df con las columnas derivadas de `dataset` y sus máscaras.
+    Se salta las que necesitan columnas que df no tiene (lecturas parciales).
+    """
+    if df is None:
+        return df
+    columnas = {}
+    nuevas = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for derivada in COLUMNAS_DERIVADAS.get(dataset, []):
+            if not all(c in columnas or c in df.columns for c in derivada.requiere):
+                continue
+            for c in derivada.requiere:
+                if c not in columnas:
+                    columnas[c] = _numeros(df[c])
+            valido = np.asarray(derivada.valido(columnas), dtype=bool)
+            valor = np.where(valido, derivada.valor(columnas), np.nan)
+            columnas[derivada.nombre] = valor
+            nuevas[derivada.nombre] = valor
+            nuevas[columna_validez(derivada.nombre)] = valido
+    if not nuevas:
+        return df
+    # Sin copiar las columnas base (copy-on-write)
+    return df.assign(**nuevas)
@@ -0,0 +1,146 @@
+# =====================================================
+# EMPAREJAMIENTO DE ARTISTAS ENTRE PLATAFORMAS
+# Los nombres de Last.fm y Spotify no siempre coinciden ("The Weeknd" vs
+# "the weeknd", "Beyoncé" vs "Beyonce", "A & B" vs "A and B"). Primero se
+# normalizan (sin perder letras de otros alfabetos: 방탄소년단, Кино) y
+# se unen por hash; lo que queda se compara solo contra los candidatos
+# que comparten trigramas (índice invertido), nunca todos contra todos.
+
+import re
+import time
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+UMBRAL_SIMILITUD = 0.8
+
+_PATRON_FEAT = re.compile(r"\s+(feat\.?|ft\.?|featuring)\s.*$")
+# Letras y dígitos de cualquier alfabeto se conservan; "_" cuenta como símbolo
+_PATRON_NO_ALFANUMERICO = re.compile(r"[^\w ]+|_")
+_PATRON_ESPACIOS = re.compile(r"\s+")
+
+
+def _es_acento(caracter):
+    # Solo los diacríticos combinables (U+0300-U+036F: tildes, diéresis,
+    # acentos de latín, griego y cirílico); las marcas de otros alfabetos,
+    # como el dakuten japonés, cambian la letra y se conservan
+    return "\u0300" <= caracter <= "\u036f"
+
+
+def normalizar_nombre(nombre):
+    if not isinstance(nombre, str):
+        return ""
+    nombre = unicodedata.normalize("NFKD", nombre)
+    # NFC vuelve a componer lo que NFKD separó (sílabas hangul, kana con dakuten)
+    nombre = unicodedata.normalize("NFC", "".join(c for c in nombre if not _es_acento(c))).casefold()
+    nombre = _PATRON_FEAT.sub("", nombre)
+    nombre = nombre.replace("&", " and ")
+    nombre = _PATRON_NO_ALFANUMERICO.sub(" ", nombre)
+    nombre = _PATRON_ESPACIOS.sub(" ", nombre).strip()
+    if nombre.startswith("the "):
+        nombre = nombre[4:]
+    return nombre
+
+
+def clave_artista(nombre):
+    """
+    Nombre normalizado para comparar. Si la normalización lo deja vacío
+    (un nombre hecho solo de símbolos, como "!!!"), el nombre completo en
+    minúsculas: dos nombres así solo coinciden si son iguales.
+    """
+    normalizado = normalizar_nombre(nombre)
+    if normalizado or not isinstance(nombre, str):
+        return normalizado
+    return nombre.strip().casefold()
+
+
+def trigramas(nombre):
+    texto = f"  {nombre} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceArtistas:
+    """Índice de nombres de referencia: hash exacto + índice invertido de trigramas."""
+
+    def __init__(self, nombres):
+        self.nombres = list(nombres)
+        self.normalizados = [clave_artista(n) for n in self.nombres]
+        self.exacto = {}
+        for posicion, normalizado in enumerate(self.normalizados):
+            self.exacto.setdefault(normalizado, posicion)
+
+        invertido = defaultdict(list)
+        tamanos = []
+        for posicion, normalizado in enumerate(self.normalizados):
+            grams = trigramas(normalizado)
+            tamanos.append(len(grams))
+            for gram in grams:
+                invertido[gram].append(posicion)
+        self.invertido = {gram: np.array(posiciones, dtype=np.int32) for gram, posiciones in invertido.items()}
+        self.tamanos = np.array(tamanos, dtype=np.int32)
+
+    def buscar(self, nombre, umbral=UMBRAL_SIMILITUD):
+        """Devuelve (posición, similitud, método) o (None, 0, None)."""
+        normalizado = clave_artista(nombre)
+        if not normalizado:
+            return None, 0.0, None
+        if normalizado in self.exacto:
+            return self.exacto[normalizado], 1.0, "exacto"
+
+        similares = self.similares(normalizado, limite=1)
+        if not similares:
+            return None, 0.0, None
+        mejor, mejor_similitud = similares[0]
+        if mejor_similitud >= umbral:
+            return mejor, mejor_similitud, "trigramas"
+        return None, mejor_similitud, None
+
+    def similares(self, normalizado, limite=10):
+        """Las `limite` posiciones más parecidas a un nombre ya normalizado, con su similitud."""
+        # Solo se cuentan trigramas en las listas del índice invertido: los
+        # nombres que no comparten ninguno nunca se comparan
+        grams = trigramas(normalizado)
+        listas = [self.invertido[g] for g in grams if g in self.invertido]
+        if not listas:
+            return []
+        # Conteo sobre las postings concatenadas: el costo depende de cuántas
+        # hay, no del tamaño del catálogo. Los candidatos salen ordenados
+        candidatos, comunes = np.unique(np.concatenate(listas), return_counts=True)
+
+        # Coeficiente de Dice sobre trigramas
+        similitudes = 2 * comunes / (len(grams) + self.tamanos[candidatos])
+        mejores = np.argsort(-similitudes, kind='stable')[:limite]
+        return [(int(candidatos[i]), float(similitudes[i])) for i in mejores]
+
+
+def emparejar_artistas(nombres_origen, indice, umbral=UMBRAL_SIMILITUD):
+    """
+    Empareja cada nombre distinto de nombres_origen contra el índice.
+    Devuelve (DataFrame con una fila por nombre, estadísticas).
+    """
+    inicio = time.perf_counter()
+    distintos = pd.Series(nombres_origen).dropna().unique()
+
+    filas = []
+    for nombre in distintos:
+        posicion, similitud, metodo = indice.buscar(nombre, umbral)
+        filas.append({
+            'artist_name': nombre,
+            'artist_name_referencia': indice.nombres[posicion] if posicion is not None else None,
+            'similitud': similitud,
+            'metodo': metodo,
+        })
+    resultado = pd.DataFrame(filas, columns=['artist_name', 'artist_name_referencia', 'similitud', 'metodo'])
+
+    emparejados = resultado['metodo'].notna()
+    estadisticas = {
+        'nombres': len(resultado),
+        'emparejados': int(emparejados.sum()),
+        'exactos': int((resultado['metodo'] == "exacto").sum()),
+        'por_trigramas': int((resultado['metodo'] == "trigramas").sum()),
+        'tasa_emparejamiento': float(emparejados.mean()) if len(resultado) else 0.0,
+        'segundos': time.perf_counter() - inicio,
+    }
+    return resultado, estadisticas
@@ -0,0 +1,13 @@
+#!/bin/sh
+# Arranque del contenedor: Streamlit se levanta de inmediato y, en paralelo,
+# precalentar.py espera a que responda y ejecuta la app una vez dentro del
+# servidor. El healthcheck solo pasa cuando existen ambos.
+set -e
+
+export ARRANQUE_CONTENEDOR="$(date +%s.%N)"
+
+python precalentar.py &
+
+exec streamlit run music_analysis_dashboard.py \
+    --server.port=8502 \
+    --server.address=0.0.0.0
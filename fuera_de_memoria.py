@@ -0,0 +1,107 @@
+# =====================================================
+# PROCESAMIENTO FUERA DE MEMORIA (POR ROW GROUP)
+# Para datasets más grandes que la RAM del contenedor: el Parquet se baja
+# a disco y se recorre un row group a la vez. Cada función guarda solo un
+# estado acotado (un heap de n filas, una tabla hash por grupo o los
+# momentos de Welford), así que la memoria no crece con el dataset.
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from almacenamiento import descargar_a_disco
+
+
+def iterar_row_groups(key, columnas=None):
+    archivo = pq.ParquetFile(descargar_a_disco(key))
+    for i in range(archivo.num_row_groups):
+        yield archivo.read_row_group(i, columns=columnas).to_pandas()
+
+
+def columnas_dataset(key):
+    return pq.ParquetFile(descargar_a_disco(key)).schema_arrow.names
+
+
+def contar_filas(key):
+    return pq.ParquetFile(descargar_a_disco(key)).metadata.num_rows
+
+
+def leer_columna(key, columna):
+    # Una sola columna numérica cabe aunque la tabla completa no
+    partes = [grupo[columna].to_numpy(dtype=float) for grupo in iterar_row_groups(key, [columna])]
+    return np.concatenate(partes) if partes else np.array([])
+
+# =====================================================
+# TOP N CON HEAP ACOTADO
+
+def top_n(key, columna, n, columnas=None):
+    """Las n filas con mayor `columna`, fusionando el top de cada row group."""
+    columnas = list(dict.fromkeys((columnas or []) + [columna]))
+    mejores = None
+    for grupo in iterar_row_groups(key, columnas):
+        grupo = grupo.dropna(subset=[columna]).nlargest(n, columna)
+        mejores = grupo if mejores is None else pd.concat([mejores, grupo]).nlargest(n, columna)
+    return (mejores if mejores is not None else pd.DataFrame(columns=columnas)).reset_index(drop=True)
+
+# =====================================================
+# AGREGACIÓN POR GRUPO CON TABLA HASH
+
+def agregar_por_grupo(key, columna_grupo, columna_suma=None):
+    """Conteo (y suma opcional) por valor de `columna_grupo`, como value_counts/groupby."""
+    columnas = [columna_grupo] + ([columna_suma] if columna_suma else [])
+    conteos, sumas = {}, {}
+    for grupo in iterar_row_groups(key, columnas):
+        parcial = grupo.groupby(columna_grupo)
+        for valor, cantidad in parcial.size().items():
+            conteos[valor] = conteos.get(valor, 0) + cantidad
+        if columna_suma:
+            for valor, suma in parcial[columna_suma].sum().items():
+                sumas[valor] = sumas.get(valor, 0) + suma
+
+    resultado = pd.DataFrame({columna_grupo: list(conteos), 'conteo': list(conteos.values())})
+    if columna_suma:
+        resultado['suma'] = resultado[columna_grupo].map(sumas)
+    return resultado.sort_values('conteo', ascending=False, ignore_index=True)
+
+# =====================================================
+# CORRELACIÓN EN LÍNEA (WELFORD / CHAN)
+
+class MomentosEnLinea:
+    """Medias, varianzas y covarianza de dos columnas, combinables por bloques."""
+
+    def __init__(self):
+        self.n = 0
+        self.media_x = self.media_y = 0.0
+        self.m2_x = self.m2_y = self.c_xy = 0.0
+
+    def agregar_bloque(self, x, y):
+        validos = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[validos], y[validos]
+        n_b = len(x)
+        if n_b == 0:
+            return
+        media_x_b, media_y_b = x.mean(), y.mean()
+        dx, dy = x - media_x_b, y - media_y_b
+        m2_x_b, m2_y_b, c_xy_b = (dx * dx).sum(), (dy * dy).sum(), (dx * dy).sum()
+
+        # Fórmula de Chan para combinar los momentos del bloque con los acumulados
+        n = self.n + n_b
+        delta_x, delta_y = media_x_b - self.media_x, media_y_b - self.media_y
+        self.m2_x += m2_x_b + delta_x * delta_x * self.n * n_b / n
+        self.m2_y += m2_y_b + delta_y * delta_y * self.n * n_b / n
+        self.c_xy += c_xy_b + delta_x * delta_y * self.n * n_b / n
+        self.media_x += delta_x * n_b / n
+        self.media_y += delta_y * n_b / n
+        self.n = n
+
+    def correlacion(self):
+        if self.n < 2 or self.m2_x == 0 or self.m2_y == 0:
+            return np.nan
+        return self.c_xy / np.sqrt(self.m2_x * self.m2_y)
+
+
+def correlacion(key, columna_x, columna_y):
+    momentos = MomentosEnLinea()
+    for grupo in iterar_row_groups(key, [columna_x, columna_y]):
+        momentos.agregar_bloque(grupo[columna_x].to_numpy(dtype=float), grupo[columna_y].to_numpy(dtype=float))
+    return momentos.correlacion()
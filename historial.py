@@ -0,0 +1,149 @@
+# =====================================================
+# HISTORIAL DE SNAPSHOTS DE ARTISTAS
+# Cada versión de artists_combined se guarda como un snapshot compacto
+# (solo nombre y métricas) en history/artists/fecha=AAAA-MM-DD.parquet.
+# El crecimiento se calcula solo entre un snapshot y el anterior y se
+# guarda aparte, así que agregar un día nuevo no vuelve a unir todo el
+# historial. Los snapshots se descubren de dos fuentes:
+#   - prefijos con fecha: clean/snapshots/AAAA-MM-DD/artists_combined.parquet
+#   - versiones del objeto clean/artists_combined.parquet (bucket versionado)
+#
+# Uso: python historial.py
+
+import json
+import re
+
+import pandas as pd
+
+from almacenamiento import (
+    CARPETA_CLEAN, DATASETS, escribir_objeto, escribir_parquet, leer_objeto, leer_parquet,
+    ObjetoNoEncontrado, listar_objetos, listar_versiones,
+)
+
+CARPETA_SNAPSHOTS = f"{CARPETA_CLEAN}snapshots/"
+CARPETA_HISTORIAL = "history/"
+KEY_ESTADO = f"{CARPETA_HISTORIAL}estado.json"
+
+METRICAS_CRECIMIENTO = ['lastfm_listeners', 'spotify_followers', 'spotify_popularity']
+_PATRON_FECHA = re.compile(r"(\d{4}-\d{2}-\d{2})/artists_combined\.parquet$")
+
+
+def _key_snapshot(fecha):
+    return f"{CARPETA_HISTORIAL}artists/fecha={fecha}.parquet"
+
+def _key_crecimiento(fecha):
+    return f"{CARPETA_HISTORIAL}crecimiento/fecha={fecha}.parquet"
+
+# =====================================================
+# DESCUBRIR SNAPSHOTS
+
+def listar_snapshots():
+    """Devuelve {fecha: {'key', 'version_id'}} con un snapshot por día."""
+    snapshots = {}
+
+    for version in sorted(listar_versiones(DATASETS['artists_combined']), key=lambda v: v["LastModified"]):
+        fecha = version["LastModified"].strftime("%Y-%m-%d")
+        # Si hay varias versiones el mismo día se queda la última
+        snapshots[fecha] = {'key': version["Key"], 'version_id': version["VersionId"]}
+
+    for objeto in listar_objetos(CARPETA_SNAPSHOTS):
+        coincidencia = _PATRON_FECHA.search(objeto["Key"])
+        if coincidencia:
+            snapshots[coincidencia.group(1)] = {'key': objeto["Key"], 'version_id': None}
+
+    return dict(sorted(snapshots.items()))
+
+# =====================================================
+# ESTADO DEL HISTORIAL
+
+def leer_estado():
+    try:
+        return json.loads(leer_objeto(KEY_ESTADO, usar_cache=False))
+    except ObjetoNoEncontrado:
+        return {'fechas': []}
+
+def guardar_estado(estado):
+    escribir_objeto(KEY_ESTADO, json.dumps(estado).encode())
+
+# =====================================================
+# CÁLCULO INCREMENTAL
+
+def compactar_snapshot(df):
+    df = df[['artist_name'] + METRICAS_CRECIMIENTO].dropna(subset=['artist_name'])
+    df = df.drop_duplicates('artist_name')
+    return df.astype({m: 'float32' for m in METRICAS_CRECIMIENTO})
+
+def calcular_crecimiento(anterior, actual, fecha_anterior, fecha):
+    unidos = actual.merge(anterior, on='artist_name', suffixes=('', '_anterior'))
+    crecimiento = pd.DataFrame({'artist_name': unidos['artist_name']})
+    for metrica in METRICAS_CRECIMIENTO:
+        crecimiento[f"{metrica}_anterior"] = unidos[f"{metrica}_anterior"]
+        crecimiento[f"delta_{metrica}"] = unidos[metrica] - unidos[f"{metrica}_anterior"]
+    crecimiento['fecha'] = fecha
+    crecimiento['fecha_anterior'] = fecha_anterior
+    crecimiento['dias'] = (pd.Timestamp(fecha) - pd.Timestamp(fecha_anterior)).days
+    return crecimiento
+
+def actualizar_historial():
+    """Procesa solo los snapshots nuevos. Devuelve las fechas agregadas."""
+    estado = leer_estado()
+    procesadas = set(estado['fechas'])
+    nuevas = [(f, d) for f, d in listar_snapshots().items() if f not in procesadas]
+    if estado['fechas']:
+        # Solo se agregan fechas posteriores a la última procesada
+        nuevas = [(f, d) for f, d in nuevas if f > estado['fechas'][-1]]
+
+    anterior = None
+    if estado['fechas'] and nuevas:
+        anterior = leer_parquet(_key_snapshot(estado['fechas'][-1]), usar_cache=False)
+
+    for fecha, descriptor in nuevas:
+        actual = compactar_snapshot(leer_parquet(
+            descriptor['key'], columnas=['artist_name'] + METRICAS_CRECIMIENTO,
+            version_id=descriptor['version_id'], usar_cache=False
+        ))
+        escribir_parquet(_key_snapshot(fecha), actual)
+        if anterior is not None:
+            escribir_parquet(
+                _key_crecimiento(fecha),
+                calcular_crecimiento(anterior, actual, estado['fechas'][-1], fecha)
+            )
+        estado['fechas'].append(fecha)
+        guardar_estado(estado)
+        anterior = actual
+
+    return [fecha for fecha, _ in nuevas]
+
+# =====================================================
+# RANKING DE CRECIMIENTO
+
+def leer_crecimiento(fechas):
+    # Los deltas existen desde el segundo snapshot
+    partes = [leer_parquet(_key_crecimiento(f), usar_cache=False) for f in fechas[1:]]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+def ranking_crecimiento(crecimiento, metrica, relativo=False, top_n=20):
+    """Suma los deltas del periodo por artista; relativo divide entre el valor inicial."""
+    if crecimiento.empty:
+        return crecimiento
+    por_artista = (
+        crecimiento.sort_values('fecha')
+        .groupby('artist_name')
+        .agg(
+            crecimiento=(f"delta_{metrica}", 'sum'),
+            valor_inicial=(f"{metrica}_anterior", 'first'),
+            desde=('fecha_anterior', 'first'),
+            hasta=('fecha', 'last'),
+        )
+        .reset_index()
+    )
+    por_artista['valor_final'] = por_artista['valor_inicial'] + por_artista['crecimiento']
+    if relativo:
+        inicial = por_artista['valor_inicial'].where(por_artista['valor_inicial'] > 0)
+        por_artista['crecimiento'] = por_artista['crecimiento'] / inicial * 100
+    return por_artista.dropna(subset=['crecimiento']).nlargest(top_n, 'crecimiento')
+
+
+if __name__ == "__main__":
+    agregadas = actualizar_historial()
+    print(f"Snapshots agregados: {agregadas or 'ninguno'}")
@@ -0,0 +1,88 @@
+# =====================================================
+# METADATOS DE LOS PARQUET (SOLO EL FOOTER)
+# Un Parquet termina en: footer (metadata) + 4 bytes con su largo + "PAR1".
+# El footer trae el número de filas y, por row group, el mínimo y máximo
+# de cada columna. Se lee solo el final del objeto (en S3 con GETs por
+# rango, normalmente uno solo de unos KB), así los KPIs no esperan a que
+# se descargue y decodifique el dataset completo.
+
+import io
+import os
+import struct
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from almacenamiento import CACHE_LOCAL, almacen, version_en_disco
+
+# Primer GET: si el footer cabe aquí ya no hace falta un segundo
+LECTURA_INICIAL = 16 * 1024
+MAGIC = b"PAR1"
+
+
+def leer_footer(key, version=None):
+    """
+    Devuelve (FileMetaData, peticiones, bytes leídos, tamaño del objeto).
+    La copia en CACHE_LOCAL solo se usa si se bajó con `version` (el ETag
+    vigente); sin versión, o si no coincide, se lee del almacén.
+    """
+    if (almacen.remoto and CACHE_LOCAL and version is not None
+            and os.path.exists(os.path.join(CACHE_LOCAL, key)) and version_en_disco(key) == version):
+        ruta = os.path.join(CACHE_LOCAL, key)
+        return pq.read_metadata(ruta), 0, 0, os.path.getsize(ruta)
+
+    cola, tamano = almacen.leer_cola(key, LECTURA_INICIAL)
+    peticiones, leidos = 1, len(cola)
+    if cola[-4:] != MAGIC:
+        raise ValueError(f"{key} no es un archivo Parquet")
+
+    largo_footer = struct.unpack("<I", cola[-8:-4])[0]
+    if largo_footer + 8 > len(cola):
+        cola, _ = almacen.leer_cola(key, largo_footer + 8)
+        peticiones, leidos = peticiones + 1, leidos + len(cola)
+
+    # pyarrow solo necesita el final del archivo para interpretar el footer
+    footer = MAGIC + cola[-(largo_footer + 8):]
+    return pq.read_metadata(io.BytesIO(footer)), peticiones, leidos, tamano
+
+
+def leer_metadatos(key, version=None):
+    """
+    Filas, columnas y rango (mínimo, máximo) por columna según las
+    estadísticas de los row groups. Una columna queda en (None, None) si
+    algún row group no trae estadísticas o si es anidada (list, struct, map).
+    """
+    metadata, peticiones, leidos, tamano = leer_footer(key, version)
+    esquema = metadata.schema.to_arrow_schema()
+    columnas = esquema.names
+    planas = {campo.name for campo in esquema if not pa.types.is_nested(campo.type)}
+
+    # Las estadísticas son por columna hoja de Parquet, no por campo de
+    # arrow: una columna list o struct ocupa una o más hojas y corre las
+    # posiciones de las siguientes. Se recorren las hojas por su ruta
+    rangos = {columna: (None, None) for columna in columnas}
+    for hoja in range(metadata.num_columns):
+        columna = metadata.schema.column(hoja).path
+        if columna not in planas:
+            continue
+        minimo = maximo = None
+        for grupo in range(metadata.num_row_groups):
+            if metadata.row_group(grupo).num_rows == 0:
+                continue
+            estadisticas = metadata.row_group(grupo).column(hoja).statistics
+            if estadisticas is None or not estadisticas.has_min_max:
+                minimo = maximo = None
+                break
+            minimo = estadisticas.min if minimo is None else min(minimo, estadisticas.min)
+            maximo = estadisticas.max if maximo is None else max(maximo, estadisticas.max)
+        rangos[columna] = (minimo, maximo)
+
+    return {
+        'filas': metadata.num_rows,
+        'row_groups': metadata.num_row_groups,
+        'columnas': columnas,
+        'rangos': rangos,
+        'peticiones': peticiones,
+        'bytes_leidos': leidos,
+        'tamano': tamano,
+    }
@@ -0,0 +1,265 @@
+# =====================================================
+# MODO APROXIMADO: MUESTRAS ESTRATIFICADAS
+# En tablas muy grandes, filtrar y agregar todas las filas en cada
+# interacción es lento aunque haya índices. Por cada versión de los datos
+# se guarda una muestra estratificada (por banda de popularidad, por
+# servidor...): cada estrato aporta filas en proporción a su tamaño, con
+# un mínimo para que los estratos chicos no desaparezcan. Las gráficas y
+# KPIs se dibujan primero desde la muestra, con intervalos de confianza
+# del 95 %, mientras el resultado exacto se calcula en segundo plano; al
+# terminar, la app se vuelve a ejecutar y lo muestra en su lugar.
+#
+# Configuración por variables de entorno:
+#   MODO_APROXIMADO          auto (por defecto): solo tablas de
+#                            APROXIMADO_DESDE_FILAS filas o más; 1 siempre; 0 nunca
+#   APROXIMADO_DESDE_FILAS   1000000
+#   TAMANO_MUESTRA           filas de cada muestra (50000)
+#   MINIMO_POR_ESTRATO       filas mínimas por estrato (30)
+#   MAX_REVISIONES_EXACTO    veces que la página revisa si terminó (120)
+
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cache_memoria import NO_ESTA, memoria
+
+MODO_APROXIMADO = os.environ.get("MODO_APROXIMADO", "auto")
+APROXIMADO_DESDE_FILAS = int(os.environ.get("APROXIMADO_DESDE_FILAS", "1000000"))
+TAMANO_MUESTRA = int(os.environ.get("TAMANO_MUESTRA", "50000"))
+MINIMO_POR_ESTRATO = int(os.environ.get("MINIMO_POR_ESTRATO", "30"))
+MAX_REVISIONES = int(os.environ.get("MAX_REVISIONES_EXACTO", "120"))
+
+Z_95 = 1.959963984540054
+# Cada cuánto revisa la página si ya terminó el cálculo exacto
+INTERVALO_REVISION = 1.0  # segundos
+
+
+def modo_aproximado(filas):
+    if MODO_APROXIMADO == "1":
+        return True
+    if MODO_APROXIMADO == "0":
+        return False
+    return filas >= APROXIMADO_DESDE_FILAS
+
+# =====================================================
+# ESTIMACIONES
+
+class Estimacion:
+    """Valor estimado y semiancho del intervalo de confianza del 95 %."""
+
+    def __init__(self, valor, error):
+        self.valor = float(valor)
+        self.error = float(error)
+
+    @property
+    def intervalo(self):
+        return self.valor - self.error, self.valor + self.error
+
+    def texto(self, formato="{:,.0f}"):
+        return f"≈ {formato.format(self.valor)} ± {formato.format(self.error)}"
+
+
+class MuestraEstratificada:
+    """
+    estratos: columna de df (o arreglo alineado con df) que define los estratos.
+    filas: las filas muestreadas, con el índice original de df. Los
+    estimadores reciben un subconjunto de filas (la muestra ya filtrada),
+    así que el índice de df no debe tener repetidos.
+    """
+
+    def __init__(self, df, estratos, tamano=TAMANO_MUESTRA, minimo=MINIMO_POR_ESTRATO, semilla=0):
+        valores = df[estratos] if isinstance(estratos, str) else estratos
+        codigos, self.categorias = pd.factorize(np.asarray(valores), use_na_sentinel=False)
+        self.poblacion = np.bincount(codigos, minlength=len(self.categorias))
+        total = max(1, len(df))
+        # Asignación proporcional con mínimo; un estrato chico entra completo
+        cuotas = np.maximum(minimo, np.round(tamano * self.poblacion / total)).astype(int)
+        cuotas = np.minimum(self.poblacion, cuotas)
+
+        # Una clave al azar por fila; en cada estrato se quedan las `cuota` menores
+        claves = np.random.default_rng(semilla).random(len(df))
+        orden = np.lexsort((claves, codigos))
+        inicio = np.concatenate(([0], np.cumsum(self.poblacion)[:-1]))
+        posicion_en_estrato = np.arange(len(df)) - inicio[codigos[orden]]
+        elegidas = np.sort(orden[posicion_en_estrato < cuotas[codigos[orden]]])
+
+        self.filas = df.iloc[elegidas]
+        self.total_filas = len(df)
+        self._estrato = codigos[elegidas]
+        self.tamanos = np.bincount(self._estrato, minlength=len(self.categorias))
+
+    def _mascara(self, filtradas):
+        if filtradas is None:
+            return np.ones(len(self.filas), dtype=bool)
+        return self.filas.index.isin(filtradas.index)
+
+    def _total(self, y):
+        # Estimador estratificado del total de y y su varianza, con
+        # corrección por población finita (un estrato completo no aporta error)
+        k = len(self.poblacion)
+        n, N = self.tamanos.astype(float), self.poblacion.astype(float)
+        suma = np.bincount(self._estrato, weights=y, minlength=k)
+        suma_cuadrados = np.bincount(self._estrato, weights=y * y, minlength=k)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            media = np.where(n > 0, suma / n, 0.0)
+            varianza_estrato = np.where(n > 1, (suma_cuadrados - n * media ** 2) / (n - 1), 0.0)
+            varianza = np.where(n > 0, N ** 2 * (1 - n / N) * np.maximum(varianza_estrato, 0) / n, 0.0)
+        return float((N * media).sum()), float(varianza.sum())
+
+    def conteo(self, filtradas=None):
+        """Filas de la tabla completa que pasan el mismo filtro que `filtradas`."""
+        total, varianza = self._total(self._mascara(filtradas).astype(float))
+        return Estimacion(total, Z_95 * math.sqrt(varianza))
+
+    def suma(self, columna, filtradas=None):
+        valores = np.nan_to_num(pd.to_numeric(self.filas[columna], errors='coerce').to_numpy(dtype=float))
+        total, varianza = self._total(valores * self._mascara(filtradas))
+        return Estimacion(total, Z_95 * math.sqrt(varianza))
+
+    def media(self, columna, filtradas=None):
+        # Estimador de razón (suma / conteo); varianza por linealización
+        valores = pd.to_numeric(self.filas[columna], errors='coerce').to_numpy(dtype=float)
+        x = (self._mascara(filtradas) & ~np.isnan(valores)).astype(float)
+        y = np.nan_to_num(valores) * x
+        total_y, _ = self._total(y)
+        total_x, _ = self._total(x)
+        if total_x == 0:
+            return Estimacion(np.nan, np.nan)
+        razon = total_y / total_x
+        _, varianza = self._total(y - razon * x)
+        return Estimacion(razon, Z_95 * math.sqrt(varianza) / total_x)
+
+    def conteos_por_grupo(self, columnas, filtradas=None):
+        """DataFrame con columnas + 'cantidad' y 'error' (IC 95 %) por grupo."""
+        filtradas = self.filas if filtradas is None else filtradas
+        grupos = filtradas.groupby(columnas, observed=True).groups
+        filas = []
+        for clave, indice in grupos.items():
+            estimacion = self.conteo(self.filas.loc[indice])
+            clave = clave if isinstance(clave, tuple) else (clave,)
+            filas.append((*clave, estimacion.valor, estimacion.error))
+        columnas = [columnas] if isinstance(columnas, str) else list(columnas)
+        return pd.DataFrame(filas, columns=columnas + ['cantidad', 'error'])
+
+# =====================================================
+# CÁLCULO EXACTO EN SEGUNDO PLANO
+# Los resultados terminados van a la cache de memoria (región "exactos"),
+# así otra sesión con los mismos filtros los recibe sin esperar.
+
+class CalculosEnSegundoPlano:
+    def __init__(self, hilos=2):
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="exacto")
+        self._pendientes = {}
+        self._errores = {}
+        self._candado = threading.Lock()
+
+    def _ejecutar(self, clave, funcion):
+        try:
+            memoria.guardar("exactos", clave, funcion())
+        except Exception as e:
+            with self._candado:
+                self._errores[clave] = e
+        finally:
+            with self._candado:
+                self._pendientes.pop(clave, None)
+
+    def resultado(self, clave, funcion, contar=True):
+        """El resultado exacto si ya está; si no, lo pide y devuelve None."""
+        valor = memoria.obtener("exactos", clave, contar=contar)
+        if valor is not NO_ESTA:
+            return valor
+        with self._candado:
+            # Pudo terminar entre la consulta de arriba y el candado
+            valor = memoria.obtener("exactos", clave, contar=False)
+            if valor is not NO_ESTA:
+                return valor
+            # Un cálculo que falló se reporta una vez; el próximo pedido lo reintenta
+            error = self._errores.pop(clave, None)
+            futuro = self._pendientes.get(clave)
+            if error is None and (futuro is None or futuro.cancelled()):
+                self._pendientes[clave] = self._pool.submit(self._ejecutar, clave, funcion)
+        if error is not None:
+            raise error
+        return None
+
+    def pedir(self, clave, funcion):
+        """Encola `funcion` si no hay resultado, cálculo pendiente ni error sin reportar."""
+        with self._candado:
+            if clave in self._errores or clave in self._pendientes:
+                return
+            if memoria.obtener("exactos", clave, contar=False) is not NO_ESTA:
+                return
+            self._pendientes[clave] = self._pool.submit(self._ejecutar, clave, funcion)
+
+    def listo(self, clave):
+        """Terminó (bien o con error): hay algo nuevo que mostrar."""
+        with self._candado:
+            if clave in self._errores:
+                return True
+        return memoria.obtener("exactos", clave, contar=False) is not NO_ESTA
+
+    def cancelar(self, clave):
+        # Solo si todavía no empezó; si otra sesión lo necesita lo vuelve a pedir
+        with self._candado:
+            futuro = self._pendientes.get(clave)
+            if futuro is not None and futuro.cancel():
+                self._pendientes.pop(clave, None)
+
+
+calculos = CalculosEnSegundoPlano()
+
+# =====================================================
+# STREAMLIT
+
+def exacto_o_pendiente(clave, funcion, grupo):
+    """
+    Resultado exacto de `funcion` si ya terminó; si no, None y queda
+    calculándose. Un pedido nuevo de la misma sesión y `grupo` (otro valor
+    del filtro) cancela el anterior si todavía no empezó. Si el cálculo
+    falló, levanta su error una vez: quien llama muestra el aproximado con
+    un aviso (el siguiente pedido lo reintenta).
+    """
+    import streamlit as st
+
+    llave_sesion = f"_exacto_pendiente_{grupo}"
+    anterior = st.session_state.get(llave_sesion)
+    if anterior is not None and anterior != clave:
+        calculos.cancelar(anterior)
+    resultado = calculos.resultado(clave, funcion)
+    st.session_state[llave_sesion] = clave if resultado is None else None
+    return resultado
+
+
+def esperar_exacto(clave, funcion, texto, intervalo=INTERVALO_REVISION, maximo=MAX_REVISIONES):
+    """
+    Aviso de valores aproximados; cuando el exacto termina (o falla) se
+    vuelve a ejecutar la app. `funcion` es la misma que se pasó a
+    exacto_o_pendiente. Tras `maximo` revisiones se deja de preguntar: el
+    resultado aparece en la siguiente interacción con la página.
+    """
+    import streamlit as st
+
+    revisiones = st.session_state.setdefault("_revisiones_exacto", {})
+    if revisiones.get(clave, 0) >= maximo:
+        st.caption(f"⏳ {texto} Aparecerá al volver a usar la página.")
+        return
+
+    @st.fragment(run_every=intervalo)
+    def revisar_exacto():
+        revisiones[clave] = revisiones.get(clave, 0) + 1
+        if calculos.listo(clave):
+            revisiones.pop(clave, None)
+            st.rerun()
+        if revisiones[clave] >= maximo:
+            # La ejecución completa dibuja el aviso sin fragmento: deja de revisar
+            st.rerun()
+        # El cálculo es compartido: si otra sesión lo canceló antes de que
+        # empezara, este pedido lo vuelve a encolar (si sigue pendiente no hace nada)
+        calculos.pedir(clave, funcion)
+        st.caption(f"⏳ {texto}")
+
+    revisar_exacto()
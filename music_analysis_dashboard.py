@@ -1,12 +1,37 @@
 # =====================================================
 # DASHBOARD DE ANÁLISIS MUSICAL - SPOTIFY & LAST.FM
 
-import boto3
+import os
+import time
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-import io
+
+import analisis_musical as am
+from almacenamiento import (
+    DATASETS, TTL_DATASETS, leer_parquet, limpiar_cache_local, registrar_primer_render, version_objeto,
+)
+from busqueda import IndiceBusqueda
+from cache_memoria import en_cache, memoria, mostrar_memoria_cache
+from calendario import GRANULARIDADES, CalendarioLanzamientos
+from componentes import iniciar_registro_graficas, mostrar_grafica, mostrar_pesos_graficas, mostrar_tabla_paginada
+from concentracion import calcular_concentracion, curva_lorenz, curva_top_k, participacion_top_k
+from cuantiles import ResumenCuantiles, construir_resumenes, fusionar_resumenes
+from derivadas import derivar
+from emparejamiento import IndiceArtistas, emparejar_artistas
+from fuera_de_memoria import (
+    agregar_por_grupo, columnas_dataset, correlacion, iterar_row_groups, leer_columna, top_n,
+)
+from metadatos import leer_metadatos
+from muestras import MuestraEstratificada, esperar_exacto, exacto_o_pendiente, modo_aproximado
+from perfil import iniciar_perfil, mostrar_perfiles, terminar_perfil
+from historial import KEY_ESTADO, leer_crecimiento, leer_estado, ranking_crecimiento
+from precalculo import DATASETS_ENTRADA, KEY_MANIFEST, leer_capa_serving
+from revalidacion import CacheRevalidable
+from tablas import vista
 
 # CONFIGURACIÓN DE STREAMLIT
 st.set_page_config(
@@ -14,75 +39,298 @@ st.set_page_config(
     page_icon="🎵",
     layout="wide"
 )
-
-# CONEXIÓN CON AWS S3
-s3 = boto3.client("s3", region_name="us-west-1")
-BUCKET_NAME = "xideralaws-curso-lisset"
-CARPETA_CLEAN = "clean/"
+iniciar_registro_graficas()
+iniciar_perfil("music_analysis_dashboard")  # Solo con ?perfil=1 o PERFILAR=1
 
 # =====================================================
 # FUNCIONES PARA CARGAR DATOS DESDE PARQUET
+# Una sola cache por proceso con TTL por dataset (TTL_DATASETS). Al vencer
+# se sigue sirviendo la última copia buena mientras se revalida en segundo
+# plano, así un S3 lento o con throttling no frena al usuario. Las
+# sesiones reciben una vista copy-on-write de la tabla compartida (tablas.py):
+# no se deserializa nada por rerun y lo que una sesión asigne no le llega
+# a las demás. Cada dataset cuenta en el presupuesto de memoria del
+# proceso (cache_memoria.py), igual que los índices y resultados de abajo:
+# si no cabe todo, se expulsa lo usado hace más tiempo y se vuelve a
+# calcular o cargar cuando se pide. Las columnas derivadas (derivadas.py)
+# se agregan al cargar, una vez por versión.
 
-@st.cache_data
-def cargar_artists_combined():
-    key = f"{CARPETA_CLEAN}artists_combined.parquet"
+@st.cache_resource
+def cache_datasets():
+    return CacheRevalidable(
+        cargar=lambda nombre, version: derivar(nombre, leer_parquet(DATASETS[nombre], version=version)),
+        recargar=lambda nombre, version: derivar(
+            nombre, leer_parquet(DATASETS[nombre], refrescar=True, version=version)
+        ),
+        version=lambda nombre: version_objeto(DATASETS[nombre]),
+        ttl=TTL_DATASETS,
+        memoria=memoria,
+    )
+
+def cargar_dataset(nombre):
     try:
-        obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-        body = obj["Body"].read()
-        df = pd.read_parquet(io.BytesIO(body))
-        return df
+        return vista(cache_datasets().obtener(nombre))
     except Exception as e:
-        st.error(f"Error cargando artists_combined: {str(e)}")
+        st.error(f"Error cargando {nombre}: {str(e)}")
         return None
 
-@st.cache_data
-def cargar_tracks_lastfm():
-    key = f"{CARPETA_CLEAN}tracks_lastfm.parquet"
+@en_cache("versiones")
+def _etag_objeto(key, periodo):
+    return version_objeto(key)
+
+def etag_objeto(key, ttl):
+    # Un HEAD por objeto y por TTL: el periodo cambia la llave cada ttl
+    # segundos. Si S3 no responde (o el objeto no existe) no se guarda nada
     try:
-        obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-        body = obj["Body"].read()
-        df = pd.read_parquet(io.BytesIO(body))
-        return df
-    except Exception as e:
-        st.error(f"Error cargando tracks_lastfm: {str(e)}")
+        return _etag_objeto(key, int(time.time() // ttl))
+    except Exception:
         return None
 
-@st.cache_data
+def etag_dataset(nombre):
+    return etag_objeto(DATASETS[nombre], TTL_DATASETS[nombre])
+
+def version_dataset(nombre):
+    # Cambia cuando la revalidación reemplaza la copia: sirve de llave a
+    # los índices, resúmenes y gráficas construidos sobre el dataset. En modo
+    # fuera de memoria el dataset puede no estar cargado: se usa su ETag
+    return cache_datasets().version(nombre) or ('etag', etag_dataset(nombre))
+
+def cargar_artists_combined():
+    return cargar_dataset('artists_combined')
+
+def cargar_tracks_lastfm():
+    return cargar_dataset('tracks_lastfm')
+
 def cargar_genres_lastfm():
-    key = f"{CARPETA_CLEAN}genres_lastfm.parquet"
-    try:
-        obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-        body = obj["Body"].read()
-        df = pd.read_parquet(io.BytesIO(body))
-        return df
-    except Exception as e:
-        st.error(f"Error cargando genres_lastfm: {str(e)}")
-        return None
+    return cargar_dataset('genres_lastfm')
 
-@st.cache_data
 def cargar_new_releases():
-    key = f"{CARPETA_CLEAN}spotify_new_releases.parquet"
-    try:
-        obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-        body = obj["Body"].read()
-        df = pd.read_parquet(io.BytesIO(body))
-        return df
-    except Exception as e:
-        st.error(f"Error cargando spotify_new_releases: {str(e)}")
-        return None
+    return cargar_dataset('spotify_new_releases')
 
-@st.cache_data
 def cargar_tracks_enriched():
-    key = f"{CARPETA_CLEAN}tracks_enriched_cross_platform.parquet"
+    return cargar_dataset('tracks_enriched')
+
+def formato_edad(segundos):
+    if segundos < 60:
+        return f"{int(segundos)} s"
+    if segundos < 3600:
+        return f"{int(segundos // 60)} min"
+    return f"{segundos / 3600:.1f} h"
+
+# =====================================================
+# METADATOS (FOOTER DE LOS PARQUET)
+# Filas y mínimos/máximos por columna sin bajar los datos. La llave lleva
+# el ETag del objeto: un parquet nuevo en S3 vuelve a leer su footer
+
+@en_cache("metadatos")
+def metadatos_dataset(nombre, version):
+    return leer_metadatos(DATASETS[nombre], version)
+
+def filas_dataset(nombre):
     try:
-        obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-        body = obj["Body"].read()
-        df = pd.read_parquet(io.BytesIO(body))
-        return df
-    except Exception as e:
-        st.error(f"Error cargando tracks_enriched: {str(e)}")
+        return metadatos_dataset(nombre, etag_dataset(nombre))['filas']
+    except Exception:
         return None
 
+def rango_columna(nombre, columna):
+    try:
+        return metadatos_dataset(nombre, etag_dataset(nombre))['rangos'].get(columna, (None, None))
+    except Exception:
+        return None, None
+
+# =====================================================
+# MODO FUERA DE MEMORIA
+# Con MODO_FUERA_DE_MEMORIA=1, artists_combined y tracks_lastfm no se
+# cargan completos: los KPIs, la vista general, el Análisis 1 y el
+# Análisis 6 los recorren por row group. Los demás análisis los cargan
+# solo cuando se seleccionan. Los resultados llevan la versión del
+# dataset en la llave: al cambiar el objeto en S3 se vuelven a calcular.
+
+MODO_FUERA_DE_MEMORIA = os.environ.get("MODO_FUERA_DE_MEMORIA") == "1"
+COLUMNAS_PLAYS_TRACKS = ['playcount', 'lastfm_playcount', 'listeners', 'lastfm_listeners']
+
+@en_cache("fuera_de_memoria")
+def vista_previa_por_row_group(columnas, version):
+    return next(iterar_row_groups(DATASETS['artists_combined'], list(columnas))).head(10)
+
+@en_cache("fuera_de_memoria")
+def top_artistas_por_row_group(n, columnas, version):
+    return derivar('artists_combined', top_n(DATASETS['artists_combined'], 'lastfm_playcount', n, list(columnas)))
+
+@en_cache("fuera_de_memoria")
+def correlacion_por_row_group(columna_x, columna_y, version):
+    return correlacion(DATASETS['artists_combined'], columna_x, columna_y)
+
+@en_cache("fuera_de_memoria")
+def concentracion_por_row_group(version):
+    return calcular_concentracion(leer_columna(DATASETS['artists_combined'], 'lastfm_playcount'))
+
+@en_cache("fuera_de_memoria")
+def tracks_por_artista_por_row_group(version):
+    columna_plays = next((c for c in COLUMNAS_PLAYS_TRACKS if c in columnas_dataset(DATASETS['tracks_lastfm'])), None)
+    return agregar_por_grupo(DATASETS['tracks_lastfm'], 'artist_name', columna_plays)
+
+def tracks_por_artista(df_tracks):
+    # Mismo resultado que agregar_por_grupo, sobre una tabla ya cargada
+    columna_plays = next((c for c in COLUMNAS_PLAYS_TRACKS if c in df_tracks.columns), None)
+    agregaciones = {'conteo': ('artist_name', 'size')}
+    if columna_plays is not None:
+        agregaciones['suma'] = (columna_plays, 'sum')
+    return df_tracks.groupby('artist_name').agg(**agregaciones).reset_index()
+
+# =====================================================
+# HISTORIAL DE SNAPSHOTS Y CRECIMIENTO
+
+# El dashboard solo lee: los snapshots nuevos los agrega precalculo.py
+# (o python historial.py). La llave es el ETag de history/estado.json,
+# que cambia cada vez que el job agrega una fecha.
+
+MAX_PERIODOS_CRECIMIENTO = 30
+TTL_HISTORIAL = 3600
+
+@en_cache("historial")
+def _crecimiento(version_estado):
+    fechas = leer_estado()['fechas'][-(MAX_PERIODOS_CRECIMIENTO + 1):]
+    return leer_crecimiento(fechas), fechas
+
+def cargar_crecimiento():
+    return _crecimiento(etag_objeto(KEY_ESTADO, TTL_HISTORIAL))
+
+# =====================================================
+# RESÚMENES DE CUANTILES PARA ARTISTAS EMERGENTES
+# Celdas alineadas con los sliders de Análisis 4: bandas de popularidad de
+# 5 puntos y bandas de seguidores de 0.5 M a partir de 0.1 M.
+
+BORDES_SEGUIDORES = np.array([0] + [100_000 + 500_000 * i for i in range(100)])
+METRICAS_EMERGENTES = ['spotify_popularity', 'spotify_followers', 'lastfm_listeners']
+
+@en_cache("indices")
+def construir_resumenes_emergentes(_df_emergentes, version):
+    celdas = pd.DataFrame({
+        'banda_popularidad': (_df_emergentes['spotify_popularity'] // 5).astype(int).to_numpy(),
+        'banda_seguidores': np.searchsorted(
+            BORDES_SEGUIDORES, _df_emergentes['spotify_followers'].to_numpy(), side='right'
+        ) - 1,
+    })
+    df_celdas = pd.concat([celdas, _df_emergentes[METRICAS_EMERGENTES].reset_index(drop=True)], axis=1)
+    return {
+        'resumenes': construir_resumenes(df_celdas, ['banda_popularidad', 'banda_seguidores'], METRICAS_EMERGENTES),
+        'filas': df_celdas.groupby(['banda_popularidad', 'banda_seguidores']).indices,
+    }
+
+@en_cache("muestras")
+def muestra_emergentes(_df_emergentes, version):
+    # Estratos: las mismas bandas de popularidad de 5 puntos que los resúmenes
+    return MuestraEstratificada(_df_emergentes, (_df_emergentes['spotify_popularity'] // 5).to_numpy())
+
+def cuantiles_emergentes(indice, df_emergentes, min_popularity, max_followers_valor):
+    # Fusiona los resúmenes de las celdas que cumplen los filtros; solo la
+    # celda que corta el límite de seguidores se resume desde sus filas
+    banda_min = min_popularity // 5
+    banda_limite = np.searchsorted(BORDES_SEGUIDORES, max_followers_valor, side='right') - 1
+    seleccion = {metrica: [] for metrica in METRICAS_EMERGENTES}
+    for (banda_pop, banda_seg), resumenes in indice['resumenes'].items():
+        if banda_pop < banda_min or banda_seg > banda_limite:
+            continue
+        if banda_seg == banda_limite:
+            parcial = df_emergentes.iloc[indice['filas'][(banda_pop, banda_seg)]]
+            parcial = parcial[parcial['spotify_followers'] < max_followers_valor]
+            resumenes = {m: ResumenCuantiles.desde_valores(parcial[m].to_numpy()) for m in METRICAS_EMERGENTES}
+        for metrica in METRICAS_EMERGENTES:
+            seleccion[metrica].append(resumenes[metrica])
+    return {metrica: fusionar_resumenes(lista) for metrica, lista in seleccion.items()}
+
+# =====================================================
+# EMPAREJAMIENTO DE ARTISTAS ENTRE DATASETS
+
+@en_cache("indices")
+def construir_indice_artistas(_df_artists, version):
+    return IndiceArtistas(_df_artists['artist_name'])
+
+@en_cache("indices")
+def emparejar_dataset(_df, _indice, nombre, version):
+    # Devuelve el emparejamiento por nombre de artista y sus estadísticas
+    return emparejar_artistas(_df['artist_name'], _indice)
+
+# =====================================================
+# BÚSQUEDA DE ARTISTAS
+
+@en_cache("indices")
+def construir_indice_busqueda(_df_artists, _df_tracks, _df_releases, version):
+    return IndiceBusqueda(_df_artists, _df_tracks, _df_releases)
+
+def _formato_ranking(ficha, valor, ranking):
+    if valor not in ficha:
+        return "—", None
+    texto_ranking = f"#{ficha[ranking]:,.0f}" if ranking in ficha else None
+    return f"{ficha[valor]:,.0f}", texto_ranking
+
+def mostrar_ficha_artista(ficha):
+    st.subheader(f"🔎 {ficha['artist_name']}")
+    
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
+    for columna, etiqueta, valor, ranking in [
+        (col1, "🎵 Reproducciones", 'lastfm_playcount', 'ranking_reproducciones'),
+        (col2, "🎧 Oyentes", 'lastfm_listeners', 'ranking_oyentes'),
+        (col3, "💚 Seguidores", 'spotify_followers', 'ranking_seguidores'),
+        (col4, "📈 Popularidad", 'spotify_popularity', 'ranking_popularidad'),
+    ]:
+        texto, texto_ranking = _formato_ranking(ficha, valor, ranking)
+        with columna:
+            st.metric(etiqueta, texto)
+            if texto_ranking:
+                st.caption(f"Ranking {texto_ranking}")
+    with col5:
+        st.metric("🎼 Tracks", ficha.get('tracks', 0))
+    with col6:
+        st.metric("🆕 Lanzamientos", ficha.get('lanzamientos', 0))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if ficha.get('top_tracks'):
+            st.markdown("**Tracks más escuchados:**")
+            st.markdown("\n".join(f"- {track}" for track in ficha['top_tracks']))
+    with col2:
+        if ficha.get('ultimos_lanzamientos'):
+            st.markdown("**Últimos lanzamientos:**")
+            st.markdown("\n".join(
+                f"- {l['album_name']} ({l['album_type']}, {l['release_date']})"
+                for l in ficha['ultimos_lanzamientos']
+            ))
+    st.markdown("---")
+
+# =====================================================
+# CONCENTRACIÓN DE REPRODUCCIONES (CATÁLOGO COMPLETO)
+
+@en_cache("indices")
+def construir_concentracion(_df_artists, version):
+    return calcular_concentracion(_df_artists['lastfm_playcount'], _df_artists['artist_name'])
+
+# =====================================================
+# CAPA DE SERVING (precalculo.py)
+# Si el job de precálculo corrió sobre la versión actual de los datasets,
+# los análisis leen sus resultados en lugar de ordenar y filtrar en vivo.
+# La llave son las versiones de los datasets de entrada y la del manifest:
+# un dataset nuevo o un precálculo nuevo vuelven a leer la capa.
+
+@en_cache("serving")
+def _capa_serving(versiones, version_manifest):
+    try:
+        return leer_capa_serving()
+    except Exception:
+        return {}
+
+def cargar_capa_serving():
+    versiones = tuple(version_dataset(nombre) for nombre in DATASETS_ENTRADA)
+    return _capa_serving(versiones, etag_objeto(KEY_MANIFEST, min(TTL_DATASETS.values())))
+
+# =====================================================
+# CALENDARIO DE LANZAMIENTOS
+
+@en_cache("indices")
+def construir_calendario(_df_releases, version):
+    return CalendarioLanzamientos(_df_releases)
+
 # =====================================================
 # SIDEBAR
 
@@ -91,6 +339,9 @@ with st.sidebar:
     
     if st.button("🔄 Actualizar Datos"):
         st.cache_data.clear()
+        st.cache_resource.clear()
+        memoria.limpiar()
+        limpiar_cache_local()
         st.rerun()
     
     st.subheader("📊 Selecciona un Análisis")
@@ -103,12 +354,15 @@ with st.sidebar:
             "🔄 Análisis 2: Comparación Plataformas",
             "🎸 Análisis 3: Géneros Globales",
             "⭐ Análisis 4: Artistas Emergentes",
-            "🆕 Análisis 5: Nuevos Lanzamientos"
+            "🆕 Análisis 5: Nuevos Lanzamientos",
+            "🔗 Análisis 6: Tracks Cross-Platform"
         ],
         index=0
     )
     
     st.markdown("---")
+    st.subheader("🔎 Buscar Artista")
+    texto_busqueda = st.text_input("Nombre del artista:", placeholder="Ej. The Weeknd")
 
 # =====================================================
 # CARGA DE DATOS
@@ -116,156 +370,315 @@ with st.sidebar:
 st.title("🎵 Análisis Musical Global")
 st.markdown("### Spotify & Last.fm - Tendencias y Comparativas")
 
+# KPIs GENERALES: salen del footer de cada Parquet, así se muestran antes de
+# bajar los datos. Si un footer no se pudo leer, ese KPI se llena después
+KPIS_DATASETS = [
+    ('artists_combined', "🎤 Artistas"),
+    ('tracks_lastfm', "🎵 Tracks Last.fm"),
+    ('genres_lastfm', "🎸 Géneros"),
+    ('spotify_new_releases', "🆕 Lanzamientos"),
+    ('tracks_enriched', "🔗 Tracks Enriched"),
+]
+
+st.subheader("📊 Resumen de los Datasets Disponibles")
+
+cantidades, kpis_pendientes = {}, {}
+for (nombre, etiqueta), columna in zip(KPIS_DATASETS, st.columns(len(KPIS_DATASETS))):
+    cantidades[nombre] = filas_dataset(nombre)
+    if cantidades[nombre] is None:
+        kpis_pendientes[nombre] = columna.empty()
+    else:
+        columna.metric(etiqueta, cantidades[nombre])
+st.markdown("---")
+
 with st.spinner("⏳ Cargando datos desde S3..."):
-    df_artists = cargar_artists_combined()
-    df_tracks_lastfm = cargar_tracks_lastfm()
+    if MODO_FUERA_DE_MEMORIA:
+        df_artists = None
+        df_tracks_lastfm = None
+    else:
+        df_artists = cargar_artists_combined()
+        df_tracks_lastfm = cargar_tracks_lastfm()
     df_genres = cargar_genres_lastfm()
     df_new_releases = cargar_new_releases()
     df_tracks_enriched = cargar_tracks_enriched()
 
-if df_artists is None:
+if MODO_FUERA_DE_MEMORIA and cantidades['artists_combined'] is None:
+    st.error("❌ No se pudieron leer los datos. Verifica tu bucket S3.")
+    st.stop()
+elif not MODO_FUERA_DE_MEMORIA and df_artists is None:
     st.error("❌ No se pudieron cargar los datos. Verifica tu bucket S3.")
     st.stop()
 
-# KPIs GENERALES
-st.subheader("📊 Resumen de los Datasets Disponibles")
+datos_cargados = {
+    'artists_combined': df_artists,
+    'tracks_lastfm': df_tracks_lastfm,
+    'genres_lastfm': df_genres,
+    'spotify_new_releases': df_new_releases,
+    'tracks_enriched': df_tracks_enriched,
+}
+for nombre, etiqueta in KPIS_DATASETS:
+    if nombre in kpis_pendientes:
+        df = datos_cargados[nombre]
+        cantidades[nombre] = len(df) if df is not None else 0
+        kpis_pendientes[nombre].metric(etiqueta, cantidades[nombre])
 
-col1, col2, col3, col4, col5 = st.columns(5)
+# FRESCURA: antigüedad de la copia de cada dataset y, si S3 falló al
+# revalidar, desde cuándo se está sirviendo la copia anterior
+with st.sidebar:
+    st.markdown("---")
+    st.subheader("🕒 Frescura de los Datos")
+    for nombre, etiqueta in KPIS_DATASETS:
+        estado = cache_datasets().estado(nombre)
+        if estado is None:
+            continue
+        if estado['error']:
+            st.warning(
+                f"{etiqueta}: S3 no respondió, se muestra la copia de hace {formato_edad(estado['edad'])} "
+                f"(reintento en {formato_edad(estado['proximo_intento'])})"
+            )
+        else:
+            revalidando = " · revalidando..." if estado['revalidando'] else ""
+            st.caption(f"{etiqueta}: verificado hace {formato_edad(estado['desde_verificacion'])}{revalidando}")
 
-with col1:
-    st.metric("🎤 Artistas", len(df_artists))
+cantidad_artistas = cantidades['artists_combined']
+cantidad_tracks = cantidades['tracks_lastfm']
+cantidad_releases = cantidades['spotify_new_releases']
 
-with col2:
-    cantidad_tracks = len(df_tracks_lastfm) if df_tracks_lastfm is not None else 0
-    st.metric("🎵 Tracks Last.fm", cantidad_tracks)
+def requerir_artists(df_artists):
+    # En modo fuera de memoria la tabla completa solo se carga si el análisis la necesita
+    return df_artists if df_artists is not None else cargar_artists_combined()
 
-with col3:
-    cantidad_generos = len(df_genres) if df_genres is not None else 0
-    st.metric("🎸 Géneros", cantidad_generos)
+registrar_primer_render()
 
-with col4:
-    cantidad_releases = len(df_new_releases) if df_new_releases is not None else 0
-    st.metric("🆕 Lanzamientos", cantidad_releases)
+# BÚSQUEDA: el índice se construye una vez por versión de los datos
+if texto_busqueda:
+    indice_busqueda = construir_indice_busqueda(
+        requerir_artists(df_artists), df_tracks_lastfm, df_new_releases,
+        tuple(version_dataset(nombre) for nombre in ('artists_combined', 'tracks_lastfm', 'spotify_new_releases'))
+    )
+    sugerencias = dict(indice_busqueda.sugerir(texto_busqueda))
+    if len(sugerencias) == 0:
+        st.sidebar.info("Sin coincidencias")
+    else:
+        clave_artista = st.sidebar.selectbox(
+            "Coincidencias:", options=list(sugerencias), format_func=sugerencias.get
+        )
+        mostrar_ficha_artista(indice_busqueda.ficha(clave_artista))
+
+# =====================================================
+# ANÁLISIS COMO FRAGMENTOS
+# Cada análisis es un @st.fragment y recibe sus datos como argumentos. Un
+# widget dentro de un fragmento solo vuelve a ejecutar ese fragmento: no
+# se repiten el sidebar, las cargas ni los KPIs. Los bloques con widgets
+# propios (un slider que solo cambia una gráfica) son fragmentos anidados,
+# así el resto del análisis tampoco se vuelve a dibujar.
 
-with col5:
-    cantidad_enriched = len(df_tracks_enriched) if df_tracks_enriched is not None else 0
-    st.metric("🔗 Tracks Enriched", cantidad_enriched)
-st.markdown("---")
 # =====================================================
 # VISTA GENERAL
 
-if analisis_seleccionado == "🏠 Vista General":
-    
+@st.fragment
+def vista_general(df_artists):
+
     st.markdown("""
     Bienvenido al **Dashboard de Análisis Musical Global**. Este dashboard analiza datos de:
     - 🎧 **Last.fm**: Comportamiento real de usuarios
     - 💚 **Spotify**: Popularidad algorítmica
-    
+
     ### 📋 Análisis Disponibles:
-    
+
     **1️⃣ Ranking Global** - Top artistas más escuchados
-    
+
     **2️⃣ Comparación Plataformas** - Oyentes vs Seguidores
-    
+
     **3️⃣ Géneros Globales** - Distribución de géneros populares
-    
+
     **4️⃣ Artistas Emergentes** - Detección de alto potencial
-    
+
     **5️⃣ Nuevos Lanzamientos** - Tendencias recientes
-    
+
+    **6️⃣ Tracks Cross-Platform** - Canciones unidas con su artista en ambas plataformas
+
     """)
-    
+
     st.info("👈 **Selecciona un análisis en el menú lateral para comenzar**")
-    
+
     st.markdown("---")
     st.subheader("👀 Vista Previa: Top 10 Artistas")
-    st.dataframe(
-        df_artists.head(10)[['artist_name', 'lastfm_playcount', 'lastfm_listeners', 
-                              'spotify_followers', 'spotify_popularity']],
-        use_container_width=True
-    )
+    columnas_vista_previa = ('artist_name', 'lastfm_playcount', 'lastfm_listeners',
+                             'spotify_followers', 'spotify_popularity')
+    if MODO_FUERA_DE_MEMORIA:
+        df_vista_previa = vista_previa_por_row_group(columnas_vista_previa, version_dataset('artists_combined'))
+    else:
+        df_vista_previa = df_artists.head(10)[list(columnas_vista_previa)]
+    st.dataframe(df_vista_previa, use_container_width=True)
 
 # =====================================================
 # ANÁLISIS 1: RANKING GLOBAL
 
-elif analisis_seleccionado == "📈 Análisis 1: Ranking Global":
-    st.header("📈 Análisis 1: Ranking Global de Artistas")
-
+@st.fragment
+def ranking_top_artistas(df_artists, serving):
     st.subheader("🎵 Top Artistas con Más Reproducciones")
-    
+
     col_filtro, col_espacio = st.columns([1, 3])
     with col_filtro:
         top_n_artistas = st.selectbox("Mostrar top:", options=[10, 20, 30, 50], index=1)
-    
-    df_top = df_artists.sort_values(by='lastfm_playcount', ascending=False).head(top_n_artistas)
-    
-    grafica_top = px.bar(
-        df_top, x='artist_name', y='lastfm_playcount',
-        title=f'Top {top_n_artistas} Artistas Más Escuchados',
-        labels={'artist_name': 'Artista', 'lastfm_playcount': 'Reproducciones'},
-        color='lastfm_playcount', color_continuous_scale='Viridis', height=600
+
+    if 'top_artistas' in serving:
+        df_top = serving['top_artistas'].head(top_n_artistas)
+    elif MODO_FUERA_DE_MEMORIA:
+        df_top = top_artistas_por_row_group(top_n_artistas, ('artist_name',), version_dataset('artists_combined'))
+    else:
+        df_top = am.top_artistas(df_artists, top_n_artistas)
+
+    def figura_ranking_top():
+        grafica_top = px.bar(
+            df_top, x='artist_name', y='lastfm_playcount',
+            title=f'Top {top_n_artistas} Artistas Más Escuchados',
+            labels={'artist_name': 'Artista', 'lastfm_playcount': 'Reproducciones'},
+            color='lastfm_playcount', color_continuous_scale='Viridis', height=600
+        )
+        grafica_top.update_layout(xaxis_tickangle=-45, showlegend=False, coloraxis_showscale=False)
+        return grafica_top
+    mostrar_grafica(
+        figura_ranking_top, clave="ranking_top",
+        version=version_dataset('artists_combined'), parametros=(top_n_artistas,)
     )
-    grafica_top.update_layout(xaxis_tickangle=-45, showlegend=False, coloraxis_showscale=False)
-    st.plotly_chart(grafica_top, use_container_width=True)
-    
+
     artista_top1 = df_top.iloc[0]['artist_name']
     reproducciones_top1 = df_top.iloc[0]['lastfm_playcount']
     st.info(f"🔍 **El artista más escuchado es {artista_top1} con {reproducciones_top1:,} reproducciones**")
-    
-    st.markdown("---")
+
+
+def ranking_correlacion(df_artists, serving):
     st.subheader("📈 Correlación: Reproducciones vs Oyentes")
-    
-    df_scatter = df_artists.sort_values(by='lastfm_playcount', ascending=False).head(50)
-    
-    grafica_scatter = px.scatter(
-        df_scatter, x='lastfm_listeners', y='lastfm_playcount',
-        size='lastfm_playcount', color='lastfm_playcount',
-        hover_name='artist_name', color_continuous_scale='Viridis', height=600,
-        title='Relación entre Oyentes y Reproducciones'
+
+    if 'top_artistas' in serving:
+        df_scatter = serving['top_artistas'].head(50)
+    elif MODO_FUERA_DE_MEMORIA:
+        df_scatter = top_artistas_por_row_group(
+            50, ('artist_name', 'lastfm_listeners'), version_dataset('artists_combined')
+        )
+    else:
+        df_scatter = am.top_artistas(df_artists, 50)
+
+    def figura_ranking_dispersion():
+        grafica_scatter = px.scatter(
+            df_scatter, x='lastfm_listeners', y='lastfm_playcount',
+            size='lastfm_playcount', color='lastfm_playcount',
+            hover_name='artist_name', color_continuous_scale='Viridis', height=600,
+            title='Relación entre Oyentes y Reproducciones'
+        )
+        return grafica_scatter
+    mostrar_grafica(
+        figura_ranking_dispersion, clave="ranking_dispersion",
+        version=version_dataset('artists_combined')
     )
-    st.plotly_chart(grafica_scatter, use_container_width=True)
-    
-    correlacion = df_scatter['lastfm_listeners'].corr(df_scatter['lastfm_playcount'])
-    ratio_promedio = (df_scatter['lastfm_playcount'] / df_scatter['lastfm_listeners']).mean()
-    
+
+    if MODO_FUERA_DE_MEMORIA:
+        correlacion_catalogo = correlacion_por_row_group(
+            'lastfm_listeners', 'lastfm_playcount', version_dataset('artists_combined')
+        )
+    else:
+        correlacion_catalogo = df_artists['lastfm_listeners'].corr(df_artists['lastfm_playcount'])
+    ratio_promedio = df_scatter['reproducciones_por_oyente'].mean()
+
     st.success(f"""
-    **Análisis:** Cada oyente reproduce {ratio_promedio:.0f} veces
+    **Análisis:** Cada oyente reproduce {ratio_promedio:.0f} veces · correlación oyentes-reproducciones en todo el catálogo: {correlacion_catalogo:.2f}
     """)
-    
-    st.markdown("---")
-    st.subheader("📊 Concentración de Reproducciones")
-    
-    df_concentracion = df_artists.sort_values(by='lastfm_playcount', ascending=False).head(50)
-    total_reproducciones = df_concentracion['lastfm_playcount'].sum()
-    df_concentracion['porcentaje_individual'] = (df_concentracion['lastfm_playcount'] / total_reproducciones * 100)
-    df_concentracion['porcentaje_acumulado'] = df_concentracion['porcentaje_individual'].cumsum()
-    df_concentracion['ranking'] = range(1, len(df_concentracion) + 1)
-    
-    grafica_concentracion = px.line(
-        df_concentracion,
-        x='ranking',
-        y='porcentaje_acumulado',
-        title='Distribución Acumulativa de Reproducciones (Top 50)',
-        labels={'ranking': 'Posición', 'porcentaje_acumulado': 'Porcentaje Acumulado (%)'},
-        markers=True, height=600
+
+
+@st.fragment
+def participacion_top_k_artistas(concentracion):
+    st.metric("📐 Coeficiente de Gini", f"{concentracion['gini']:.3f}")
+    k_concentracion = st.number_input(
+        "Participación del top k:", min_value=1, max_value=max(1, concentracion['n']), value=min(100, max(1, concentracion['n']))
     )
-    grafica_concentracion.update_traces(
-        line_color='#00CC96', line_width=3, marker=dict(size=8, color='#FF6692')
+    st.metric(
+        f"🏆 Top {k_concentracion:,} artistas",
+        f"{participacion_top_k(concentracion, k_concentracion) * 100:.1f}%",
+        help=f"De {concentracion['n']:,} artistas con reproducciones"
     )
-    grafica_concentracion.add_hline(y=50, line_dash="dash", line_color="orange")
-    grafica_concentracion.add_hline(y=80, line_dash="dash", line_color="red")
-    
-    st.plotly_chart(grafica_concentracion, use_container_width=True)
-    
-    porcentaje_top10 = df_concentracion.iloc[9]['porcentaje_acumulado']
+
+
+def ranking_concentracion(df_artists, cantidad_artistas):
+    st.subheader("📊 Concentración de Reproducciones")
+
+    if MODO_FUERA_DE_MEMORIA:
+        concentracion = concentracion_por_row_group(version_dataset('artists_combined'))
+    else:
+        concentracion = construir_concentracion(df_artists, version_dataset('artists_combined'))
+    posiciones_top, porcentaje_acumulado = curva_top_k(concentracion, 50)
+
+    def figura_ranking_concentracion():
+        grafica_concentracion = px.line(
+            x=posiciones_top,
+            y=porcentaje_acumulado,
+            title='Distribución Acumulativa de Reproducciones (Top 50 sobre el catálogo completo)',
+            labels={'x': 'Posición', 'y': 'Porcentaje Acumulado (%)'},
+            markers=True, height=600
+        )
+        grafica_concentracion.update_traces(
+            line_color='#00CC96', line_width=3, marker=dict(size=8, color='#FF6692')
+        )
+        grafica_concentracion.add_hline(y=50, line_dash="dash", line_color="orange")
+        grafica_concentracion.add_hline(y=80, line_dash="dash", line_color="red")
+        return grafica_concentracion
+    mostrar_grafica(
+        figura_ranking_concentracion, clave="ranking_concentracion",
+        version=version_dataset('artists_combined')
+    )
+
+    porcentaje_top10 = participacion_top_k(concentracion, 10) * 100
     st.warning(f"🔥 El top 10 concentra {porcentaje_top10:.1f}% de todas las reproducciones")
 
+    col1, col2 = st.columns(2)
+    with col1:
+        poblacion, participacion = curva_lorenz(concentracion)
+        def figura_ranking_lorenz():
+            grafica_lorenz = go.Figure()
+            grafica_lorenz.add_trace(go.Scatter(
+                x=poblacion * 100, y=participacion * 100, mode='lines',
+                name='Curva de Lorenz', line=dict(color='#00CC96', width=3), fill='tozeroy'
+            ))
+            grafica_lorenz.add_trace(go.Scatter(
+                x=[0, 100], y=[0, 100], mode='lines',
+                name='Igualdad perfecta', line=dict(color='gray', dash='dash')
+            ))
+            grafica_lorenz.update_layout(
+                title='Curva de Lorenz de Reproducciones',
+                xaxis_title='% de artistas (de menor a mayor)',
+                yaxis_title='% de reproducciones acumuladas',
+                height=450
+            )
+            return grafica_lorenz
+        mostrar_grafica(
+            figura_ranking_lorenz, clave="ranking_lorenz",
+            version=version_dataset('artists_combined')
+        )
+    with col2:
+        participacion_top_k_artistas(concentracion)
+
+
+@st.fragment
+def analisis_ranking_global(df_artists, cantidad_artistas):
+    st.header("📈 Análisis 1: Ranking Global de Artistas")
+
+    serving = cargar_capa_serving()
+    ranking_top_artistas(df_artists, serving)
+
+    st.markdown("---")
+    ranking_correlacion(df_artists, serving)
+
+    st.markdown("---")
+    ranking_concentracion(df_artists, cantidad_artistas)
+
 # =====================================================
 # ANÁLISIS 2: COMPARACIÓN PLATAFORMAS
 
-elif analisis_seleccionado == "🔄 Análisis 2: Comparación Plataformas":
+@st.fragment
+def analisis_comparacion_plataformas(df_artists):
     st.header("🔄 Comparación Last.fm vs Spotify")
-    
+
     with st.expander("ℹ️ ¿Cuál es la diferencia?"):
         col1, col2 = st.columns(2)
         with col1:
@@ -274,51 +687,46 @@ elif analisis_seleccionado == "🔄 Análisis 2: Comparación Plataformas":
             st.markdown("**💚 SEGUIDORES (Spotify)** - Interés explícito")
 
     st.subheader("📊 Oyentes vs Seguidores")
-    
+
     col1, col2 = st.columns(2)
     with col1:
         num_artistas = st.slider("Número de artistas:", 10, 30, 20, 5)
     with col2:
         metricas = st.multiselect(
-            "Métricas:", 
+            "Métricas:",
             ["Oyentes Last.fm", "Seguidores Spotify"],
             default=["Oyentes Last.fm", "Seguidores Spotify"]
         )
-    
+
     if len(metricas) > 0:
-        df_comp = df_artists[
-            (df_artists['lastfm_listeners'].notna()) &
-            (df_artists['spotify_followers'].notna())
-        ].sort_values('lastfm_listeners', ascending=False).head(num_artistas)
-        
-        df_grafica = pd.melt(
-            df_comp[['artist_name', 'lastfm_listeners', 'spotify_followers']],
-            id_vars=['artist_name'],
-            value_vars=['lastfm_listeners', 'spotify_followers'],
-            var_name='plataforma', value_name='cantidad'
-        )
-        
-        df_grafica['plataforma'] = df_grafica['plataforma'].map({
-            'lastfm_listeners': 'Oyentes Last.fm',
-            'spotify_followers': 'Seguidores Spotify'
-        })
-        
+        serving = cargar_capa_serving()
+        if 'comparacion_plataformas' in serving:
+            df_comp = serving['comparacion_plataformas'].head(num_artistas)
+        else:
+            df_comp = am.seleccion_comparacion(requerir_artists(df_artists), num_artistas)
+
+        df_grafica = am.fundir_comparacion(df_comp)
         df_grafica = df_grafica[df_grafica['plataforma'].isin(metricas)]
-        
-        grafica_comp = px.bar(
-            df_grafica, x='artist_name', y='cantidad', color='plataforma',
-            barmode='group', title=f'Top {num_artistas} Artistas: Comparación',
-            color_discrete_map={'Oyentes Last.fm': '#FF6692', 'Seguidores Spotify': '#1DB954'},
-            height=600
+
+        def figura_comparacion_plataformas():
+            grafica_comp = px.bar(
+                df_grafica, x='artist_name', y='cantidad', color='plataforma',
+                barmode='group', title=f'Top {num_artistas} Artistas: Comparación',
+                color_discrete_map={'Oyentes Last.fm': '#FF6692', 'Seguidores Spotify': '#1DB954'},
+                height=600
+            )
+            grafica_comp.update_layout(xaxis_tickangle=-45)
+            return grafica_comp
+        mostrar_grafica(
+            figura_comparacion_plataformas, clave="comparacion_plataformas",
+            version=version_dataset('artists_combined'), parametros=(num_artistas, tuple(metricas))
         )
-        grafica_comp.update_layout(xaxis_tickangle=-45)
-        st.plotly_chart(grafica_comp, use_container_width=True)
-        
+
         # Métricas
         total_oyentes = df_comp['lastfm_listeners'].sum()
         total_seguidores = df_comp['spotify_followers'].sum()
         ratio_global = total_seguidores / total_oyentes
-        
+
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric("🎧 Total Oyentes", f"{total_oyentes:,.0f}")
@@ -328,29 +736,39 @@ elif analisis_seleccionado == "🔄 Análisis 2: Comparación Plataformas":
 # =====================================================
 # ANÁLISIS 3: GÉNEROS GLOBALES
 
-elif analisis_seleccionado == "🎸 Análisis 3: Géneros Globales":
+@st.fragment
+def analisis_generos(df_genres):
     st.header("🎸 Análisis 3: Distribución de Géneros")
-    
+
     if df_genres is not None and not df_genres.empty:
         st.subheader("🎵 Top Géneros Más Populares")
-        
+
         top_n_generos = st.slider("Mostrar top géneros:", 10, 50, 20, 5)
-        
-        df_top_generos = df_genres.sort_values('tag_count', ascending=False).head(top_n_generos)
-        
-        fig_generos = px.bar(
-            df_top_generos, x='tag_name', y='tag_count',
-            title=f'Top {top_n_generos} Géneros Más Populares',
-            labels={'tag_name': 'Género', 'tag_count': 'Popularidad'},
-            color='tag_count', color_continuous_scale='Blues', height=600
+
+        serving = cargar_capa_serving()
+        if 'top_generos' in serving:
+            df_top_generos = serving['top_generos'].head(top_n_generos)
+        else:
+            df_top_generos = am.top_generos(df_genres, top_n_generos)
+
+        def figura_generos_top():
+            fig_generos = px.bar(
+                df_top_generos, x='tag_name', y='tag_count',
+                title=f'Top {top_n_generos} Géneros Más Populares',
+                labels={'tag_name': 'Género', 'tag_count': 'Popularidad'},
+                color='tag_count', color_continuous_scale='Blues', height=600
+            )
+            fig_generos.update_layout(xaxis_tickangle=-45, showlegend=False)
+            return fig_generos
+        mostrar_grafica(
+            figura_generos_top, clave="generos_top",
+            version=version_dataset('genres_lastfm'), parametros=(top_n_generos,)
         )
-        fig_generos.update_layout(xaxis_tickangle=-45, showlegend=False)
-        st.plotly_chart(fig_generos, use_container_width=True)
-        
+
         total_tags = df_top_generos['tag_count'].sum()
         top_genero = df_top_generos.iloc[0]['tag_name']
         top_count = df_top_generos.iloc[0]['tag_count']
-        
+
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric("🎸 Género #1", top_genero)
@@ -359,38 +777,294 @@ elif analisis_seleccionado == "🎸 Análisis 3: Géneros Globales":
         with col3:
             porcentaje = (top_count / total_tags * 100)
             st.metric("📈 % del Top", f"{porcentaje:.1f}%")
-        
+
         st.markdown("---")
         st.subheader("🥧 Distribución por Géneros")
-        
+
         df_pie = df_top_generos.head(10)
-        fig_pie = px.pie(
-            df_pie, values='tag_count', names='tag_name',
-            title='Top 10 Géneros - Distribución',
-            hole=0.4, height=500
+        def figura_generos_distribucion():
+            fig_pie = px.pie(
+                df_pie, values='tag_count', names='tag_name',
+                title='Top 10 Géneros - Distribución',
+                hole=0.4, height=500
+            )
+            return fig_pie
+        mostrar_grafica(
+            figura_generos_distribucion, clave="generos_distribucion",
+            version=version_dataset('genres_lastfm'), parametros=(top_n_generos,)
         )
-        st.plotly_chart(fig_pie, use_container_width=True)
-        
+
     else:
         st.warning("⚠️ No hay datos de géneros disponibles")
 
 # =====================================================
 # ANÁLISIS 4: ARTISTAS EMERGENTES
-elif analisis_seleccionado == "⭐ Análisis 4: Artistas Emergentes":
+
+@st.fragment
+def emergentes_alto_potencial(df_emergentes, df_filtrado, total_filtrado, min_popularity, max_followers_valor, clave_emergentes,
+                              aproximado=False):
+    st.subheader("🚀 Artistas con Alto Potencial")
+
+    # Ajustar slider según cantidad de datos disponibles
+    num_disponibles = total_filtrado
+
+    if num_disponibles <= 10:
+        # Si hay 10 o menos, mostrar todos sin slider
+        top_emergentes = num_disponibles
+        st.info(f"📊 Mostrando todos los {top_emergentes} artistas disponibles")
+    else:
+        # Si hay más de 10, permitir selección con slider
+        max_valor = min(50, num_disponibles)
+        valor_default = min(15, num_disponibles)
+        top_emergentes = st.slider(
+            "Mostrar top artistas emergentes:",
+            min_value=10,
+            max_value=max_valor,
+            value=valor_default,
+            step=5
+        )
+
+    if df_filtrado is None:
+        df_top_emergentes = cargar_capa_serving()['emergentes'][clave_emergentes].head(top_emergentes)
+    else:
+        df_top_emergentes = am.top_emergentes(df_filtrado, top_emergentes)
+
+    def figura_emergentes_dispersion():
+        fig_emergentes = px.scatter(
+            df_top_emergentes,
+            x='spotify_followers', y='spotify_popularity',
+            size='lastfm_listeners', color='spotify_popularity',
+            hover_name='artist_name',
+            hover_data={
+                'spotify_followers': ':,',
+                'spotify_popularity': True,
+                'lastfm_listeners': ':,'
+            },
+            title='Artistas Emergentes: Popularidad vs Seguidores',
+            labels={'spotify_followers': 'Seguidores Spotify', 'spotify_popularity': 'Popularidad'},
+            color_continuous_scale='Sunset', height=600
+        )
+        return fig_emergentes
+    mostrar_grafica(
+        figura_emergentes_dispersion, clave="emergentes_dispersion",
+        version=version_dataset('artists_combined'), parametros=(clave_emergentes, top_emergentes, aproximado)
+    )
+
+    # Métricas
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        avg_pop = df_top_emergentes['spotify_popularity'].mean()
+        st.metric("📈 Popularidad Promedio", f"{avg_pop:.1f}")
+    with col2:
+        avg_followers = df_top_emergentes['spotify_followers'].mean()
+        st.metric("👥 Seguidores Promedio", f"{avg_followers:,.0f}")
+    with col3:
+        avg_listeners = df_top_emergentes['lastfm_listeners'].mean()
+        st.metric("🎧 Oyentes Promedio", f"{avg_listeners:,.0f}")
+
+    # Mediana y percentiles de todos los candidatos (el promedio se distorsiona con colas largas)
+    resumenes_filtro = cuantiles_emergentes(
+        construir_resumenes_emergentes(df_emergentes, version_dataset('artists_combined')),
+        df_emergentes, min_popularity, max_followers_valor
+    )
+    col1, col2, col3 = st.columns(3)
+    for columna, metrica, etiqueta in [
+        (col1, 'spotify_popularity', "📈 Popularidad Mediana"),
+        (col2, 'spotify_followers', "👥 Seguidores Medianos"),
+        (col3, 'lastfm_listeners', "🎧 Oyentes Medianos"),
+    ]:
+        resumen = resumenes_filtro[metrica]
+        with columna:
+            st.metric(etiqueta, f"{resumen.cuantil(0.5):,.0f}")
+            st.caption(f"p90: {resumen.cuantil(0.9):,.0f} · p99: {resumen.cuantil(0.99):,.0f}")
+
+    st.markdown("---")
+    st.subheader("📋 Lista de Artistas Emergentes")
+
+    mostrar_tabla_paginada(
+        df_emergentes,
+        clave="tabla_emergentes",
+        version=(version_dataset('artists_combined'), len(df_emergentes)),
+        filas=df_emergentes.index.get_indexer(df_top_emergentes.index),
+        columnas=['artist_name', 'spotify_popularity', 'spotify_followers', 'lastfm_listeners'],
+        etiquetas={
+            'artist_name': 'Artista',
+            'spotify_popularity': 'Popularidad',
+            'spotify_followers': 'Seguidores Spotify',
+            'lastfm_listeners': 'Oyentes Last.fm'
+        },
+        orden_default='spotify_popularity',
+        ascendente_default=False
+    )
+
+
+@st.fragment
+def emergentes_por_criterios(df_emergentes):
+    # CONTROLES DE FILTRADO
+    st.subheader("🎛️ Ajustar Criterios de Emergentes")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        min_popularity = st.slider(
+            "Popularidad mínima en Spotify:",
+            min_value=0,
+            max_value=100,
+            value=0,
+            step=5,
+            help="Artistas con al menos esta popularidad"
+        )
+
+    with col2:
+        max_followers = st.slider(
+            "Seguidores máximos (millones):",
+            min_value=0.1,
+            max_value=50.0,
+            value=10.0,
+            step=0.5,
+            help="Artistas que aún no son mainstream"
+        )
+
+    # Aplicar filtros
+    max_followers_valor = int(max_followers * 1_000_000)
+
+    # Con la capa de serving vigente el conteo y el top ya están calculados
+    # para cada combinación de los sliders
+    serving = cargar_capa_serving()
+    clave_emergentes = (min_popularity, round(max_followers, 1))
+    estimacion = None
+    error_exacto = None
+    if clave_emergentes in serving.get('emergentes_conteos', {}):
+        total_filtrado = serving['emergentes_conteos'][clave_emergentes]
+        df_filtrado = None
+    elif modo_aproximado(len(df_emergentes)):
+        # Modo aproximado: el filtro exacto corre en segundo plano y mientras
+        # tanto el conteo y el top salen de la muestra estratificada
+        version = (version_dataset('artists_combined'), len(df_emergentes))
+        clave_exacta = ('emergentes', version, clave_emergentes)
+
+        def filtrar_exacto():
+            return am.filtrar_emergentes(df_emergentes, min_popularity, max_followers_valor)
+
+        try:
+            df_filtrado = exacto_o_pendiente(clave_exacta, filtrar_exacto, grupo="emergentes")
+        except Exception as e:
+            df_filtrado, error_exacto = None, e
+        if df_filtrado is None:
+            muestra = muestra_emergentes(df_emergentes, version)
+            df_filtrado = am.filtrar_emergentes(muestra.filas, min_popularity, max_followers_valor)
+            estimacion = muestra.conteo(df_filtrado)
+            total_filtrado = max(len(df_filtrado), round(estimacion.valor))
+        else:
+            total_filtrado = len(df_filtrado)
+    else:
+        df_filtrado = am.filtrar_emergentes(df_emergentes, min_popularity, max_followers_valor)
+        total_filtrado = len(df_filtrado)
+
+    # Mostrar cuántos artistas cumplen el criterio
+    if estimacion is None:
+        st.info(f"📊 **{total_filtrado} artistas** cumplen con los criterios seleccionados")
+    else:
+        st.info(f"📊 **{estimacion.texto()} artistas** (IC 95 %) cumplen con los criterios seleccionados")
+    if error_exacto is not None:
+        st.warning(f"⚠️ No se pudo calcular el resultado exacto ({error_exacto}); se muestran los valores estimados")
+    elif estimacion is not None:
+        esperar_exacto(
+            clave_exacta,
+            filtrar_exacto,
+            f"Conteo y top calculados sobre una muestra de {len(muestra.filas):,} de {len(df_emergentes):,} "
+            "artistas; el resultado exacto se está calculando..."
+        )
+
+    if total_filtrado == 0:
+        st.warning("⚠️ No hay artistas con estos criterios. Intenta ajustar los filtros.")
+
+        # Mostrar estadísticas para ayudar
+        st.write("**Estadísticas de los datos:**")
+        col1, col2 = st.columns(2)
+        # Rangos del catálogo completo desde el footer; sin estadísticas se recorre la columna
+        popularidad = rango_columna('artists_combined', 'spotify_popularity')
+        if None in popularidad:
+            popularidad = (df_emergentes['spotify_popularity'].min(), df_emergentes['spotify_popularity'].max())
+        seguidores = rango_columna('artists_combined', 'spotify_followers')
+        if None in seguidores:
+            seguidores = (df_emergentes['spotify_followers'].min(), df_emergentes['spotify_followers'].max())
+        with col1:
+            st.metric("Popularidad mínima real", f"{popularidad[0]:.0f}")
+            st.metric("Popularidad máxima real", f"{popularidad[1]:.0f}")
+        with col2:
+            st.metric("Seguidores mínimos", f"{seguidores[0]:,.0f}")
+            st.metric("Seguidores máximos", f"{seguidores[1]:,.0f}")
+    else:
+        st.markdown("---")
+        emergentes_alto_potencial(
+            df_emergentes, df_filtrado, total_filtrado, min_popularity, max_followers_valor, clave_emergentes,
+            aproximado=estimacion is not None
+        )
+
+
+@st.fragment
+def emergentes_crecimiento():
+    st.subheader("📈 Artistas con Mayor Crecimiento")
+
+    df_crecimiento, fechas_historial = cargar_crecimiento()
+    df_crecimiento = vista(df_crecimiento)
+
+    if len(fechas_historial) < 2:
+        st.info(f"📅 Se necesitan al menos 2 snapshots para medir crecimiento (hay {len(fechas_historial)})")
+        return
+
+    metricas_crecimiento = {
+        'lastfm_listeners': "Oyentes Last.fm",
+        'spotify_followers': "Seguidores Spotify",
+        'spotify_popularity': "Popularidad Spotify"
+    }
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        metrica_crecimiento = st.selectbox(
+            "Métrica:", options=list(metricas_crecimiento), format_func=metricas_crecimiento.get
+        )
+    with col2:
+        periodos = st.slider(
+            "Snapshots hacia atrás:", 1, len(fechas_historial) - 1, 1,
+            help="Cuántos periodos entre snapshots se suman"
+        )
+    with col3:
+        crecimiento_relativo = st.checkbox("Crecimiento relativo (%)", value=False)
+
+    fechas_ventana = fechas_historial[-periodos:]
+    df_ranking = ranking_crecimiento(
+        df_crecimiento[df_crecimiento['fecha'].isin(fechas_ventana)],
+        metrica_crecimiento, relativo=crecimiento_relativo, top_n=20
+    )
+
+    if df_ranking.empty:
+        st.warning("⚠️ No hay artistas presentes en snapshots consecutivos")
+    else:
+        def figura_crecimiento():
+            fig_crecimiento = px.bar(
+                df_ranking, x='artist_name', y='crecimiento',
+                title=f"Mayor crecimiento en {metricas_crecimiento[metrica_crecimiento]} "
+                      f"({fechas_historial[-periodos - 1]} → {fechas_historial[-1]})",
+                labels={'artist_name': 'Artista', 'crecimiento': '% de crecimiento' if crecimiento_relativo else 'Crecimiento'},
+                color='crecimiento', color_continuous_scale='Oranges', height=500
+            )
+            fig_crecimiento.update_layout(xaxis_tickangle=-45, coloraxis_showscale=False)
+            return fig_crecimiento
+        mostrar_grafica(
+            figura_crecimiento, clave="crecimiento",
+            version=tuple(fechas_historial), parametros=(metrica_crecimiento, periodos, crecimiento_relativo)
+        )
+
+
+@st.fragment
+def analisis_emergentes(df_artists):
     st.header("⭐ Análisis 4: Artistas Emergentes")
     st.markdown("**Objetivo:** Identificar artistas con alto potencial de crecimiento")
-        
 
     # Filtrar artistas con datos válidos
-    df_emergentes = df_artists[
-        (df_artists['lastfm_listeners'].notna()) &
-        (df_artists['spotify_followers'].notna()) &
-        (df_artists['spotify_popularity'].notna()) &
-        (df_artists['lastfm_listeners'] > 0) &
-        (df_artists['spotify_followers'] > 0)
-    ].copy()
+    df_emergentes = am.candidatos_emergentes(requerir_artists(df_artists))
 
-    
     if len(df_emergentes) == 0:
         st.error("❌ No hay artistas con datos completos de ambas plataformas.")
         st.info("""
@@ -400,168 +1074,308 @@ elif analisis_seleccionado == "⭐ Análisis 4: Artistas Emergentes":
         - Falta ejecutar el pipeline completo
         """)
     else:
-        # Calcular engagement ratio
-        df_emergentes['engagement_ratio'] = df_emergentes['lastfm_listeners'] / (df_emergentes['spotify_followers'] + 1)
-        
-        # CONTROLES DE FILTRADO
-        st.subheader("🎛️ Ajustar Criterios de Emergentes")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            min_popularity = st.slider(
-                "Popularidad mínima en Spotify:",
-                min_value=0,
-                max_value=100,
-                value=0,
-                step=5,
-                help="Artistas con al menos esta popularidad"
-            )
-        
-        with col2:
-            max_followers = st.slider(
-                "Seguidores máximos (millones):",
-                min_value=0.1,
-                max_value=50.0,
-                value=10.0,
-                step=0.5,
-                help="Artistas que aún no son mainstream"
-            )
-        
-        # Aplicar filtros
-        max_followers_valor = int(max_followers * 1_000_000)
-        
-        df_filtrado = df_emergentes[
-            (df_emergentes['spotify_popularity'] >= min_popularity) &
-            (df_emergentes['spotify_followers'] < max_followers_valor)
-        ]
-        
-        # Mostrar cuántos artistas cumplen el criterio
-        st.info(f"📊 **{len(df_filtrado)} artistas** cumplen con los criterios seleccionados")
-        
-        if len(df_filtrado) == 0:
-            st.warning("⚠️ No hay artistas con estos criterios. Intenta ajustar los filtros.")
-            
-            # Mostrar estadísticas para ayudar
-            st.write("**Estadísticas de los datos:**")
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("Popularidad mínima real", f"{df_emergentes['spotify_popularity'].min():.0f}")
-                st.metric("Popularidad máxima real", f"{df_emergentes['spotify_popularity'].max():.0f}")
-            with col2:
-                st.metric("Seguidores mínimos", f"{df_emergentes['spotify_followers'].min():,.0f}")
-                st.metric("Seguidores máximos", f"{df_emergentes['spotify_followers'].max():,.0f}")
-        else:
-            st.markdown("---")
-            st.subheader("🚀 Artistas con Alto Potencial")
-            
-            # Ajustar slider según cantidad de datos disponibles
-            num_disponibles = len(df_filtrado)
-            
-            if num_disponibles <= 10:
-                # Si hay 10 o menos, mostrar todos sin slider
-                top_emergentes = num_disponibles
-                st.info(f"📊 Mostrando todos los {top_emergentes} artistas disponibles")
-            else:
-                # Si hay más de 10, permitir selección con slider
-                max_valor = min(50, num_disponibles)
-                valor_default = min(15, num_disponibles)
-                top_emergentes = st.slider(
-                    "Mostrar top artistas emergentes:", 
-                    min_value=10, 
-                    max_value=max_valor, 
-                    value=valor_default, 
-                    step=5
-                )
-            
-            df_top_emergentes = df_filtrado.sort_values('spotify_popularity', ascending=False).head(top_emergentes)
-            
-            fig_emergentes = px.scatter(
-                df_top_emergentes,
-                x='spotify_followers', y='spotify_popularity',
-                size='lastfm_listeners', color='spotify_popularity',
-                hover_name='artist_name',
-                hover_data={
-                    'spotify_followers': ':,',
-                    'spotify_popularity': True,
-                    'lastfm_listeners': ':,'
-                },
-                title='Artistas Emergentes: Popularidad vs Seguidores',
-                labels={'spotify_followers': 'Seguidores Spotify', 'spotify_popularity': 'Popularidad'},
-                color_continuous_scale='Sunset', height=600
-            )
-            st.plotly_chart(fig_emergentes, use_container_width=True)
-            
-            # Métricas
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                avg_pop = df_top_emergentes['spotify_popularity'].mean()
-                st.metric("📈 Popularidad Promedio", f"{avg_pop:.1f}")
-            with col2:
-                avg_followers = df_top_emergentes['spotify_followers'].mean()
-                st.metric("👥 Seguidores Promedio", f"{avg_followers:,.0f}")
-            with col3:
-                avg_listeners = df_top_emergentes['lastfm_listeners'].mean()
-                st.metric("🎧 Oyentes Promedio", f"{avg_listeners:,.0f}")
-            
-            st.markdown("---")
-            st.subheader("📋 Lista de Artistas Emergentes")
-            
-            df_display = df_top_emergentes[['artist_name', 'spotify_popularity', 'spotify_followers', 'lastfm_listeners']].copy()
-            df_display.columns = ['Artista', 'Popularidad', 'Seguidores Spotify', 'Oyentes Last.fm']
-            
-            st.dataframe(df_display, use_container_width=True)
+        emergentes_por_criterios(df_emergentes)
+
+    st.markdown("---")
+    emergentes_crecimiento()
 
 # =====================================================
 # ANÁLISIS 5: NUEVOS LANZAMIENTOS
-elif analisis_seleccionado == "🆕 Análisis 5: Nuevos Lanzamientos":
+
+@st.fragment
+def lanzamientos_tendencia(calendario, desde, hasta, rango_elegido):
+    st.subheader("📈 Lanzamientos en el Tiempo")
+
+    granularidad = st.radio("Agrupar por:", options=list(GRANULARIDADES), index=1, horizontal=True)
+    df_tendencia = calendario.tendencia(GRANULARIDADES[granularidad], desde, hasta)
+
+    def figura_lanzamientos_tendencia():
+        fig_tendencia = px.bar(
+            df_tendencia.reset_index().melt(id_vars='periodo', var_name='album_type', value_name='cantidad'),
+            x='periodo', y='cantidad', color='album_type',
+            title=f'Lanzamientos por {granularidad.lower()}',
+            labels={'periodo': 'Fecha', 'cantidad': 'Lanzamientos', 'album_type': 'Tipo'},
+            height=400
+        )
+        return fig_tendencia
+    mostrar_grafica(
+        figura_lanzamientos_tendencia, clave="lanzamientos_tendencia",
+        version=version_dataset('spotify_new_releases'), parametros=(granularidad, rango_elegido)
+    )
+
+
+@st.fragment
+def lanzamientos_top_artistas(df_new_releases, calendario, serving, desde, hasta, rango_elegido):
+    st.subheader("🎵 Artistas con Más Lanzamientos Recientes")
+
+    top_n_artists = st.slider("Mostrar top artistas:", 10, 30, 15, 5)
+
+    if rango_elegido is not None:
+        artistas_releases = calendario.top_artistas(desde, hasta, top_n_artists)
+    elif 'artistas_lanzamientos' in serving:
+        artistas_releases = serving['artistas_lanzamientos'].set_index('artist_name')['cantidad'].head(top_n_artists)
+    else:
+        artistas_releases = am.top_artistas_lanzamientos(df_new_releases, top_n_artists)
+
+    if len(artistas_releases) == 0:
+        st.info("No hay lanzamientos en el rango de fechas seleccionado")
+    else:
+        def figura_lanzamientos_artistas():
+            fig_artists = px.bar(
+                x=artistas_releases.index, y=artistas_releases.values,
+                title=f'Top {top_n_artists} Artistas con Más Lanzamientos',
+                labels={'x': 'Artista', 'y': 'Número de Lanzamientos'},
+                color=artistas_releases.values, color_continuous_scale='Greens',
+                height=500
+            )
+            fig_artists.update_layout(xaxis_tickangle=-45, showlegend=False)
+            return fig_artists
+        mostrar_grafica(
+            figura_lanzamientos_artistas, clave="lanzamientos_artistas",
+            version=version_dataset('spotify_new_releases'), parametros=(top_n_artists, rango_elegido)
+        )
+
+
+@st.fragment
+def analisis_lanzamientos(df_new_releases):
     st.header("🆕 Análisis 5: Tendencias de Nuevos Lanzamientos")
-    
-    if df_new_releases is not None and not df_new_releases.empty:
-        st.subheader("📀 Distribución por Tipo de Lanzamiento")
-        
-        tipo_counts = df_new_releases['album_type'].value_counts()
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
+
+    if df_new_releases is None or df_new_releases.empty:
+        st.warning("⚠️ No hay datos de nuevos lanzamientos disponibles")
+        return
+
+    calendario = construir_calendario(df_new_releases, version_dataset('spotify_new_releases'))
+
+    # Rango de fechas: se resuelve con búsqueda binaria sobre el calendario
+    rango_completo, rango_elegido = True, None
+    desde = hasta = None
+    if calendario.n_con_fecha > 0:
+        minimo, maximo = calendario.minimo.date(), calendario.maximo.date()
+        rango = st.date_input(
+            "📅 Rango de fechas de lanzamiento:",
+            value=(minimo, maximo),
+            min_value=minimo, max_value=maximo
+        )
+        # Mientras se elige la segunda fecha el widget devuelve una sola
+        desde, hasta = (rango[0], rango[-1]) if len(rango) > 0 else (minimo, maximo)
+        rango_completo = (desde, hasta) == (minimo, maximo)
+        rango_elegido = None if rango_completo else (desde, hasta)
+        inicio, fin = calendario.tramo(desde, hasta)
+        if calendario.sin_fecha:
+            st.caption(f"{calendario.sin_fecha:,} lanzamientos sin fecha válida no entran en el calendario")
+
+    st.subheader("📀 Distribución por Tipo de Lanzamiento")
+
+    serving = cargar_capa_serving()
+    if not rango_completo:
+        tipo_counts = calendario.conteo_tipos(desde, hasta)
+        tipo_counts = tipo_counts[tipo_counts > 0]
+    elif 'tipos_lanzamiento' in serving:
+        tipo_counts = serving['tipos_lanzamiento'].set_index('album_type')['cantidad']
+    else:
+        tipo_counts = am.conteo_tipos_lanzamiento(df_new_releases)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        def figura_lanzamientos_tipos():
             fig_tipos = px.pie(
                 values=tipo_counts.values,
                 names=tipo_counts.index,
                 title='Tipos de Lanzamientos',
                 hole=0.4, height=400
             )
-            st.plotly_chart(fig_tipos, use_container_width=True)
-        
-        with col2:
-            st.markdown("### 📊 Estadísticas")
-            for tipo, count in tipo_counts.items():
-                st.metric(tipo.title(), count)
-        
-        st.markdown("---")
-        st.subheader("🎵 Artistas con Más Lanzamientos Recientes")
-        
-        top_n_artists = st.slider("Mostrar top artistas:", 10, 30, 15, 5)
-        
-        artistas_releases = df_new_releases['artist_name'].value_counts().head(top_n_artists)
-        
-        fig_artists = px.bar(
-            x=artistas_releases.index, y=artistas_releases.values,
-            title=f'Top {top_n_artists} Artistas con Más Lanzamientos',
-            labels={'x': 'Artista', 'y': 'Número de Lanzamientos'},
-            color=artistas_releases.values, color_continuous_scale='Greens',
-            height=500
+            return fig_tipos
+        mostrar_grafica(
+            figura_lanzamientos_tipos, clave="lanzamientos_tipos",
+            version=version_dataset('spotify_new_releases'), parametros=(rango_elegido,)
         )
-        fig_artists.update_layout(xaxis_tickangle=-45, showlegend=False)
-        st.plotly_chart(fig_artists, use_container_width=True)
-        
+
+    with col2:
+        st.markdown("### 📊 Estadísticas")
+        for tipo, count in tipo_counts.items():
+            st.metric(tipo.title(), count)
+
+    if calendario.n_con_fecha > 0:
         st.markdown("---")
-        st.subheader("📋 Últimos Lanzamientos")
-        
-        st.dataframe(
-            df_new_releases[['album_name', 'artist_name', 'album_type', 'release_date', 'total_tracks']].head(20),
-            use_container_width=True
+        lanzamientos_tendencia(calendario, desde, hasta, rango_elegido)
+
+    st.markdown("---")
+    lanzamientos_top_artistas(df_new_releases, calendario, serving, desde, hasta, rango_elegido)
+
+    st.markdown("---")
+    st.subheader("📋 Últimos Lanzamientos")
+
+    # La tabla del calendario ya está del más reciente al más antiguo y
+    # un rango de fechas es un tramo contiguo de ella
+    mostrar_tabla_paginada(
+        calendario.tabla,
+        clave="tabla_lanzamientos",
+        version=version_dataset('spotify_new_releases'),
+        filas=None if rango_completo else np.arange(inicio, fin),
+        columnas=['fecha', 'album_name', 'artist_name', 'album_type', 'total_tracks'],
+        etiquetas={'fecha': 'release_date'},
+        orden_default='fecha',
+        ascendente_default=False,
+        filas_por_pagina=20
+    )
+
+# =====================================================
+# ANÁLISIS 6: TRACKS CROSS-PLATFORM
+
+@st.fragment
+def cruce_top_artistas(df_por_artista, nombre_dataset, version_cruce):
+    top_n_cruce = st.slider("Mostrar top artistas:", 10, 50, 20, 5, key="top_cruce")
+    df_top_cruce = df_por_artista.head(top_n_cruce)
+
+    def figura_cruce_tracks():
+        fig_cruce = px.scatter(
+            df_top_cruce,
+            x='reproducciones_tracks', y='spotify_followers',
+            size='tracks', color='spotify_popularity',
+            hover_name='artist_name_referencia',
+            title='Reproducciones de sus Tracks (Last.fm) vs Seguidores (Spotify)',
+            labels={
+                'reproducciones_tracks': 'Reproducciones de Tracks',
+                'spotify_followers': 'Seguidores Spotify',
+                'spotify_popularity': 'Popularidad'
+            },
+            color_continuous_scale='Viridis', height=600
         )
-        
+        return fig_cruce
+    mostrar_grafica(
+        figura_cruce_tracks, clave="cruce_tracks",
+        version=version_cruce, parametros=(nombre_dataset, top_n_cruce)
+    )
+
+
+@st.fragment
+def cruce_por_dataset(df_artists, datasets_tracks, emparejamientos, versiones_tracks):
+    st.subheader("🎵 Reproducciones de Tracks vs Popularidad del Artista")
+
+    nombre_dataset = st.selectbox("Dataset de tracks:", options=list(datasets_tracks.keys()))
+    df_unidos = datasets_tracks[nombre_dataset].merge(
+        emparejamientos[nombre_dataset].dropna(subset=['artist_name_referencia']),
+        on='artist_name'
+    )
+
+    if 'suma' not in df_unidos.columns or df_unidos.empty:
+        st.warning("⚠️ No hay tracks emparejados con métricas de reproducción")
     else:
-        st.warning("⚠️ No hay datos de nuevos lanzamientos disponibles")
+        df_por_artista = (
+            df_unidos.groupby('artist_name_referencia')
+            .agg(tracks=('conteo', 'sum'), reproducciones_tracks=('suma', 'sum'))
+            .reset_index()
+            .merge(
+                df_artists[['artist_name', 'spotify_followers', 'spotify_popularity']],
+                left_on='artist_name_referencia', right_on='artist_name'
+            )
+            .sort_values('reproducciones_tracks', ascending=False)
+        )
+
+        cruce_top_artistas(
+            df_por_artista, nombre_dataset,
+            (version_dataset('artists_combined'), versiones_tracks[nombre_dataset])
+        )
+
+        correlacion_cruce = df_por_artista['reproducciones_tracks'].corr(df_por_artista['spotify_followers'])
+        st.info(f"📊 **{df_unidos['conteo'].sum():,} tracks** de **{len(df_por_artista):,} artistas** unidos · correlación con seguidores: {correlacion_cruce:.2f}")
+
+    st.markdown("---")
+    st.subheader("❓ Nombres sin Pareja")
+
+    df_sin_pareja = emparejamientos[nombre_dataset]
+    df_sin_pareja = df_sin_pareja[df_sin_pareja['metodo'].isna()].reset_index(drop=True)
+    mostrar_tabla_paginada(
+        df_sin_pareja,
+        clave="tabla_sin_pareja",
+        version=(nombre_dataset, version_dataset('artists_combined'), versiones_tracks[nombre_dataset], len(df_sin_pareja)),
+        columnas=['artist_name', 'similitud'],
+        etiquetas={'artist_name': 'Artista', 'similitud': 'Mejor similitud'},
+        orden_default='similitud',
+        ascendente_default=False
+    )
+
+
+@st.fragment
+def analisis_tracks(df_artists, df_tracks_lastfm, df_tracks_enriched, cantidad_tracks):
+    st.header("🔗 Análisis 6: Tracks Cross-Platform")
+    st.markdown("**Objetivo:** Unir las canciones de Last.fm con los artistas de ambas plataformas aunque los nombres no coincidan exactamente")
+
+    # Cada dataset de tracks se resume por artista (conteo y suma de
+    # reproducciones) antes de emparejar los nombres
+    datasets_tracks = {}
+    if MODO_FUERA_DE_MEMORIA and cantidad_tracks > 0:
+        datasets_tracks["Tracks Last.fm"] = vista(tracks_por_artista_por_row_group(version_dataset('tracks_lastfm')))
+    elif df_tracks_lastfm is not None and 'artist_name' in df_tracks_lastfm.columns:
+        datasets_tracks["Tracks Last.fm"] = tracks_por_artista(df_tracks_lastfm)
+    if df_tracks_enriched is not None and 'artist_name' in df_tracks_enriched.columns:
+        datasets_tracks["Tracks Enriched"] = tracks_por_artista(df_tracks_enriched)
+    versiones_tracks = {
+        "Tracks Last.fm": version_dataset('tracks_lastfm'),
+        "Tracks Enriched": version_dataset('tracks_enriched'),
+    }
+
+    if len(datasets_tracks) == 0:
+        st.warning("⚠️ No hay datos de tracks disponibles")
+        return
+
+    df_artists = requerir_artists(df_artists)
+    indice_artistas = construir_indice_artistas(df_artists, version_dataset('artists_combined'))
+
+    st.subheader("🎯 Calidad del Emparejamiento")
+
+    emparejamientos = {}
+    columnas = st.columns(len(datasets_tracks))
+    for columna, (nombre, df_por_artista_tracks) in zip(columnas, datasets_tracks.items()):
+        resultado, estadisticas = emparejar_dataset(
+            df_por_artista_tracks, indice_artistas, nombre,
+            (version_dataset('artists_combined'), versiones_tracks[nombre], len(df_por_artista_tracks))
+        )
+        emparejamientos[nombre] = resultado
+        with columna:
+            st.metric(f"{nombre}: artistas emparejados", f"{estadisticas['tasa_emparejamiento']:.1%}")
+            st.caption(
+                f"{estadisticas['emparejados']:,} de {estadisticas['nombres']:,} nombres · "
+                f"{estadisticas['exactos']:,} exactos, {estadisticas['por_trigramas']:,} por similitud · "
+                f"{estadisticas['segundos'] * 1000:,.0f} ms"
+            )
+
+    st.markdown("---")
+    cruce_por_dataset(df_artists, datasets_tracks, emparejamientos, versiones_tracks)
+
+# =====================================================
+# ANÁLISIS SELECCIONADO
+
+if analisis_seleccionado == "🏠 Vista General":
+    vista_general(df_artists)
+elif analisis_seleccionado == "📈 Análisis 1: Ranking Global":
+    analisis_ranking_global(df_artists, cantidad_artistas)
+elif analisis_seleccionado == "🔄 Análisis 2: Comparación Plataformas":
+    analisis_comparacion_plataformas(df_artists)
+elif analisis_seleccionado == "🎸 Análisis 3: Géneros Globales":
+    analisis_generos(df_genres)
+elif analisis_seleccionado == "⭐ Análisis 4: Artistas Emergentes":
+    analisis_emergentes(df_artists)
+elif analisis_seleccionado == "🆕 Análisis 5: Nuevos Lanzamientos":
+    analisis_lanzamientos(df_new_releases)
+elif analisis_seleccionado == "🔗 Análisis 6: Tracks Cross-Platform":
+    analisis_tracks(df_artists, df_tracks_lastfm, df_tracks_enriched, cantidad_tracks)
+
+# =====================================================
+# PESO DE LAS GRÁFICAS Y MEMORIA DE LA CACHE
+# Bytes de spec que mandó cada gráfica. Se muestra en cada rerun completo;
+# un fragmento que se vuelve a ejecutar solo reemplaza el peso de sus gráficas.
+# Debajo, la ocupación del presupuesto de memoria, expulsiones y aciertos
+
+with st.sidebar:
+    mostrar_pesos_graficas()
+    mostrar_memoria_cache()
+
+# =====================================================
+# PERFIL DEL RERUN
+# Con ?perfil=1 o PERFILAR=1 el rerun completo queda en CARPETA_PERFILES
+
+with st.sidebar:
+    terminar_perfil()
+    mostrar_perfiles()
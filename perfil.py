@@ -0,0 +1,213 @@
+# =====================================================
+# PERFILES DE UN RERUN (BAJO DEMANDA)
+# Con ?perfil=1 en la URL, o PERFILAR=1 en el entorno, cada rerun completo
+# de la app se perfila por muestreo: un hilo toma la pila del hilo del
+# script cada PERFIL_INTERVALO_MS (5 ms) y cuenta cuántas veces aparece
+# cada pila, con frames de la app, de la carga de datos, de pandas y de
+# Plotly. El resultado se guarda en formato "collapsed" (una pila por
+# línea, frames separados por ";" y el número de muestras), que abren
+# flamegraph.pl, speedscope y inferno. Junto a cada perfil va un .json con
+# la app, la duración y los parámetros del rerun para poder repetirlo.
+#
+# Configuración por variables de entorno:
+#   PERFILAR               1 perfila todos los reruns de todas las sesiones
+#   CARPETA_PERFILES       dónde se guardan (/tmp/perfiles)
+#   PERFIL_INTERVALO_MS    cada cuánto se toma una muestra (5)
+#   MAX_PERFILES           cuántos se conservan; los más viejos se borran (20)
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import streamlit as st
+
+PERFILAR = os.environ.get("PERFILAR", "0") == "1"
+CARPETA_PERFILES = os.environ.get("CARPETA_PERFILES", "/tmp/perfiles")
+INTERVALO = float(os.environ.get("PERFIL_INTERVALO_MS", "5")) / 1000
+MAX_PERFILES = int(os.environ.get("MAX_PERFILES", "20"))
+# Si la sesión se cierra a mitad del rerun nadie detiene el muestreo
+DURACION_MAXIMA = 300  # segundos
+
+CLAVE_PERFIL = "_perfil_en_curso"
+
+# =====================================================
+# MUESTREO
+
+def _etiqueta(frame):
+    # modulo:funcion (pandas.core.frame:DataFrame.sort_values); sin ";" ni espacios
+    codigo = frame.f_code
+    modulo = frame.f_globals.get('__name__', '?')
+    nombre = getattr(codigo, 'co_qualname', codigo.co_name)
+    return f"{modulo}:{nombre}".replace(";", ",").replace(" ", "_")
+
+
+class MuestreoPerfil:
+    """Cuenta las pilas de un hilo tomando una muestra cada `intervalo` segundos."""
+
+    def __init__(self, hilo_id, raiz=None, intervalo=INTERVALO):
+        self.hilo_id = hilo_id
+        self.raiz = raiz  # archivo del script: lo que está arriba es Streamlit
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.muestras = 0
+        self.inicio = time.perf_counter()
+        self.segundos = 0.0
+        self._etiquetas = {}
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join()
+        self.segundos = time.perf_counter() - self.inicio
+        return self
+
+    def _muestrear(self):
+        while not self._detener.wait(self.intervalo):
+            if time.perf_counter() - self.inicio > DURACION_MAXIMA:
+                break
+            frame = sys._current_frames().get(self.hilo_id)
+            if frame is None:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            frames.reverse()
+            if self.raiz is not None:
+                for i, frame in enumerate(frames):
+                    if frame.f_code.co_filename == self.raiz:
+                        frames = frames[i:]
+                        break
+            etiquetas = []
+            for frame in frames:
+                etiqueta = self._etiquetas.get(frame.f_code)
+                if etiqueta is None:
+                    etiqueta = self._etiquetas[frame.f_code] = _etiqueta(frame)
+                etiquetas.append(etiqueta)
+            self.pilas[";".join(etiquetas)] += 1
+            self.muestras += 1
+
+    def collapsed(self):
+        return "".join(f"{pila} {cuenta}\n" for pila, cuenta in sorted(self.pilas.items()))
+
+    def funciones_mas_costosas(self, n=5):
+        # Tiempo propio: muestras en las que la función estaba en la punta de la pila
+        propias = Counter()
+        for pila, cuenta in self.pilas.items():
+            propias[pila.rsplit(";", 1)[-1]] += cuenta
+        return propias.most_common(n)
+
+# =====================================================
+# RERUN DE STREAMLIT
+
+def perfil_activo():
+    return PERFILAR or st.query_params.get("perfil") == "1"
+
+
+def _parametros_rerun():
+    # Lo necesario para repetir el rerun: query params y valores simples del estado
+    estado = {
+        clave: valor for clave, valor in st.session_state.to_dict().items()
+        if not str(clave).startswith("_") and isinstance(valor, (bool, int, float, str, list, tuple))
+    }
+    return {'query': dict(st.query_params), 'estado': estado}
+
+
+def _guardar(app, muestreo, parametros, incompleto):
+    os.makedirs(CARPETA_PERFILES, exist_ok=True)
+    nombre = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}_{app}"
+    ruta = os.path.join(CARPETA_PERFILES, f"{nombre}.collapsed")
+    with open(ruta, "w") as archivo:
+        archivo.write(muestreo.collapsed())
+    meta = {
+        'app': app,
+        'fecha': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'segundos': round(muestreo.segundos, 3),
+        'muestras': muestreo.muestras,
+        'intervalo_ms': muestreo.intervalo * 1000,
+        'incompleto': incompleto,
+        'parametros': parametros,
+        'mas_costosas': muestreo.funciones_mas_costosas(),
+    }
+    with open(ruta.replace(".collapsed", ".json"), "w") as archivo:
+        json.dump(meta, archivo, indent=2, default=str)
+    _limpiar_viejos()
+    return ruta
+
+
+def _limpiar_viejos():
+    perfiles = sorted(f for f in os.listdir(CARPETA_PERFILES) if f.endswith(".collapsed"))
+    for archivo in perfiles[:-MAX_PERFILES] if MAX_PERFILES > 0 else perfiles:
+        for extension in (".collapsed", ".json"):
+            ruta = os.path.join(CARPETA_PERFILES, archivo.replace(".collapsed", extension))
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+
+def iniciar_perfil(app):
+    """Se llama al inicio del script; no hace nada si el perfilado no está activo."""
+    # Un rerun que terminó con st.stop() o una excepción no llegó a terminar_perfil
+    anterior = st.session_state.pop(CLAVE_PERFIL, None)
+    if anterior is not None:
+        _guardar(anterior['app'], anterior['muestreo'].detener(), anterior['parametros'], incompleto=True)
+    if not perfil_activo():
+        return
+    raiz = sys._getframe(1).f_code.co_filename
+    st.session_state[CLAVE_PERFIL] = {
+        'app': app,
+        'muestreo': MuestreoPerfil(threading.get_ident(), raiz).iniciar(),
+        'parametros': _parametros_rerun(),
+    }
+
+
+def terminar_perfil():
+    """Se llama al final del script; guarda el perfil del rerun y devuelve su ruta."""
+    en_curso = st.session_state.pop(CLAVE_PERFIL, None)
+    if en_curso is None:
+        return None
+    return _guardar(en_curso['app'], en_curso['muestreo'].detener(), en_curso['parametros'], incompleto=False)
+
+
+def perfiles_recientes(n=10):
+    if not os.path.isdir(CARPETA_PERFILES):
+        return []
+    perfiles = []
+    for archivo in sorted(os.listdir(CARPETA_PERFILES), reverse=True):
+        if archivo.endswith(".json") and len(perfiles) < n:
+            ruta = os.path.join(CARPETA_PERFILES, archivo)
+            try:
+                with open(ruta) as f:
+                    perfiles.append({**json.load(f), 'ruta': ruta.replace(".json", ".collapsed")})
+            except (OSError, ValueError):
+                continue  # Otro proceso lo está escribiendo o borrando
+    return perfiles
+
+
+def mostrar_perfiles():
+    """Lista de perfiles recientes; solo aparece con el perfilado activo."""
+    if not perfil_activo():
+        return
+    with st.expander("🔥 Perfiles recientes"):
+        perfiles = perfiles_recientes()
+        if len(perfiles) == 0:
+            st.caption("Todavía no hay perfiles")
+        for i, perfil in enumerate(perfiles):
+            incompleto = " · incompleto" if perfil['incompleto'] else ""
+            st.markdown(f"**{perfil['fecha']}** · {perfil['app']} · {perfil['segundos']:.2f} s · {perfil['muestras']:,} muestras{incompleto}")
+            if perfil['mas_costosas']:
+                funcion, muestras = perfil['mas_costosas'][0]
+                st.caption(f"Más tiempo propio: {funcion} ({muestras / max(1, perfil['muestras']):.0%})")
+            if os.path.exists(perfil['ruta']):
+                with open(perfil['ruta'], "rb") as archivo:
+                    st.download_button(
+                        "Descargar (collapsed)", archivo.read(),
+                        file_name=os.path.basename(perfil['ruta']), key=f"_perfil_descarga_{i}"
+                    )
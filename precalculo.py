@@ -0,0 +1,185 @@
+# =====================================================
+# PRECÁLCULO DE LA CAPA DE SERVING
+# Corre los mismos cálculos del dashboard (analisis_musical.py) para todos
+# los valores que permiten los widgets y guarda resultados pequeños en
+# serving/. El dashboard los usa si el manifest corresponde a la versión
+# actual de los datasets; si no, calcula en vivo.
+#
+# Uso: python precalculo.py [--procesos 4]
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import analisis_musical as am
+from almacenamiento import (
+    DATASETS, ObjetoNoEncontrado, escribir_objeto, escribir_parquet, leer_objeto, leer_parquet, version_objeto,
+)
+from derivadas import derivar
+from historial import actualizar_historial
+
+CARPETA_SERVING = "serving/"
+KEY_MANIFEST = f"{CARPETA_SERVING}manifest.json"
+# Datasets de los que salen los artefactos; sus versiones van al manifest
+DATASETS_ENTRADA = ('artists_combined', 'genres_lastfm', 'spotify_new_releases')
+
+COLUMNAS_TOP_ARTISTAS = ['artist_name', 'lastfm_playcount', 'lastfm_listeners']
+COLUMNAS_COMPARACION = ['artist_name', 'lastfm_listeners', 'spotify_followers']
+COLUMNAS_EMERGENTES = ['artist_name', 'spotify_popularity', 'spotify_followers', 'lastfm_listeners']
+MAX_TOP_EMERGENTES = 50
+# Artefactos con filas de artists_combined: al leerlos se les agregan sus columnas derivadas
+ARTEFACTOS_DE_ARTISTAS = ('top_artistas', 'comparacion_plataformas', 'emergentes')
+
+
+def key_artefacto(nombre):
+    return f"{CARPETA_SERVING}{nombre}.parquet"
+
+# =====================================================
+# TAREAS (se ejecutan en los procesos del pool)
+# Las listas top-n se guardan solo para el n máximo: cualquier n menor es
+# un prefijo. Emergentes sí necesita la cuadrícula completa de filtros.
+
+_datos = {}
+
+def _inicializar(datos):
+    global _datos
+    _datos = datos
+    if 'artists_combined' in datos:
+        _datos['emergentes'] = am.candidatos_emergentes(datos['artists_combined'])
+
+def _con_posicion(df):
+    return df.reset_index(drop=True).assign(posicion=lambda d: range(1, len(d) + 1))
+
+def tarea_top_artistas():
+    df = am.top_artistas(_datos['artists_combined'], max(am.OPCIONES_TOP_ARTISTAS + [50]))
+    return {'top_artistas': _con_posicion(df[COLUMNAS_TOP_ARTISTAS])}
+
+def tarea_comparacion():
+    df = am.seleccion_comparacion(_datos['artists_combined'], max(am.RANGO_COMPARACION))
+    return {'comparacion_plataformas': _con_posicion(df[COLUMNAS_COMPARACION])}
+
+def tarea_generos():
+    df = am.top_generos(_datos['genres_lastfm'], max(am.RANGO_TOP_GENEROS))
+    return {'top_generos': _con_posicion(df[['tag_name', 'tag_count']])}
+
+def tarea_lanzamientos():
+    df = _datos['spotify_new_releases']
+    tipos = am.conteo_tipos_lanzamiento(df)
+    artistas = am.top_artistas_lanzamientos(df, max(am.RANGO_TOP_LANZAMIENTOS))
+    return {
+        'tipos_lanzamiento': pd.DataFrame({'album_type': tipos.index, 'cantidad': tipos.values}),
+        'artistas_lanzamientos': pd.DataFrame({'artist_name': artistas.index, 'cantidad': artistas.values}),
+    }
+
+def tarea_emergentes(min_popularity):
+    conteos, tops = [], []
+    for max_followers in am.VALORES_MAX_SEGUIDORES:
+        df_filtrado = am.filtrar_emergentes(_datos['emergentes'], min_popularity, int(max_followers * 1_000_000))
+        conteos.append({'min_popularity': min_popularity, 'max_followers': max_followers, 'total': len(df_filtrado)})
+        top = am.top_emergentes(df_filtrado, MAX_TOP_EMERGENTES)[COLUMNAS_EMERGENTES]
+        tops.append(top.rename_axis('indice_original').reset_index().assign(
+            min_popularity=min_popularity, max_followers=max_followers, posicion=range(1, len(top) + 1)
+        ))
+    return {'emergentes_conteos': pd.DataFrame(conteos), 'emergentes': pd.concat(tops, ignore_index=True)}
+
+
+def _tareas(datos):
+    tareas = []
+    if 'artists_combined' in datos:
+        tareas += [(tarea_top_artistas, ()), (tarea_comparacion, ())]
+        tareas += [(tarea_emergentes, (m,)) for m in am.RANGO_MIN_POPULARIDAD]
+    if 'genres_lastfm' in datos:
+        tareas.append((tarea_generos, ()))
+    if 'spotify_new_releases' in datos:
+        tareas.append((tarea_lanzamientos, ()))
+    return tareas
+
+# =====================================================
+# EJECUCIÓN
+
+def precalcular(procesos=None):
+    inicio = time.perf_counter()
+    # Los snapshots del historial también se escriben aquí, nunca desde el
+    # dashboard: un solo escritor, sin sesiones compitiendo por las mismas keys
+    try:
+        agregadas = actualizar_historial()
+        print(f"[precalculo] snapshots nuevos en el historial: {len(agregadas)}", flush=True)
+    except Exception as e:
+        print(f"[precalculo] no se pudo actualizar el historial: {e}", flush=True)
+
+    datos, versiones = {}, {}
+    for nombre in DATASETS_ENTRADA:
+        try:
+            versiones[nombre] = version_objeto(DATASETS[nombre])
+            datos[nombre] = derivar(nombre, leer_parquet(DATASETS[nombre], usar_cache=False))
+        except Exception as e:
+            print(f"[precalculo] se omite {nombre}: {e}", flush=True)
+
+    resultados = {}
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar, initargs=(datos,)) as pool:
+        futuros = [pool.submit(funcion, *args) for funcion, args in _tareas(datos)]
+        for futuro in futuros:
+            for nombre, df in futuro.result().items():
+                resultados.setdefault(nombre, []).append(df)
+
+    artefactos = {}
+    for nombre, partes in resultados.items():
+        df = pd.concat(partes, ignore_index=True)
+        escribir_parquet(key_artefacto(nombre), df)
+        artefactos[nombre] = len(df)
+        print(f"[precalculo] {key_artefacto(nombre)}: {len(df):,} filas", flush=True)
+
+    # El manifest se escribe al final: si el job falla a la mitad, el
+    # dashboard sigue usando los artefactos anteriores o calcula en vivo
+    manifest = {
+        'versiones': versiones,
+        'artefactos': artefactos,
+        'generado': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        'segundos': round(time.perf_counter() - inicio, 3),
+    }
+    escribir_objeto(KEY_MANIFEST, json.dumps(manifest, indent=2).encode())
+    print(f"[precalculo] listo en {manifest['segundos']:.2f} s", flush=True)
+    return manifest
+
+# =====================================================
+# LECTURA DESDE EL DASHBOARD
+
+def leer_capa_serving():
+    """
+    Devuelve {nombre: DataFrame} con los artefactos vigentes, o {} si no
+    hay manifest o los datasets cambiaron después del precálculo. Los de
+    emergentes se devuelven como diccionarios por (min_popularity, max_followers).
+    """
+    try:
+        manifest = json.loads(leer_objeto(KEY_MANIFEST, usar_cache=False))
+    except ObjetoNoEncontrado:
+        return {}
+    for nombre, version in manifest['versiones'].items():
+        if version_objeto(DATASETS[nombre]) != version:
+            return {}
+
+    serving = {nombre: leer_parquet(key_artefacto(nombre), usar_cache=False) for nombre in manifest['artefactos']}
+    # Los artefactos guardan solo columnas base; las derivadas se agregan al leer
+    for nombre in ARTEFACTOS_DE_ARTISTAS:
+        if nombre in serving:
+            serving[nombre] = derivar('artists_combined', serving[nombre])
+    if 'emergentes' in serving:
+        serving['emergentes'] = {
+            (int(m), round(float(f), 1)): grupo.set_index('indice_original').rename_axis(None)
+            for (m, f), grupo in serving['emergentes'].groupby(['min_popularity', 'max_followers'])
+        }
+        serving['emergentes_conteos'] = {
+            (int(fila.min_popularity), round(float(fila.max_followers), 1)): int(fila.total)
+            for fila in serving['emergentes_conteos'].itertuples()
+        }
+    return serving
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materializa la capa de serving del dashboard musical")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count(), help="Procesos del pool")
+    precalcular(parser.parse_args().procesos)
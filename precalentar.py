@@ -0,0 +1,93 @@
+# =====================================================
+# PRECALENTAMIENTO DEL CONTENEDOR
+# Corre junto a Streamlit (entrypoint.sh): espera a que el servidor
+# responda y abre una sesión por websocket, igual que un navegador. Así la
+# primera ejecución de la app (descarga de los datasets, índices, caches
+# en memoria) ocurre dentro del proceso del servidor y el primer usuario
+# no la paga. Recién entonces crea el archivo de "listo" que revisa el
+# healthcheck. El historial de snapshots no se toca aquí (precalculo.py).
+
+import os
+import time
+import urllib.request
+
+ARCHIVO_LISTO = os.environ.get("ARCHIVO_LISTO", "/tmp/listo")
+SERVIDOR = os.environ.get("SERVIDOR_STREAMLIT", "localhost:8502")
+ESPERA_SERVIDOR = 120             # segundos hasta que /_stcore/health responda
+ESPERA_PRIMERA_EJECUCION = 600    # segundos hasta que la app termine de ejecutarse
+
+
+def medir(nombre, funcion, tiempos):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    tiempos[nombre] = round(time.perf_counter() - inicio, 3)
+    print(f"[precalentar] {nombre}: {tiempos[nombre]:.2f} s", flush=True)
+    return resultado
+
+
+def esperar_servidor():
+    limite = time.time() + ESPERA_SERVIDOR
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://{SERVIDOR}/_stcore/health", timeout=2) as respuesta:
+                if respuesta.status == 200:
+                    return
+        except OSError:
+            pass
+        if time.time() >= limite:
+            raise TimeoutError(f"Streamlit no respondió en {ESPERA_SERVIDOR} s")
+        time.sleep(0.5)
+
+
+def ejecutar_app():
+    # Lo mismo que hace el navegador al abrir la página: pedir una ejecución
+    # del script y leer los mensajes hasta que termina
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+    from websockets.sync.client import connect
+
+    pedido = BackMsg()
+    pedido.rerun_script.query_string = ""
+    pedido.rerun_script.page_script_hash = ""
+    limite = time.time() + ESPERA_PRIMERA_EJECUCION
+    with connect(f"ws://{SERVIDOR}/_stcore/stream", subprotocols=["streamlit"], max_size=None) as websocket:
+        websocket.send(pedido.SerializeToString())
+        while True:
+            mensaje = ForwardMsg()
+            mensaje.ParseFromString(websocket.recv(timeout=max(0.0, limite - time.time())))
+            if mensaje.WhichOneof('type') == 'script_finished':
+                if mensaje.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("la app no compila")
+                return
+
+
+def main():
+    if os.path.exists(ARCHIVO_LISTO):
+        os.remove(ARCHIVO_LISTO)
+
+    inicio = time.perf_counter()
+    tiempos, errores = {}, {}
+
+    try:
+        medir("esperar_servidor", esperar_servidor, tiempos)
+        medir("primera_ejecucion", ejecutar_app, tiempos)
+    except Exception as e:
+        errores['primera_ejecucion'] = str(e)
+        print(f"[precalentar]   error en la primera ejecución: {e}", flush=True)
+    tiempos["precalentamiento_total"] = round(time.perf_counter() - inicio, 3)
+
+    from almacenamiento import guardar_metricas_arranque
+    guardar_metricas_arranque({
+        'precalentamiento': tiempos,
+        'errores_precalentamiento': errores,
+    })
+
+    # Aunque falle la primera ejecución se marca listo: el dashboard muestra
+    # el error y S3 se vuelve a intentar en la primera sesión
+    with open(ARCHIVO_LISTO, "w") as archivo:
+        archivo.write(str(time.time()))
+    print(f"[precalentar] listo en {tiempos['precalentamiento_total']:.2f} s", flush=True)
+
+
+if __name__ == "__main__":
+    main()
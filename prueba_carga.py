@@ -0,0 +1,340 @@
+# =====================================================
+# PRUEBA DE CARGA DEL DASHBOARD
+# Levanta un servidor de Streamlit (un solo proceso, como el contenedor)
+# y le conecta N sesiones concurrentes por websocket. Cada sesión cambia
+# de análisis y mueve sliders y selectores al azar. Reporta latencia de
+# rerun p50/p95/p99, reruns por segundo y memoria del proceso.
+#
+# Uso:
+#   python prueba_carga.py --sesiones 50 --pasos 20 --s3-local
+#   python prueba_carga.py --sesiones 10 --url ws://localhost:8502 --salida resultados.json
+#
+# Con --s3-local se levanta un S3 de prueba (moto) con datos sintéticos;
+# sin él se usa el bucket configurado en almacenamiento.py. Con --url no
+# se levanta nada y no se mide memoria.
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "music_analysis_dashboard.py")
+PUERTO_S3_LOCAL = 5055
+PUERTO_STREAMLIT = 8601
+ETIQUETA_SELECTOR_ANALISIS = "Elige el análisis:"
+
+# =====================================================
+# S3 LOCAL CON DATOS SINTÉTICOS
+
+def generar_datos_sinteticos(n_artistas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    nombres = [f"Artist {i}" for i in range(n_artistas)]
+    n_tracks = 2 * n_artistas
+
+    artistas = pd.DataFrame({
+        'artist_name': nombres,
+        'lastfm_playcount': rng.lognormal(14, 2, n_artistas).astype('int64'),
+        'lastfm_listeners': rng.lognormal(12, 2, n_artistas).astype('int64'),
+        'spotify_followers': rng.lognormal(13, 2, n_artistas),
+        'spotify_popularity': rng.integers(0, 101, n_artistas).astype(float),
+    })
+    tracks = pd.DataFrame({
+        'track_name': [f"Song {i}" for i in range(n_tracks)],
+        'artist_name': rng.choice(nombres, n_tracks),
+        'playcount': rng.lognormal(12, 2, n_tracks).astype('int64'),
+        'listeners': rng.lognormal(10, 2, n_tracks).astype('int64'),
+    })
+    generos = pd.DataFrame({
+        'tag_name': [f"genre {i}" for i in range(80)],
+        'tag_count': rng.integers(100, 100_000, 80),
+    })
+    fechas = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 280, 500), unit="D")
+    lanzamientos = pd.DataFrame({
+        'album_name': [f"Album {i}" for i in range(500)],
+        'artist_name': rng.choice(nombres[:100], 500),
+        'album_type': rng.choice(['album', 'single', 'compilation'], 500),
+        'release_date': fechas.strftime("%Y-%m-%d"),
+        'total_tracks': rng.integers(1, 20, 500),
+    })
+    enriquecidos = pd.DataFrame({
+        'track_name': tracks['track_name'][:n_artistas],
+        'artist_name': tracks['artist_name'][:n_artistas],
+        'lastfm_playcount': tracks['playcount'][:n_artistas],
+        'spotify_popularity': rng.integers(0, 101, n_artistas),
+    })
+    return {
+        'artists_combined': artistas,
+        'tracks_lastfm': tracks,
+        'genres_lastfm': generos,
+        'spotify_new_releases': lanzamientos,
+        'tracks_enriched': enriquecidos,
+    }
+
+
+def levantar_s3_local(n_artistas, puerto=PUERTO_S3_LOCAL):
+    # moto solo se necesita para la prueba, no para el dashboard
+    from moto.server import ThreadedMotoServer
+
+    servidor = ThreadedMotoServer(port=puerto, verbose=False)
+    servidor.start()
+    os.environ["AWS_ENDPOINT_URL"] = f"http://127.0.0.1:{puerto}"
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "prueba")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "prueba")
+    os.environ["ALMACEN"] = "s3"
+
+    # almacenamiento crea el cliente de S3 al importarse: debe ser después
+    # de apuntar AWS_ENDPOINT_URL al servidor local
+    from almacenamiento import DATASETS, almacen, escribir_objeto
+
+    almacen.cliente.create_bucket(Bucket=almacen.bucket, CreateBucketConfiguration={'LocationConstraint': 'us-west-1'})
+    for nombre, df in generar_datos_sinteticos(n_artistas).items():
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False, row_group_size=max(1, n_artistas // 8))
+        escribir_objeto(DATASETS[nombre], buffer.getvalue())
+    print(f"[carga] S3 local en el puerto {puerto} con {n_artistas:,} artistas sintéticos", flush=True)
+    return servidor
+
+# =====================================================
+# SERVIDOR DE STREAMLIT
+
+def levantar_servidor(puerto):
+    # Se desactiva XSRF porque el cliente de la prueba no pasa por el navegador
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", DASHBOARD,
+         "--server.port", str(puerto), "--server.headless", "true",
+         "--server.enableXsrfProtection", "false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    limite = time.time() + 60
+    while time.time() < limite:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/_stcore/health", timeout=1):
+                print(f"[carga] Streamlit en el puerto {puerto} (pid {proceso.pid})", flush=True)
+                return proceso
+        except OSError:
+            time.sleep(0.5)
+    proceso.kill()
+    raise RuntimeError("Streamlit no respondió en /_stcore/health")
+
+# =====================================================
+# MEMORIA DEL CONTENEDOR (PROCESO DE STREAMLIT)
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as archivo:
+            for linea in archivo:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    return 0.0
+
+
+class MonitorMemoria(threading.Thread):
+    def __init__(self, pid, intervalo=0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.intervalo = intervalo
+        self.inicial = rss_mb(pid)
+        self.pico = self.inicial
+        self.final = self.inicial
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            self.pico = max(self.pico, rss_mb(self.pid))
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+        self.final = rss_mb(self.pid)
+        self.pico = max(self.pico, self.final)
+
+# =====================================================
+# SESIONES
+# Cada sesión habla el mismo protocolo que el navegador: manda BackMsg
+# rerun_script con el estado de sus widgets y espera los ForwardMsg hasta
+# script_finished. La latencia incluye la serialización y el envío.
+
+class SesionCliente:
+    def __init__(self, ws):
+        self.ws = ws
+        self.estados = {}
+        self.widgets = {}
+
+    async def rerun(self):
+        mensaje = BackMsg()
+        mensaje.rerun_script.query_string = ""
+        mensaje.rerun_script.widget_states.widgets.extend(self.estados.values())
+
+        inicio = time.perf_counter()
+        await self.ws.send(mensaje.SerializeToString())
+        widgets, errores = {}, 0
+        while True:
+            respuesta = ForwardMsg()
+            respuesta.ParseFromString(await self.ws.recv())
+            tipo = respuesta.WhichOneof('type')
+            if tipo == 'script_finished':
+                break
+            if tipo != 'delta' or respuesta.delta.WhichOneof('type') != 'new_element':
+                continue
+            elemento = respuesta.delta.new_element
+            tipo_elemento = elemento.WhichOneof('type')
+            if tipo_elemento == 'exception':
+                errores += 1
+            elif tipo_elemento in ('radio', 'selectbox', 'slider'):
+                widgets[getattr(elemento, tipo_elemento).id] = (tipo_elemento, getattr(elemento, tipo_elemento))
+        self.widgets = widgets
+        return time.perf_counter() - inicio, errores
+
+    def elegir(self, widget_id, tipo, proto, rng):
+        estado = WidgetState(id=widget_id)
+        if tipo == 'slider':
+            if proto.data_type not in (proto.INT, proto.FLOAT) or len(proto.default) != 1:
+                return None
+            pasos = int(round((proto.max - proto.min) / proto.step))
+            estado.double_array_value.data[:] = [proto.min + proto.step * rng.randint(0, pasos)]
+        else:
+            if not proto.options:
+                return None
+            estado.string_value = rng.choice(list(proto.options))
+        self.estados[widget_id] = estado
+        return f"{tipo}:{proto.label}"
+
+
+async def ejecutar_sesion(numero, url, pasos, registros):
+    rng = random.Random(numero)
+
+    def registrar(accion, segundos, errores):
+        registros.append({'sesion': numero, 'accion': accion, 'segundos': segundos, 'errores': errores})
+
+    try:
+        async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as ws:
+            sesion = SesionCliente(ws)
+            registrar("inicio", *await sesion.rerun())
+            for _ in range(pasos):
+                radios = [(i, p) for i, (t, p) in sesion.widgets.items() if t == 'radio' and p.label == ETIQUETA_SELECTOR_ANALISIS]
+                if radios and rng.random() < 0.5:
+                    widget_id, proto = radios[0]
+                    sesion.elegir(widget_id, 'radio', proto, rng)
+                    accion = f"analisis:{sesion.estados[widget_id].string_value}"
+                else:
+                    otros = [(i, t, p) for i, (t, p) in sesion.widgets.items() if t != 'radio']
+                    accion = sesion.elegir(*rng.choice(otros), rng) if otros else None
+                if accion:
+                    registrar(accion, *await sesion.rerun())
+    except Exception as e:
+        registros.append({'sesion': numero, 'accion': "fallo", 'segundos': float("nan"), 'errores': 1, 'detalle': str(e)})
+
+
+async def ejecutar_sesiones(url, sesiones, pasos):
+    registros = []
+    await asyncio.gather(*(ejecutar_sesion(i, url, pasos, registros) for i in range(sesiones)))
+    return registros
+
+# =====================================================
+# REPORTE
+
+def resumir(registros, segundos_totales, monitor, sesiones):
+    df = pd.DataFrame(registros)
+    validos = df['segundos'].dropna()
+    percentiles = np.percentile(validos, [50, 95, 99]) if len(validos) else [float("nan")] * 3
+    reporte = {
+        'sesiones': sesiones,
+        'reruns': int(len(validos)),
+        'errores': int(df['errores'].sum()),
+        'duracion_s': round(segundos_totales, 3),
+        'reruns_por_segundo': round(len(validos) / segundos_totales, 2),
+        'p50_s': round(float(percentiles[0]), 4),
+        'p95_s': round(float(percentiles[1]), 4),
+        'p99_s': round(float(percentiles[2]), 4),
+    }
+    if monitor:
+        reporte.update({
+            'rss_inicial_mb': round(monitor.inicial, 1),
+            'rss_pico_mb': round(monitor.pico, 1),
+            'rss_final_mb': round(monitor.final, 1),
+            'rss_por_sesion_mb': round((monitor.pico - monitor.inicial) / max(sesiones, 1), 2),
+        })
+
+    # Latencia por acción (análisis o widget)
+    por_tipo = df.dropna(subset=['segundos']).groupby('accion')['segundos'].agg(
+        reruns='count',
+        p50=lambda s: s.quantile(0.5),
+        p95=lambda s: s.quantile(0.95),
+    ).sort_values('p95', ascending=False)
+    reporte['por_accion'] = por_tipo.round(4).reset_index().to_dict(orient='records')
+    return reporte
+
+
+def imprimir_reporte(reporte):
+    print()
+    print(f"Sesiones concurrentes: {reporte['sesiones']}")
+    print(f"Reruns: {reporte['reruns']:,} en {reporte['duracion_s']:.1f} s ({reporte['reruns_por_segundo']:.1f}/s)")
+    print(f"Errores: {reporte['errores']}")
+    print(f"Latencia p50 / p95 / p99: {reporte['p50_s']:.3f} / {reporte['p95_s']:.3f} / {reporte['p99_s']:.3f} s")
+    if 'rss_pico_mb' in reporte:
+        print(f"Memoria RSS del contenedor: {reporte['rss_inicial_mb']:.0f} MB -> pico {reporte['rss_pico_mb']:.0f} MB, "
+              f"final {reporte['rss_final_mb']:.0f} MB ({reporte['rss_por_sesion_mb']:.1f} MB por sesión)")
+    print()
+    print("Acciones más lentas (p95):")
+    for fila in reporte['por_accion'][:10]:
+        print(f"  {fila['p95']:.3f} s  p50 {fila['p50']:.3f} s  x{fila['reruns']:<4} {fila['accion']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del dashboard musical")
+    parser.add_argument("--sesiones", type=int, default=50, help="Sesiones concurrentes")
+    parser.add_argument("--pasos", type=int, default=20, help="Interacciones por sesión")
+    parser.add_argument("--s3-local", action="store_true", help="Usar un S3 de prueba con datos sintéticos")
+    parser.add_argument("--artistas", type=int, default=5000, help="Artistas sintéticos con --s3-local")
+    parser.add_argument("--puerto-s3", type=int, default=PUERTO_S3_LOCAL, help="Puerto del S3 local")
+    parser.add_argument("--puerto", type=int, default=PUERTO_STREAMLIT, help="Puerto del Streamlit que se levanta")
+    parser.add_argument("--url", help="Probar un dashboard ya levantado (ej. ws://host:8502) en lugar de levantar uno")
+    parser.add_argument("--salida", help="Guardar el reporte en JSON")
+    args = parser.parse_args()
+
+    servidor_s3 = levantar_s3_local(args.artistas, args.puerto_s3) if args.s3_local else None
+    proceso = None if args.url else levantar_servidor(args.puerto)
+    url = f"{args.url or f'ws://127.0.0.1:{args.puerto}'}/_stcore/stream"
+
+    # La memoria solo se puede medir si el servidor corre en esta máquina
+    monitor = MonitorMemoria(proceso.pid) if proceso else None
+    if monitor:
+        monitor.start()
+    try:
+        inicio = time.perf_counter()
+        registros = asyncio.run(ejecutar_sesiones(url, args.sesiones, args.pasos))
+        segundos_totales = time.perf_counter() - inicio
+    finally:
+        if monitor:
+            monitor.detener()
+        if proceso:
+            proceso.terminate()
+            proceso.wait()
+        if servidor_s3:
+            servidor_s3.stop()
+
+    reporte = resumir(registros, segundos_totales, monitor, args.sesiones)
+    imprimir_reporte(reporte)
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump(reporte, archivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# =====================================================
+# CACHE STALE-WHILE-REVALIDATE
+# Cada clave tiene un TTL. Mientras no vence, la copia en memoria se sirve
+# tal cual. Cuando vence se sigue sirviendo la última copia buena y un
+# hilo en segundo plano pregunta la versión del objeto (un HEAD). Solo si
+# cambió lo vuelve a bajar. Los errores se reintentan con backoff
+# exponencial con jitter; si todos fallan se queda la copia anterior y se
+# vuelve a intentar más tarde. El usuario solo espera la primera carga.
+# Con una MemoriaCache (cache_memoria.py) cada copia cuenta en el
+# presupuesto de bytes del proceso; si se expulsa, la próxima vez que se
+# pida se vuelve a cargar como la primera vez.
+
+import random
+import threading
+import time
+
+INTENTOS = 4
+BACKOFF_BASE = 0.5        # segundos
+BACKOFF_MAXIMO = 20.0
+# Tras una revalidación fallida, cuánto esperar (mínimo) antes de la siguiente
+ESPERA_TRAS_FALLO = 15.0
+
+
+def duracion_backoff(intento, base=BACKOFF_BASE, maximo=BACKOFF_MAXIMO):
+    # "Full jitter": al azar entre 0 y base * 2^intento, así los reintentos
+    # de varias sesiones o procesos no llegan a S3 al mismo tiempo
+    return random.uniform(0, min(maximo, base * 2 ** intento))
+
+
+def con_reintentos(funcion, intentos=INTENTOS):
+    for intento in range(intentos):
+        try:
+            return funcion()
+        except Exception:
+            if intento == intentos - 1:
+                raise
+            time.sleep(duracion_backoff(intento))
+
+
+class _Entrada:
+    def __init__(self, valor, version):
+        self.valor = valor
+        self.version = version
+        self.cargado = time.time()
+        self.verificado = self.cargado
+        self.error = None
+        self.fallos = 0
+        self.proximo_intento = 0.0
+        self.revalidando = False
+
+
+class CacheRevalidable:
+    """
+    cargar(clave, version) baja el valor; recargar(clave, version), si se
+    da, lo baja sin pasar por copias locales (se usa al revalidar). Ambas
+    reciben la versión recién leída (o None): una copia local bajada con
+    otra versión no debe usarse, porque quedaría anotada con la nueva.
+    version(clave) debe ser barata (ETag); sin ella cada revalidación
+    vuelve a bajar el valor.
+    ttl: {clave: segundos}; las claves que no están usan ttl_default.
+    memoria: MemoriaCache opcional donde se anotan las copias, en `region`.
+    """
+
+    def __init__(self, cargar, version=None, recargar=None, ttl=None, ttl_default=3600,
+                 memoria=None, region="datasets"):
+        self._cargar = cargar
+        self._recargar = recargar or cargar
+        self._version = version
+        self._ttl = ttl or {}
+        self._ttl_default = ttl_default
+        self._entradas = {}
+        self._candado = threading.Lock()
+        # Un candado por clave: dos sesiones no hacen la misma primera carga
+        self._candados_carga = {}
+        self._memoria = memoria
+        self._region = region
+
+    def ttl(self, clave):
+        return self._ttl.get(clave, self._ttl_default)
+
+    def _leer_version(self, clave):
+        if self._version is None:
+            return None
+        return con_reintentos(lambda: self._version(clave))
+
+    def _anotar(self, clave, entrada):
+        # La memoria avisa cuando expulsa la copia: se suelta la referencia
+        if self._memoria is not None:
+            self._memoria.guardar(
+                self._region, clave, entrada.valor,
+                al_expulsar=lambda: self.olvidar(clave, entrada)
+            )
+
+    def olvidar(self, clave, entrada=None):
+        """Suelta la copia de `clave` (solo si sigue siendo `entrada`, si se da)."""
+        with self._candado:
+            if entrada is None or self._entradas.get(clave) is entrada:
+                self._entradas.pop(clave, None)
+
+    def obtener(self, clave):
+        entrada = self._entradas.get(clave)
+        if self._memoria is not None:
+            # Solo para el LRU y la tasa de aciertos; la copia vive en _entradas
+            self._memoria.obtener(self._region, clave)
+        if entrada is None:
+            entrada = self._primera_carga(clave)
+        else:
+            self._revalidar_si_vencio(clave, entrada)
+        return entrada.valor
+
+    def _primera_carga(self, clave):
+        with self._candado:
+            candado = self._candados_carga.setdefault(clave, threading.Lock())
+        with candado:
+            if clave in self._entradas:
+                return self._entradas[clave]
+            try:
+                version = self._leer_version(clave)
+            except Exception:
+                # Sin versión la primera revalidación vuelve a bajar el objeto
+                version = None
+            entrada = _Entrada(con_reintentos(lambda: self._cargar(clave, version)), version)
+            self._entradas[clave] = entrada
+        self._anotar(clave, entrada)
+        return entrada
+
+    def _revalidar_si_vencio(self, clave, entrada):
+        ahora = time.time()
+        with self._candado:
+            vencida = ahora - entrada.verificado >= self.ttl(clave)
+            if not vencida or entrada.revalidando or ahora < entrada.proximo_intento:
+                return
+            entrada.revalidando = True
+        threading.Thread(target=self._revalidar, args=(clave, entrada), daemon=True).start()
+
+    def _revalidar(self, clave, entrada):
+        try:
+            version = self._leer_version(clave)
+            if version is not None and version == entrada.version:
+                with self._candado:
+                    entrada.verificado = time.time()
+                    entrada.error, entrada.fallos = None, 0
+            else:
+                nueva = _Entrada(con_reintentos(lambda: self._recargar(clave, version)), version)
+                with self._candado:
+                    self._entradas[clave] = nueva
+                self._anotar(clave, nueva)
+        except Exception as e:
+            with self._candado:
+                entrada.error = str(e)
+                entrada.fallos += 1
+                entrada.proximo_intento = time.time() + ESPERA_TRAS_FALLO + duracion_backoff(
+                    entrada.fallos, ESPERA_TRAS_FALLO, self.ttl(clave)
+                )
+        finally:
+            with self._candado:
+                entrada.revalidando = False
+
+    def version(self, clave):
+        """Identifica la copia servida; cambia cada vez que se reemplaza."""
+        entrada = self._entradas.get(clave)
+        return None if entrada is None else (entrada.version, entrada.cargado)
+
+    def estado(self, clave):
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        ahora = time.time()
+        return {
+            'edad': ahora - entrada.cargado,
+            'desde_verificacion': ahora - entrada.verificado,
+            'ttl': self.ttl(clave),
+            'revalidando': entrada.revalidando,
+            'error': entrada.error,
+            'fallos': entrada.fallos,
+            'proximo_intento': max(0.0, entrada.proximo_intento - ahora) if entrada.error else 0.0,
+        }
@@ -0,0 +1,19 @@
+# =====================================================
+# TABLAS COMPARTIDAS DE SOLO LECTURA
+# Cada dataset vive una sola vez por proceso (st.cache_resource). Las
+# sesiones no reciben una copia profunda ni un unpickle como con
+# st.cache_data, sino una vista: una copia superficial que comparte los
+# arrays. Con copy-on-write de pandas, una asignación sobre la vista
+# (df['col'] = ..., df.loc[...] = ..., inplace=True) copia solo lo que
+# toca y nunca llega a la tabla compartida ni a otras sesiones.
+
+import pandas as pd
+
+# Copy-on-write es el comportamiento por defecto desde pandas 3.0
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+def vista(df):
+    """Vista de la tabla compartida; se puede modificar sin afectarla."""
+    return None if df is None else df.copy(deep=False)